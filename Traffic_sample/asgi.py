@@ -11,6 +11,7 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Traffic_sample.settings")
+# settings_asgi switches the traffic API to its async views; see README "Deployment (ASGI)"
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Traffic_sample.settings_asgi")
 
 application = get_asgi_application()
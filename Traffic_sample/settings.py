@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "web_app.metrics.RequestMetricsMiddleware",  # First, so it times everything below it
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -122,3 +123,93 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Traffic API
+# Sorted index of snapshot timestamps used by the traffic API (see web_app/timestamp_index.py).
+# Each worker trusts its copy for TRAFFIC_TIMESTAMP_INDEX_TTL seconds. Point
+# TRAFFIC_TIMESTAMP_INDEX_CACHE at a shared cache alias so imports invalidate every worker at once.
+
+TRAFFIC_TIMESTAMP_INDEX_TTL = 60
+TRAFFIC_TIMESTAMP_INDEX_CACHE = None
+
+# Encoded traffic API responses kept per worker (see web_app/snapshot_cache.py).
+# The byte budget counts the gzip/brotli copies; 0 disables the cache.
+TRAFFIC_SNAPSHOT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TRAFFIC_SNAPSHOT_CACHE_COMPRESS = True
+
+# Snapshots returned by /api/traffic-range/ when no end is given, and the hard cap per request
+TRAFFIC_RANGE_DEFAULT_FRAMES = 12
+TRAFFIC_RANGE_MAX_FRAMES = 288
+# Interpolated playback (/api/traffic-playback/): default and largest step in seconds, frames per request
+# and their cap, decoded snapshots kept per worker, and the longest gap in seconds interpolated across
+TRAFFIC_PLAYBACK_DEFAULT_STEP = 30
+TRAFFIC_PLAYBACK_MAX_STEP = 86400
+TRAFFIC_PLAYBACK_DEFAULT_FRAMES = 60
+TRAFFIC_PLAYBACK_MAX_FRAMES = 1200
+TRAFFIC_PLAYBACK_CACHE_SNAPSHOTS = 288
+TRAFFIC_PLAYBACK_MAX_GAP = 900
+
+# Hot snapshot store (web_app/hot_store.py): after each import the importer writes the latest
+# TRAFFIC_HOT_STORE_SNAPSHOTS snapshots to this file, and every worker serves recent speed vectors and
+# playback frames from a shared memory map of it instead of the database. None disables it.
+TRAFFIC_HOT_STORE_PATH = None
+TRAFFIC_HOT_STORE_SNAPSHOTS = 12
+
+# Vector tiles (/api/traffic-tiles/{z}/{x}/{y}.mvt): full segment properties from this zoom up,
+# and the per-worker byte budget of the tile cache
+TRAFFIC_TILE_DETAIL_ZOOM = 13
+TRAFFIC_TILE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Import validation (web_app/data_quality.py): rows with an endpoint outside these bounds (west, south,
+# east, north), a speed outside -1..TRAFFIC_IMPORT_MAX_SPEED, or an endpoint more than
+# TRAFFIC_IMPORT_MAX_GEOMETRY_DRIFT metres from the stored segment (None: no check) go to QuarantinedRow
+TRAFFIC_IMPORT_BOUNDS = (-88.5, 41.4, -87.3, 42.4)
+TRAFFIC_IMPORT_MAX_SPEED = 120
+TRAFFIC_IMPORT_MAX_GEOMETRY_DRIFT = 250
+
+# History retention (manage.py apply_traffic_retention): raw 5-minute observations are kept this many
+# days, then rolled up into hourly and daily rollups; hourly rollups expire after the second limit
+TRAFFIC_RAW_RETENTION_DAYS = 30
+TRAFFIC_HOURLY_RETENTION_DAYS = 365
+
+# Segment time series (/api/traffic-series/): segments and points per segment allowed per request,
+# and the range returned when no start is given
+TRAFFIC_SERIES_MAX_SEGMENTS = 100
+TRAFFIC_SERIES_MAX_POINTS = 10000
+TRAFFIC_SERIES_DEFAULT_HOURS = 24
+
+# Congestion events (web_app/anomalies.py, /api/traffic-events/): the importer keeps an exponentially
+# weighted speed baseline per segment and local time-of-day slot (weekdays and weekends apart), and opens
+# a TrafficEvent when a speed falls DROP_RATIO and MIN_DROP mph below it and Z_SCORE deviations under it,
+# once the baseline has MIN_SAMPLES samples. Replay history with `manage.py detect_traffic_anomalies --rebuild`.
+TRAFFIC_ANOMALY_TIME_ZONE = 'America/Chicago'
+TRAFFIC_ANOMALY_SLOT_MINUTES = 60
+TRAFFIC_ANOMALY_ALPHA = 0.05
+TRAFFIC_ANOMALY_MIN_SAMPLES = 24
+TRAFFIC_ANOMALY_DROP_RATIO = 0.4
+TRAFFIC_ANOMALY_MIN_DROP = 8
+TRAFFIC_ANOMALY_Z_SCORE = 2.5
+TRAFFIC_EVENTS_MAX_RESULTS = 1000
+
+# Live updates (/api/traffic-live/, Server-Sent Events; needs the ASGI server). Each server process
+# checks for a new snapshot every TRAFFIC_LIVE_POLL_INTERVAL seconds and pushes it to its clients
+# through TRAFFIC_LIVE_BROKER; idle streams get a keepalive comment every TRAFFIC_LIVE_KEEPALIVE seconds.
+TRAFFIC_LIVE_BROKER = 'web_app.live_updates.InProcessBroker'
+TRAFFIC_LIVE_POLL_INTERVAL = 2.0
+TRAFFIC_LIVE_KEEPALIVE = 15
+
+# Where archive_traffic_snapshots writes the binary snapshot archives (web_app/snapshot_binary.py)
+# that import_traffic_data can restore instead of re-parsing the CSVs.
+TRAFFIC_ARCHIVE_DIR = BASE_DIR / 'web_app' / 'archive'
+
+# Request metrics (web_app/metrics.py). /metrics serves them in the Prometheus text format to
+# the addresses and networks in TRAFFIC_METRICS_ALLOWED_IPS (None: anyone); TRAFFIC_SERVER_TIMING
+# adds a Server-Timing header with each request's database time and view phases.
+TRAFFIC_METRICS_ENABLED = True
+TRAFFIC_METRICS_ALLOWED_IPS = None
+TRAFFIC_SERVER_TIMING = DEBUG
+
+# Serve the traffic API with the async views in web_app/async_views.py. Only useful under ASGI;
+# settings_asgi.py (the default in asgi.py) turns it on.
+TRAFFIC_ASYNC_VIEWS = False
@@ -0,0 +1,10 @@
+"""
+Settings for serving the project under ASGI (uvicorn, daphne); the default in asgi.py.
+
+Same as settings.py, except that the traffic API is served by the async views in
+web_app/async_views.py, which keep database work off Django's single sync thread.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+TRAFFIC_ASYNC_VIEWS = True
@@ -0,0 +1,84 @@
+"""
+Production settings: the ASGI settings plus a tuned SQLite database profile.
+
+Select with DJANGO_SETTINGS_MODULE=Traffic_sample.settings_production (settings_production_postgresql
+for PostgreSQL) for the server, the importer and every other management command.
+
+SQLite runs in WAL mode, so readers see the last committed snapshot while the importer
+writes the next one instead of waiting for its transaction. The traffic API reads through
+a second, query-only connection ('replica'), routed by web_app/db_router.py; the importer
+and the other writing commands use the primary ('default'). Both keep their connections
+open between requests (CONN_MAX_AGE) so the PRAGMAs and the page cache are set up once
+per connection, not per request.
+"""
+import os
+
+from .settings_asgi import *  # noqa: F401,F403
+from .settings_asgi import BASE_DIR
+
+DEBUG = False
+TRAFFIC_SERVER_TIMING = False
+# Comma-separated addresses or networks that may read /metrics: by default loopback and the private
+# ranges a Prometheus server inside the deployment scrapes from. Behind a reverse proxy REMOTE_ADDR
+# is the proxy's, so keep /metrics off the public proxy configuration too.
+TRAFFIC_METRICS_ALLOWED_IPS = os.environ.get(
+    'TRAFFIC_METRICS_ALLOWED_IPS', '127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7').split(',')
+# Comma-separated host names this deployment is served under
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+SQLITE_PATH = os.environ.get('TRAFFIC_SQLITE_PATH', BASE_DIR / 'db.sqlite3')
+SQLITE_CACHE_SIZE_KIB = 64 * 1024  # Page cache per connection
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # Bytes of the file read through a memory map, shared by all connections
+SQLITE_BUSY_TIMEOUT = 20  # Seconds a writer waits for another writer before "database is locked"
+CONN_MAX_AGE = 600  # Seconds a connection is reused before it is reopened
+
+# Run on every new connection
+SQLITE_READ_PRAGMAS = (
+    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}; '
+    f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}; '
+    'PRAGMA temp_store=MEMORY'
+)
+SQLITE_WRITE_PRAGMAS = (
+    # WAL is stored in the file; setting it again is a no-op. NORMAL skips the fsync on every
+    # commit: a power cut can lose the last transactions, never corrupt the database, and the
+    # importer re-imports files whose ledger entry did not make it.
+    'PRAGMA journal_mode=WAL; '
+    'PRAGMA synchronous=NORMAL; '
+    + SQLITE_READ_PRAGMAS
+)
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SQLITE_PATH,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_WRITE_PRAGMAS,
+            # Take the write lock when the transaction starts, so two writers queue on the busy
+            # timeout instead of one failing when it upgrades from reading to writing
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_BUSY_TIMEOUT,
+        },
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SQLITE_PATH,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_READ_PRAGMAS + '; PRAGMA query_only=ON',
+            'timeout': SQLITE_BUSY_TIMEOUT,
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['web_app.db_router.TrafficReadRouter']
+TRAFFIC_READ_DATABASE = 'replica'
+
+# Latest snapshots shared by all workers through one memory-mapped file (web_app/hot_store.py),
+# on the RAM-backed /dev/shm where there is one. Only workers on the importer's machine see it;
+# the others read the database as before.
+TRAFFIC_HOT_STORE_PATH = os.environ.get(
+    'TRAFFIC_HOT_STORE_PATH',
+    '/dev/shm/traffic_sample_hot.tsnp' if os.path.isdir('/dev/shm') else BASE_DIR / 'web_app' / 'hot_snapshots.tsnp')
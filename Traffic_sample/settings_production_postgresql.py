@@ -0,0 +1,49 @@
+"""
+Production settings on PostgreSQL: settings_production.py with its database profile
+swapped for a PostgreSQL primary and a read-only replica. Needs psycopg (pip install "psycopg[binary]").
+
+Connection details come from the environment: TRAFFIC_DB_NAME, TRAFFIC_DB_USER,
+TRAFFIC_DB_PASSWORD, TRAFFIC_DB_HOST, TRAFFIC_DB_PORT, plus TRAFFIC_DB_REPLICA_HOST and
+TRAFFIC_DB_REPLICA_PORT for a streaming-replication standby. Without a standby the replica
+is a second, read-only connection to the primary. PostgreSQL readers never wait for
+writers, so that still keeps the API's reads out of the importer's transactions.
+
+The SQLite cache and mmap PRAGMAs have no per-connection equivalent here. Size
+shared_buffers (about 25% of RAM) and effective_cache_size (about 75%) in postgresql.conf instead.
+"""
+import os
+
+from .settings_production import *  # noqa: F401,F403
+from .settings_production import CONN_MAX_AGE
+
+POSTGRESQL_PRIMARY = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': os.environ.get('TRAFFIC_DB_NAME', 'traffic_sample'),
+    'USER': os.environ.get('TRAFFIC_DB_USER', 'traffic_sample'),
+    'PASSWORD': os.environ.get('TRAFFIC_DB_PASSWORD', ''),
+    'HOST': os.environ.get('TRAFFIC_DB_HOST', 'localhost'),
+    'PORT': os.environ.get('TRAFFIC_DB_PORT', '5432'),
+    'CONN_MAX_AGE': CONN_MAX_AGE,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'application_name': 'traffic_sample',
+        # Like SQLite's synchronous=NORMAL: commits return before the WAL is flushed. A crash can
+        # lose the last few hundred milliseconds of commits, never corrupt data; the importer
+        # re-imports files whose ledger entry did not make it.
+        'options': '-c synchronous_commit=off',
+    },
+}
+
+DATABASES = {
+    'default': POSTGRESQL_PRIMARY,
+    'replica': {
+        **POSTGRESQL_PRIMARY,
+        'HOST': os.environ.get('TRAFFIC_DB_REPLICA_HOST', POSTGRESQL_PRIMARY['HOST']),
+        'PORT': os.environ.get('TRAFFIC_DB_REPLICA_PORT', POSTGRESQL_PRIMARY['PORT']),
+        'OPTIONS': {
+            'application_name': 'traffic_sample_read',
+            'options': '-c default_transaction_read_only=on',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
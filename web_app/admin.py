@@ -1,6 +1,16 @@
 from django.contrib import admin
 
-from web_app.models import TrafficSegmentData
+from web_app.models import (
+    CongestionSummary, ImportedFile, QuarantinedRow, SegmentBaseline, TrafficEvent, TrafficSegment,
+    TrafficSegmentData, TrafficSegmentRollup,
+)
 
 # Register your models here.
-admin.site.register(TrafficSegmentData)
\ No newline at end of file
+admin.site.register(TrafficSegment)
+admin.site.register(TrafficSegmentData)
+admin.site.register(ImportedFile)
+admin.site.register(TrafficSegmentRollup)
+admin.site.register(CongestionSummary)
+admin.site.register(SegmentBaseline)
+admin.site.register(TrafficEvent)
+admin.site.register(QuarantinedRow)
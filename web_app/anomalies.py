@@ -0,0 +1,149 @@
+"""
+Detection of sharp slowdowns against each segment's norm for the time of day, run by the
+importer for every snapshot it writes.
+
+Every segment has one SegmentBaseline per time-of-day slot: an exponentially weighted
+moving average and variance of its speed estimates in that slot. A snapshot reads the
+baselines of its slot and the open events, then writes both back. That is O(segments) per
+snapshot and never reads the stored history, however much of it there is.
+
+A speed is anomalous when all of these hold:
+- the baseline has at least TRAFFIC_ANOMALY_MIN_SAMPLES samples;
+- the speed is TRAFFIC_ANOMALY_DROP_RATIO below the norm, and at least TRAFFIC_ANOMALY_MIN_DROP mph;
+- it is TRAFFIC_ANOMALY_Z_SCORE standard deviations below the norm. The deviation is at
+  least MIN_DEVIATION, so a segment that barely varies is not flagged for a few mph.
+A TrafficEvent opens at the first anomalous snapshot. It stays open until the speed recovers
+to within half the drop ratio of the norm, so a speed hovering at the threshold does not
+open and close an event every snapshot. The baseline is updated with every estimate
+(after detection), so a lasting change slowly becomes the new norm. Speeds of -1 (no
+estimate) change nothing.
+
+Snapshots must arrive in time order per segment and slot. Samples no newer than a baseline's
+updated_at are skipped, so re-importing a file does not count it twice. Use
+`detect_traffic_anomalies --rebuild` to replay stored history after changing the settings.
+
+Settings:
+- TRAFFIC_ANOMALY_TIME_ZONE (default 'America/Chicago'): local time the slots follow.
+- TRAFFIC_ANOMALY_SLOT_MINUTES (default 60): slot length; weekdays and weekends have separate slots.
+- TRAFFIC_ANOMALY_ALPHA (default 0.05): weight of each new sample in the moving average.
+- TRAFFIC_ANOMALY_MIN_SAMPLES (default 24), TRAFFIC_ANOMALY_DROP_RATIO (default 0.4),
+  TRAFFIC_ANOMALY_MIN_DROP (default 8), TRAFFIC_ANOMALY_Z_SCORE (default 2.5): thresholds above.
+"""
+import math
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+from web_app.models import SegmentBaseline, TrafficEvent
+from web_app.timestamp_index import snapshot_timestamps
+
+MIN_DEVIATION = 2.0  # mph; floor of the standard deviation used for z-scores
+BASELINE_UPDATE_FIELDS = ['mean_speed', 'variance', 'sample_count', 'updated_at']
+EVENT_UPDATE_FIELDS = ['last_seen_at', 'ended_at', 'min_speed', 'min_z_score', 'snapshot_count']
+
+
+def anomaly_setting(name, default):
+    return getattr(settings, f'TRAFFIC_ANOMALY_{name}', default)
+
+
+def time_slot(recorded_at):
+    """Time-of-day slot of a snapshot in local time: weekday slots first, then weekend slots."""
+    local = recorded_at.astimezone(ZoneInfo(anomaly_setting('TIME_ZONE', 'America/Chicago')))
+    slot_minutes = anomaly_setting('SLOT_MINUTES', 60)
+    slots_per_day = -(-24 * 60 // slot_minutes)
+    weekend = local.weekday() >= 5
+    return weekend * slots_per_day + (local.hour * 60 + local.minute) // slot_minutes
+
+
+def z_score(speed, baseline):
+    return (speed - baseline.mean_speed) / max(math.sqrt(baseline.variance), MIN_DEVIATION)
+
+
+def is_anomalous(speed, baseline):
+    drop = baseline.mean_speed - speed
+    return (
+        baseline.sample_count >= anomaly_setting('MIN_SAMPLES', 24)
+        and drop >= anomaly_setting('MIN_DROP', 8)
+        and drop >= baseline.mean_speed * anomaly_setting('DROP_RATIO', 0.4)
+        and z_score(speed, baseline) <= -anomaly_setting('Z_SCORE', 2.5)
+    )
+
+
+def has_recovered(speed, baseline):
+    return speed >= baseline.mean_speed * (1 - anomaly_setting('DROP_RATIO', 0.4) / 2)
+
+
+def update_baseline(baseline, speed, recorded_at):
+    """Fold one speed estimate into the exponentially weighted mean and variance."""
+    alpha = anomaly_setting('ALPHA', 0.05)
+    difference = speed - baseline.mean_speed
+    increment = alpha * difference
+    baseline.mean_speed += increment
+    baseline.variance = (1 - alpha) * (baseline.variance + difference * increment)
+    baseline.sample_count += 1
+    baseline.updated_at = recorded_at
+
+
+def detect_snapshot_anomalies(recorded_at, speeds):
+    """
+    Update the baselines of recorded_at's slot with one snapshot and open or close events.
+    `speeds` maps segment_id -> current_speed for the snapshot. Two queries read the state;
+    call it inside the transaction that wrote the snapshot. Returns (events opened, events closed).
+    """
+    recorded_at = snapshot_timestamps.normalize(recorded_at)  # The importer's are naive, like the CSV's
+    slot = time_slot(recorded_at)
+    baselines = {baseline.segment_id: baseline for baseline in SegmentBaseline.objects.filter(slot=slot)}
+    open_events = {event.segment_id: event for event in TrafficEvent.objects.filter(ended_at__isnull=True)}
+
+    changed_baselines = []
+    new_events = []
+    changed_events = []
+    closed = 0
+    for segment_id, speed in speeds.items():
+        if speed < 0:
+            continue  # No estimate: nothing to learn from or to compare
+        baseline = baselines.get(segment_id)
+        if baseline is None:
+            changed_baselines.append(SegmentBaseline(
+                segment_id=segment_id, slot=slot, mean_speed=float(speed), sample_count=1, updated_at=recorded_at))
+            continue
+        if recorded_at <= baseline.updated_at:
+            continue  # Already applied (re-import), or older than what the baseline has seen
+
+        event = open_events.get(segment_id)
+        if event is not None and recorded_at > event.last_seen_at:
+            if has_recovered(speed, baseline):
+                event.ended_at = recorded_at
+                closed += 1
+            else:
+                event.last_seen_at = recorded_at
+                event.snapshot_count += 1
+                event.min_speed = min(event.min_speed, speed)
+                event.min_z_score = min(event.min_z_score, z_score(speed, baseline))
+            changed_events.append(event)
+        elif event is None and is_anomalous(speed, baseline):
+            new_events.append(TrafficEvent(
+                segment_id=segment_id,
+                started_at=recorded_at,
+                last_seen_at=recorded_at,
+                baseline_speed=round(baseline.mean_speed, 2),
+                start_speed=speed,
+                min_speed=speed,
+                min_z_score=z_score(speed, baseline),
+            ))
+
+        update_baseline(baseline, speed, recorded_at)
+        baseline.pk = None  # Written by the upsert below, which matches on (slot, segment), not on id
+        changed_baselines.append(baseline)
+
+    # One upsert for new and updated baselines alike, keyed like the importer's writes
+    SegmentBaseline.objects.bulk_create(
+        changed_baselines,
+        batch_size=2000,
+        update_conflicts=True,
+        unique_fields=['slot', 'segment'],
+        update_fields=BASELINE_UPDATE_FIELDS,
+    )
+    TrafficEvent.objects.bulk_create(new_events)
+    TrafficEvent.objects.bulk_update(changed_events, EVENT_UPDATE_FIELDS, batch_size=500)
+    return len(new_events), closed
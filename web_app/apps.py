@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class WebAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "web_app"
+
+    def ready(self):
+        from web_app.metrics import install_query_recorder
+
+        # Count every request's queries and database time (see web_app/metrics.py)
+        connection_created.connect(install_query_recorder, dispatch_uid='web_app.metrics.install_query_recorder')
@@ -0,0 +1,421 @@
+"""
+Async versions of the traffic API views, served when TRAFFIC_ASYNC_VIEWS is on (see
+Traffic_sample/settings_asgi.py). Parameters, responses and the response cache are shared
+with web_app.views; only the way the database is reached differs.
+
+Under ASGI, Django runs every sync view on one shared thread, so a slow query holds up
+all other sync requests in the process. These views keep the event loop free instead:
+- The large reads iterate asynchronously over the queryset (aiterator, or aiterate for
+  values_list querysets), chunk by chunk.
+- The in-process indexes (snapshot timestamps, segment positions, the spatial index) may
+  query the database when they refresh, so each request resolves its parameters against
+  them in a single sync_to_async call.
+- Queries that do not depend on each other run at the same time with run_concurrently.
+"""
+import asyncio
+from functools import wraps
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.views.decorators.http import require_http_methods
+from web_app import metrics, snapshot_binary, views
+from web_app.models import TrafficSegment
+from web_app.segment_index import segment_index
+from web_app.snapshot_cache import snapshot_responses
+from web_app.streaming import async_streaming_json_response, wants_stream
+from web_app.timestamp_index import snapshot_timestamps
+from web_app.traffic_csv import SEGMENT_FIELDS
+from web_app.views import (
+    QUERY_CHUNK_SIZE, SEGMENT_FILTER_PARAMS, SpeedRowBuilder, binary_feature_rows, binary_speed_rows,
+    changed_positions, new_debug_info, published_feature_rows,
+    no_data_response, parse_segment_filters, parse_series_segment_ids, resolve_next_timestamp,
+    resolve_range_window, resolve_series_axis, resolve_snapshot_timestamp, segment_geometry,
+    segment_properties, segment_series_observations, series_data, series_rollups, series_speeds, snapshot_feature,
+    snapshot_feature_rows, snapshot_metadata, snapshot_speed_vector, speed_observations, wants_binary,
+)
+
+
+def _in_own_connection(query):
+    def run():
+        try:
+            return query()
+        finally:
+            # Pool threads are reused for unrelated work; do not leave connections open on them
+            connections.close_all()
+    return run
+
+
+async def run_concurrently(*queries):
+    """
+    Run independent blocking ORM calls at the same time and return their results in order.
+
+    The async ORM hands every query of a request to the same thread, so gathering several
+    async ORM calls still runs them one after another. Each call here gets its own pool
+    thread (thread_sensitive=False) and therefore its own database connection.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_in_own_connection(query), thread_sensitive=False)() for query in queries))
+
+
+async def aiterate_rows(rows):
+    """Async iteration over rows already in memory, so they can stand in for aiterate."""
+    for row in rows:
+        yield row
+
+
+async def aiterate(queryset, chunk_size=QUERY_CHUNK_SIZE):
+    """
+    Async iteration over a values_list queryset, chunk_size rows per trip to the sync thread.
+
+    Like QuerySet.aiterator(), but safe for values_list: Django's ValuesListIterable runs its
+    query as soon as it is iterated, and aiterator() does that on the event loop, which raises
+    SynchronousOnlyOperation. QuerySet.iterator() returns a generator that only queries on its
+    first next(), so every database call here happens on the sync thread.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = await sync_to_async(lambda: list(islice(rows, chunk_size)))()
+        for row in chunk:
+            yield row
+        if len(chunk) < chunk_size:
+            break
+
+
+async def aiterate_list(queryset):
+    return [row async for row in aiterate(queryset)]
+
+
+async def cache_response(cache_key, data):
+    """snapshot_responses.put off the event loop; encoding and compressing a large body takes a while."""
+    return await sync_to_async(snapshot_responses.put, thread_sensitive=False)(cache_key, data)
+
+
+async def cache_binary(cache_key, body):
+    """cache_response for an already encoded format=binary body."""
+    return await sync_to_async(snapshot_responses.put_bytes, thread_sensitive=False)(
+        cache_key, body, content_type=snapshot_binary.CONTENT_TYPE)
+
+
+def snapshot_index_state(debug_info):
+    """
+    snapshot_timestamps.version, or None when there is no data; fills in the oldest and
+    latest timestamps of debug_info. Loads the snapshot index if needed, so call it through sync_to_async.
+    """
+    if not snapshot_timestamps.oldest():
+        return None
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+    return snapshot_timestamps.version
+
+
+def in_worker_thread(view):
+    """
+    Async entry point for a sync view whose queries are small and bounded: the whole view
+    runs on a pool thread instead of Django's single thread for sync code.
+    """
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(_in_own_connection(lambda: view(request, *args, **kwargs)),
+                                   thread_sensitive=False)()
+    return async_view
+
+
+@require_http_methods(["GET"])
+async def traffic_segments_api(request):
+    """Async views.traffic_segments_api; the features are read with the async ORM."""
+    debug_info = new_debug_info()
+
+    # --- 1. Snapshot index state ---
+    version = await sync_to_async(snapshot_index_state)(debug_info)
+    if version is None:
+        return no_data_response(debug_info)
+
+    datetime_param = request.GET.get('datetime', None)
+    cache_key = (version, datetime_param, wants_binary(request)) + tuple(
+        request.GET.get(param_name) for param_name in SEGMENT_FILTER_PARAMS)
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    # --- 2. Resolve the timestamps and filters against the in-process indexes ---
+    def resolve():
+        actual_data_timestamp = resolve_snapshot_timestamp(datetime_param, debug_info)
+        debug_info['current_data_timestamp'] = actual_data_timestamp.isoformat()
+        next_data_datetime = resolve_next_timestamp(actual_data_timestamp, debug_info)
+        filters, error_response = parse_segment_filters(request, debug_info)
+        if error_response is not None:
+            return None, error_response
+        # A whole recent snapshot comes from the shared hot store without a query
+        published_rows = published_feature_rows(actual_data_timestamp) if not filters else None
+        return (actual_data_timestamp, snapshot_metadata(actual_data_timestamp, next_data_datetime),
+                filters, published_rows), None
+
+    with metrics.phase('resolve'):
+        resolved, error_response = await sync_to_async(resolve)()
+    if error_response is not None:
+        return error_response
+    actual_data_timestamp, metadata, filters, published_rows = resolved
+
+    # --- 3. Fetch the snapshot's features ---
+    last_updated = actual_data_timestamp.isoformat()
+    if published_rows is not None:
+        rows = aiterate_rows(published_rows)
+    else:
+        rows = aiterate(snapshot_feature_rows(actual_data_timestamp, filters))
+
+    if wants_binary(request):
+        with metrics.phase('fetch'):
+            rows = [row async for row in rows]
+        debug_info['returned_features'] = len(rows)
+        body = binary_feature_rows(rows, {"metadata": metadata, "debug": debug_info})
+        return (await cache_binary(cache_key, body)).as_response(request)
+
+    if wants_stream(request):
+        async def counted_features():
+            async for row in rows:
+                debug_info['returned_features'] += 1
+                yield snapshot_feature(row, last_updated)
+
+        return async_streaming_json_response(
+            {"type": "FeatureCollection"}, "features", counted_features(),
+            lambda: {"metadata": metadata, "debug": debug_info})
+
+    with metrics.phase('fetch'):
+        features = [snapshot_feature(row, last_updated) async for row in rows]
+    debug_info['returned_features'] = len(features)
+
+    geojson_data = {
+        "type": "FeatureCollection",
+        "features": features,
+        "metadata": metadata,
+        "debug": debug_info
+    }
+
+    return (await cache_response(cache_key, geojson_data)).as_response(request)
+
+
+@require_http_methods(["GET"])
+async def traffic_geometry_api(request):
+    """Async views.traffic_geometry_api; the segment index and the geometry query run concurrently."""
+    version = await sync_to_async(lambda: snapshot_timestamps.version)()
+    cache_key = ('geometry', version, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    if wants_binary(request):
+        (segments_state,), segments = await asyncio.gather(
+            run_concurrently(segment_index.current),
+            aiterate_list(TrafficSegment.objects.order_by('segment_id').values_list(*SEGMENT_FIELDS)))
+        body = snapshot_binary.encode_segment_rows(
+            segments, {"metadata": {"segments_version": segments_state[2], "segment_count": len(segments)}})
+        return (await cache_binary(cache_key, body)).as_response(request)
+
+    async def features():
+        return [
+            {
+                "type": "Feature",
+                "properties": segment_properties(segment),
+                "geometry": segment_geometry(segment)
+            }
+            async for segment in TrafficSegment.objects.order_by('segment_id')
+        ]
+
+    (segments_state,), geometry = await asyncio.gather(run_concurrently(segment_index.current), features())
+    _, _, segments_version = segments_state
+
+    geojson_data = {
+        "type": "FeatureCollection",
+        "features": geometry,
+        "metadata": {
+            "segments_version": segments_version,
+            "segment_count": len(geometry),
+        },
+    }
+
+    return (await cache_response(cache_key, geojson_data)).as_response(request)
+
+
+@require_http_methods(["GET"])
+async def traffic_speeds_api(request):
+    """Async views.traffic_speeds_api; with base, both speed vectors are read concurrently."""
+    debug_info = new_debug_info()
+
+    version = await sync_to_async(snapshot_index_state)(debug_info)
+    if version is None:
+        return no_data_response(debug_info)
+
+    datetime_param = request.GET.get('datetime', None)
+    base_param = request.GET.get('base', None)
+
+    cache_key = ('speeds', version, datetime_param, base_param, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    def resolve():
+        actual_data_timestamp = resolve_snapshot_timestamp(datetime_param, debug_info)
+        debug_info['current_data_timestamp'] = actual_data_timestamp.isoformat()
+        next_data_datetime = resolve_next_timestamp(actual_data_timestamp, debug_info)
+        base_timestamp = None
+        if base_param and not wants_binary(request):  # Binary responses always carry the full vector
+            base_timestamp = resolve_snapshot_timestamp(base_param, debug_info, param_name='base')
+        return actual_data_timestamp, next_data_datetime, base_timestamp, segment_index.current()
+
+    with metrics.phase('resolve'):
+        actual_data_timestamp, next_data_datetime, base_timestamp, (_, positions, segments_version) = \
+            await sync_to_async(resolve)()
+
+    timestamps = [actual_data_timestamp] + ([base_timestamp] if base_timestamp else [])
+    with metrics.phase('fetch'):
+        speeds, *base_speeds = await run_concurrently(
+            *(lambda timestamp=timestamp: snapshot_speed_vector(timestamp, positions, segments_version) for timestamp in timestamps))
+
+    speed_data = {
+        "segments_version": segments_version,
+        "metadata": snapshot_metadata(actual_data_timestamp, next_data_datetime),
+        "debug": debug_info
+    }
+
+    if wants_binary(request):
+        debug_info['returned_features'] = len(speeds)
+        body = snapshot_binary.encode_snapshot(speed_data, speed_frames=[speeds])
+        return (await cache_binary(cache_key, body)).as_response(request)
+
+    changed = None
+    if base_speeds:
+        changed = changed_positions(speeds, base_speeds[0])
+        speed_data["metadata"]["base_timestamp"] = base_timestamp.isoformat()
+
+    if changed is not None:
+        speed_data["changes"] = {
+            "positions": changed,
+            "speeds": [speeds[position] for position in changed],
+        }
+        debug_info['returned_features'] = len(changed)
+    else:
+        speed_data["speeds"] = speeds
+        debug_info['returned_features'] = len(speeds)
+
+    return (await cache_response(cache_key, speed_data)).as_response(request)
+
+
+@require_http_methods(["GET"])
+async def traffic_range_api(request):
+    """Async views.traffic_range_api; the window's observations are read with the async ORM."""
+    debug_info = new_debug_info()
+
+    version = await sync_to_async(snapshot_index_state)(debug_info)
+    if version is None:
+        return no_data_response(debug_info)
+
+    start_param = request.GET.get('start', None)
+    end_param = request.GET.get('end', None)
+    count_param = request.GET.get('count', None)
+
+    cache_key = ('range', version, start_param, end_param, count_param, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    # --- 1. Resolve the window of snapshot timestamps ---
+    def resolve():
+        return resolve_range_window(start_param, end_param, count_param, debug_info) + (segment_index.current(),)
+
+    with metrics.phase('resolve'):
+        frames, metadata, (_, positions, segments_version) = await sync_to_async(resolve)()
+
+    # --- 2. Fetch every observation in the window with one range query ---
+    async def speed_rows():
+        builder = SpeedRowBuilder(frames, positions)
+        async for observation in aiterate(speed_observations(frames)):
+            for row in builder.add(*observation):
+                yield row
+        for row in builder.finish():
+            yield row
+
+    debug_info['returned_features'] = len(positions)
+
+    head = {
+        "segments_version": segments_version,
+        "timestamps": [timestamp.isoformat() for timestamp in frames],
+    }
+
+    if wants_binary(request):
+        with metrics.phase('fetch'):
+            rows = [row async for row in speed_rows()]
+        body = binary_speed_rows(rows, len(frames), dict(head, metadata=metadata, debug=debug_info))
+        return (await cache_binary(cache_key, body)).as_response(request)
+
+    if wants_stream(request):
+        return async_streaming_json_response(
+            head, "speeds", speed_rows(), lambda: {"metadata": metadata, "debug": debug_info})
+
+    with metrics.phase('fetch'):
+        rows = [row async for row in speed_rows()]
+    range_data = dict(head, speeds=rows, metadata=metadata, debug=debug_info)
+
+    return (await cache_response(cache_key, range_data)).as_response(request)
+
+
+@require_http_methods(["GET"])
+async def traffic_series_api(request):
+    """Async views.traffic_series_api; the range scan and the segment existence check run concurrently."""
+    debug_info = new_debug_info()
+
+    version = await sync_to_async(snapshot_index_state)(debug_info)
+    if version is None:
+        return no_data_response(debug_info)
+
+    # --- 1. Requested segments ---
+    requested_ids, error_response = parse_series_segment_ids(request, debug_info)
+    if error_response is not None:
+        return error_response
+
+    start_param = request.GET.get('start', None)
+    end_param = request.GET.get('end', None)
+    bucket_param = request.GET.get('bucket', None)
+
+    cache_key = ('series', version, tuple(requested_ids), start_param, end_param, bucket_param)
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    # --- 2. Time range, bucket size and the shared time axis ---
+    with metrics.phase('resolve'):
+        axis, error_response = await sync_to_async(resolve_series_axis)(
+            start_param, end_param, bucket_param, debug_info)
+    if error_response is not None:
+        return error_response
+    start_datetime, end_datetime = axis[:2]
+
+    # --- 3. The indexed range scan, alongside the lookups of which requested segments exist and of their rollups ---
+    async def series():
+        points = {}
+        observations = segment_series_observations(requested_ids, start_datetime, end_datetime)
+        async for segment_id, recorded_at, current_speed in aiterate(observations):
+            points.setdefault(segment_id, []).append((recorded_at, current_speed))
+        return points
+
+    with metrics.phase('fetch'):
+        (known_ids, rollups), points = await asyncio.gather(
+            run_concurrently(
+                lambda: set(TrafficSegment.objects.filter(
+                    segment_id__in=requested_ids).values_list('segment_id', flat=True)),
+                lambda: series_rollups(requested_ids, axis)),
+            series())
+        series_rows = {segment_id: series_speeds(points.get(segment_id, ()), axis, rollups.get(segment_id, ()))
+                       for segment_id in points.keys() | rollups.keys()}
+
+    return (await cache_response(
+        cache_key, series_data(requested_ids, series_rows, known_ids | set(series_rows), axis, debug_info)
+    )).as_response(request)
+
+
+# Summary lookups and tile rendering are small, bounded queries; run them off the sync thread as they are
+traffic_congestion_api = in_worker_thread(views.traffic_congestion_api)
+traffic_congestion_index_api = in_worker_thread(views.traffic_congestion_index_api)
+traffic_tiles_api = in_worker_thread(views.traffic_tiles_api)
+traffic_events_api = in_worker_thread(views.traffic_events_api)
+# Playback is interpolation over cached snapshot arrays, with at most one query for the ones not cached
+traffic_playback_api = in_worker_thread(views.traffic_playback_api)
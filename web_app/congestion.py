@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from web_app.models import CongestionSummary, TrafficSegmentData
+
+# Speed bands of the map legend (see getSpeedColor in map_page.js)
+HEAVY_CONGESTION_SPEED = 15  # mph; red
+CONGESTION_SPEED = 25  # mph; red or orange, counted as congested
+WORST_SEGMENT_COUNT = 5  # Slowest segments listed per summary
+
+
+def build_summary(recorded_at, street, direction, segments):
+    """
+    One unsaved CongestionSummary from `segments`, a list of (segment_id, current_speed, length).
+    """
+    reporting = [(segment_id, speed, length) for segment_id, speed, length in segments if speed >= 0]
+    total_length = sum(length for _, _, length in reporting)
+    summary = CongestionSummary(
+        recorded_at=recorded_at,
+        street=street,
+        direction=direction,
+        segment_count=len(segments),
+        reporting_count=len(reporting),
+        reporting_length=round(total_length, 3),
+    )
+    if not reporting:
+        return summary
+
+    count = len(reporting)
+    if total_length > 0:
+        summary.mean_speed = round(sum(speed * length for _, speed, length in reporting) / total_length, 2)
+        summary.congestion_index = round(
+            sum(length for _, speed, length in reporting if speed < CONGESTION_SPEED) / total_length, 4)
+    else:
+        summary.mean_speed = round(sum(speed for _, speed, _ in reporting) / count, 2)
+    summary.share_below_15 = round(sum(1 for _, speed, _ in reporting if speed < HEAVY_CONGESTION_SPEED) / count, 4)
+    summary.share_below_25 = round(sum(1 for _, speed, _ in reporting if speed < CONGESTION_SPEED) / count, 4)
+    summary.worst_segments = [
+        {"segment_id": segment_id, "speed": speed}
+        for segment_id, speed, _ in sorted(reporting, key=lambda entry: (entry[1], entry[0]))[:WORST_SEGMENT_COUNT]
+    ]
+    return summary
+
+
+def summarize_snapshot(recorded_at):
+    """
+    (Re)compute the city-wide and per-corridor CongestionSummary rows of one snapshot.
+    One query reads the snapshot; call it inside the transaction that wrote the snapshot.
+    Returns the number of summary rows written.
+    """
+    observations = TrafficSegmentData.objects.filter(recorded_at=recorded_at).values_list(
+        'segment_id', 'current_speed', 'segment__street', 'segment__direction', 'segment__length')
+
+    city = []
+    corridors = defaultdict(list)
+    for segment_id, current_speed, street, direction, length in observations:
+        entry = (segment_id, current_speed, length or 0.0)
+        city.append(entry)
+        corridors[(street or '', direction or '')].append(entry)
+
+    summaries = []
+    if city:
+        summaries.append(build_summary(recorded_at, '', '', city))
+        summaries.extend(build_summary(recorded_at, street, direction, segments)
+                         for (street, direction), segments in sorted(corridors.items()))
+
+    CongestionSummary.objects.filter(recorded_at=recorded_at).delete()
+    CongestionSummary.objects.bulk_create(summaries)
+    return len(summaries)
@@ -0,0 +1,149 @@
+"""
+Data-quality checks the importer runs on every parsed snapshot before writing it.
+
+The parsers already skip rows that do not convert (traffic_csv.MISSING_FIELD and
+INVALID_VALUE). The checks here catch rows that convert but cannot be right:
+- INVALID_VALUE: a negative segment_id (vector tile feature ids are unsigned), or a NaN or
+  infinite length;
+- OUT_OF_BOUNDS: an endpoint outside TRAFFIC_IMPORT_BOUNDS (west, south, east, north), or
+  not a finite number;
+- INVALID_SPEED: a speed below -1 or above TRAFFIC_IMPORT_MAX_SPEED;
+- GEOMETRY_DRIFT: an endpoint more than TRAFFIC_IMPORT_MAX_GEOMETRY_DRIFT metres from the
+  segment's stored geometry, which would otherwise move the segment on the map (None: off);
+- DUPLICATE_SEGMENT: a segment_id the snapshot already listed; the first valid row is kept.
+Each check first scans whole columns of the parsed file with C-level functions (math.isfinite,
+min, max, set, list equality) and only walks the rows of a column that has a failing value, so
+a clean file costs a few column scans, and a dirty one no exception or stderr line per bad row.
+
+Rejected rows are not written. The importer stores them in QuarantinedRow with their reason,
+and the per-file counts in the ImportedFile ledger together with rows_no_speed, the rows kept
+with the feed's -1 "no estimate" speed.
+"""
+import math
+
+from django.conf import settings
+
+from web_app.models import QuarantinedRow
+from web_app.traffic_csv import SEGMENT_FIELDS
+
+DEFAULT_BOUNDS = (-88.5, 41.4, -87.3, 42.4)  # The Chicago area with a wide margin
+METRES_PER_DEGREE = 111_320  # Of latitude, and of longitude at the equator
+
+
+def geometry_drift(coordinates, known):
+    """Largest distance in metres between matching endpoints of two (lon, lat, lon, lat) geometries."""
+    scale = math.cos(math.radians(known[1]))  # Degrees of longitude shrink away from the equator
+    return METRES_PER_DEGREE * max(
+        math.hypot((coordinates[0] - known[0]) * scale, coordinates[1] - known[1]),
+        math.hypot((coordinates[2] - known[2]) * scale, coordinates[3] - known[3]),
+    )
+
+
+def _outside(values, low, high):
+    """
+    Indexes of `values` outside low..high or not finite; a clean column costs one isfinite()
+    pass, one min() and one max(). NaN compares false both ways, so min() and max() alone could
+    step over it, and the database would store it as NULL.
+    """
+    if not values or (all(map(math.isfinite, values)) and low <= min(values) and max(values) <= high):
+        return []
+    return [index for index, value in enumerate(values) if not (math.isfinite(value) and low <= value <= high)]
+
+
+def validate_snapshot(parsed, known_geometry):
+    """
+    Check one parse result in place. Rows failing a check move from parsed['segments'] and
+    parsed['speeds'] to parsed['rejected'] (row number None, reason, message, fields) and
+    count as skipped. Adds parsed['quality']: {'no_speed': rows kept without a speed estimate,
+    'rejected': {reason: rows}}, including the rows the parser rejected.
+
+    `known_geometry` maps segment_id -> (start_lon, start_lat, end_lon, end_lat) as stored.
+    """
+    west, south, east, north = getattr(settings, 'TRAFFIC_IMPORT_BOUNDS', DEFAULT_BOUNDS)
+    max_speed = getattr(settings, 'TRAFFIC_IMPORT_MAX_SPEED', 120)
+    max_drift = getattr(settings, 'TRAFFIC_IMPORT_MAX_GEOMETRY_DRIFT', 250)
+    segments = parsed['segments']
+    speeds = [speed for _, speed in parsed['speeds']]
+    if not segments:
+        segment_ids = lengths = start_lons = start_lats = end_lons = end_lats = ()
+    else:
+        # The columns of the parsed rows
+        segment_ids, _, _, _, _, lengths, _, _, start_lons, start_lats, end_lons, end_lats = zip(*segments)
+
+    failures = {}  # Row index -> (reason, message); the first failing check wins
+    for index in _outside(segment_ids, 0, math.inf):
+        failures[index] = (QuarantinedRow.INVALID_VALUE, f"Segment id {segment_ids[index]} is negative.")
+    for index in _outside(lengths, -math.inf, math.inf):
+        failures.setdefault(index, (QuarantinedRow.INVALID_VALUE, f"Length {lengths[index]} is not a finite number."))
+    out_of_bounds = set()
+    for longitudes in (start_lons, end_lons):
+        out_of_bounds.update(_outside(longitudes, west, east))
+    for latitudes in (start_lats, end_lats):
+        out_of_bounds.update(_outside(latitudes, south, north))
+    for index in sorted(out_of_bounds - failures.keys()):
+        failures[index] = (QuarantinedRow.OUT_OF_BOUNDS, f"Coordinates {list(segments[index][8:12])} outside the bounds.")
+    for index in _outside(speeds, -1, max_speed):
+        failures.setdefault(index, (QuarantinedRow.INVALID_SPEED, f"Speed {speeds[index]} outside -1..{max_speed}."))
+    if max_drift is not None and known_geometry:
+        # Unchanged geometry compares equal (new segments are compared with themselves); only
+        # moved segments get their drift measured
+        coordinates = list(zip(start_lons, start_lats, end_lons, end_lats))
+        stored = list(map(known_geometry.get, segment_ids, coordinates))
+        if coordinates != stored:
+            for index, (moved, known) in enumerate(zip(coordinates, stored)):
+                if moved == known or index in failures:
+                    continue
+                drift = geometry_drift(moved, known)
+                if not drift <= max_drift:  # NaN drift fails too
+                    failures[index] = (QuarantinedRow.GEOMETRY_DRIFT,
+                                       f"Endpoint moved {drift:.0f} m from the stored geometry {list(known)}.")
+    # Only valid rows claim a segment_id, so a bad row cannot shadow a good one after it
+    if len(set(segment_ids)) < len(segment_ids):
+        seen = set()
+        for index, segment_id in enumerate(segment_ids):
+            if index in failures:
+                continue
+            if segment_id in seen:
+                failures[index] = (QuarantinedRow.DUPLICATE_SEGMENT, f"Segment {segment_id} is listed more than once.")
+            seen.add(segment_id)
+
+    if failures:
+        for index in sorted(failures):
+            reason, message = failures[index]
+            fields = dict(zip(SEGMENT_FIELDS, segments[index]), current_speed=speeds[index])
+            parsed['rejected'].append((None, reason, message, fields))
+        parsed['segments'] = [segment for index, segment in enumerate(segments) if index not in failures]
+        parsed['speeds'] = [pair for index, pair in enumerate(parsed['speeds']) if index not in failures]
+        parsed['skipped'] += len(failures)
+
+    rejected = {}
+    for _, reason, _, _ in parsed['rejected']:
+        rejected[reason] = rejected.get(reason, 0) + 1
+    parsed['quality'] = {
+        'no_speed': sum(1 for _, speed in parsed['speeds'] if speed == -1),
+        'rejected': rejected,
+    }
+    return parsed
+
+
+def quarantined_rows(parsed, recorded_at):
+    """QuarantinedRow instances for parsed['rejected'], ready for bulk_create."""
+    rows = []
+    for row_number, reason, message, values in parsed['rejected']:
+        segment_id = values.get('segment_id', values.get('SEGMENTID'))
+        try:
+            segment_id = int(segment_id) if segment_id not in (None, '') else None
+        except ValueError:
+            segment_id = None  # The unparsable id is what got the row rejected
+        rows.append(QuarantinedRow(
+            filename=parsed['filename'],
+            recorded_at=recorded_at,
+            row_number=row_number,
+            segment_id=segment_id,
+            reason=reason,
+            detail=message,
+            # JSON has no NaN or Infinity; keep them as the text the file had
+            values={name: str(value) if isinstance(value, float) and not math.isfinite(value) else value
+                    for name, value in values.items()},
+        ))
+    return rows
@@ -0,0 +1,67 @@
+"""
+Database router that serves the traffic API's reads from a read-only connection.
+
+With the production profiles (Traffic_sample/settings_production.py and
+settings_production_postgresql.py) DATABASES has two aliases: 'default', the primary the
+importer writes to, and TRAFFIC_READ_DATABASE ('replica'), a read-only connection to the
+same SQLite file or a PostgreSQL standby. Reads of web_app models go to the replica, so
+API requests never queue behind the importer's write transactions.
+
+Reads stay on the primary:
+- inside a transaction on the primary, so code that writes sees its own changes;
+- inside `primary_reads()`, which the management commands that write use, so they
+  never act on a replica that is behind (a PostgreSQL standby can lag);
+- for other apps (auth, sessions, admin), whose reads usually follow their own writes.
+
+Settings:
+- TRAFFIC_READ_DATABASE (default 'replica'): alias used for reads. Without such an alias
+  in DATABASES the router does nothing, so it is safe to list with a single database.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_primary_reads = contextvars.ContextVar('traffic_primary_reads', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Send every read in the enclosed block (and the threads it starts through asgiref) to the primary."""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def read_database():
+    """The read alias, or None when DATABASES has no such alias."""
+    alias = getattr(settings, 'TRAFFIC_READ_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+class TrafficReadRouter:
+    app_label = 'web_app'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label or _primary_reads.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # Read your own writes
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, read_database()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The schema comes from the primary
+        return False if db == read_database() else None
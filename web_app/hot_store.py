@@ -0,0 +1,155 @@
+"""
+Hot snapshot store: the latest snapshots in one memory-mapped file shared by every worker.
+
+Every API worker asks for the same few recent snapshots, and without this each one reads
+them from the database and keeps its own decoded copy. The importer instead publishes the
+latest TRAFFIC_HOT_STORE_SNAPSHOTS snapshots to TRAFFIC_HOT_STORE_PATH after each import,
+as one TSNP buffer (web_app/snapshot_binary.py): segment ids, segment geometry and one int8
+speed frame per snapshot, aligned to segment_index order. Workers map the file read-only
+and view the frames in place, so the operating system keeps a single copy in its page
+cache for all processes. Put the file on a RAM-backed filesystem (e.g. /dev/shm on Linux)
+to keep it off the disk altogether.
+
+The file is replaced atomically (write, then rename), never changed in place. A worker
+notices the new file with one stat() per lookup and maps it; readers of the old mapping
+keep a consistent view until they let it go. Lookups that the store cannot answer, because
+the snapshot is older, the segment set changed or no store is configured, return None and
+the caller reads the database as before.
+
+Settings:
+- TRAFFIC_HOT_STORE_PATH (default None: disabled): file the importer publishes to.
+- TRAFFIC_HOT_STORE_SNAPSHOTS (default 12, one hour): latest snapshots kept in it.
+"""
+import os
+import threading
+from datetime import datetime
+
+from django.conf import settings
+
+from web_app.models import TrafficSegment, TrafficSegmentData
+from web_app.segment_index import segments_version
+from web_app.snapshot_binary import MAX_SPEED, encode_snapshot, read_archive
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class PublishedSnapshots:
+    """One mapping of the store file: speed frames by recorded_at, viewing the mapping in place."""
+
+    def __init__(self, decoded):
+        metadata = decoded['metadata']
+        self.segments_version = metadata['segments_version']
+        self.segment_ids = decoded['segment_ids']
+        self.coordinates = decoded['coordinates']  # Flat: start_lon, start_lat, end_lon, end_lat per segment
+        self.frames = {
+            datetime.fromisoformat(timestamp): speeds
+            for timestamp, speeds in zip(metadata['timestamps'], decoded['speeds'])
+        }
+
+
+class HotSnapshotStore:
+    """
+    Reader (API workers) and writer (importer) of the hot snapshot file.
+    Each worker keeps the current mapping and swaps it when the file is replaced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._published = None
+
+    @property
+    def path(self):
+        path = getattr(settings, 'TRAFFIC_HOT_STORE_PATH', None)
+        return os.fspath(path) if path else None
+
+    @property
+    def max_snapshots(self):
+        return getattr(settings, 'TRAFFIC_HOT_STORE_SNAPSHOTS', 12)
+
+    # --- reading ---
+
+    def current(self):
+        """The published snapshots, remapped if the importer replaced the file; None without a store."""
+        path = self.path
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        with self._lock:
+            if signature != self._signature:
+                published = None
+                if signature is not None:
+                    try:
+                        published = PublishedSnapshots(read_archive(path))
+                    except (OSError, ValueError, KeyError):
+                        published = None  # Unreadable or from another version; use the database
+                # Views handed out earlier keep the old mapping alive until they are dropped
+                self._published = published
+                self._signature = signature
+            return self._published
+
+    def speeds(self, recorded_at, version):
+        """
+        int8 speeds of the snapshot at recorded_at aligned to the segment list with `version`
+        (snapshot_binary.NO_OBSERVATION where a segment has no observation), viewing the
+        mapping in place, or None when the store does not hold that snapshot.
+        """
+        published = self.current()
+        if published is None or published.segments_version != version:
+            return None
+        return published.frames.get(recorded_at)
+
+    # --- publishing ---
+
+    def publish(self):
+        """
+        Write the latest snapshots from the database to the store file and return how many it
+        holds (None without a store). Called by the importer once its snapshots are committed.
+        """
+        path = self.path
+        if path is None:
+            return None
+        timestamps = snapshot_timestamps.timestamps()[-self.max_snapshots:] if self.max_snapshots > 0 else []
+        if not timestamps:
+            if os.path.exists(path):
+                os.remove(path)
+            return 0
+
+        segments = list(TrafficSegment.objects.order_by('segment_id').values_list(
+            'segment_id', 'start_longitude', 'start_latitude', 'end_longitude', 'end_latitude'))
+        positions = {segment[0]: position for position, segment in enumerate(segments)}
+        columns = {timestamp: column for column, timestamp in enumerate(timestamps)}
+        frames = [[None] * len(segments) for _ in timestamps]
+        observations = TrafficSegmentData.objects.filter(recorded_at__in=timestamps).values_list(
+            'recorded_at', 'segment_id', 'current_speed')
+        for recorded_at, segment_id, current_speed in observations.iterator(chunk_size=2000):
+            frames[columns[recorded_at]][positions[segment_id]] = current_speed
+
+        # Frames hold int8 speeds; a snapshot with a faster one (a feed glitch) stays in the database
+        kept = [column for column, frame in enumerate(frames)
+                if all(speed is None or speed <= MAX_SPEED for speed in frame)]
+        ids = [segment[0] for segment in segments]
+        body = encode_snapshot(
+            {'timestamps': [timestamps[column].isoformat() for column in kept], 'segments_version': segments_version(ids)},
+            segment_ids=ids,
+            coordinates=[segment[1:] for segment in segments],
+            speed_frames=[frames[column] for column in kept],
+            double_precision=True,
+        )
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(body)
+        os.replace(temporary_path, path)  # Readers see the old file or the new one, never half of it
+        return len(kept)
+
+
+# Shared by the API views and the importer
+hot_snapshots = HotSnapshotStore()
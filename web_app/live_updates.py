@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from web_app.models import TrafficSegmentData
+from web_app.timestamp_index import snapshot_timestamps
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 16  # Events buffered per client before it is told to resync
+
+
+def sse_message(event, data, event_id=None):
+    """Encode one Server-Sent Events message."""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')))
+    return ("\n".join(lines) + "\n\n").encode('utf-8')
+
+
+class LiveBroker:
+    """
+    Fans live snapshot events out to the clients subscribed in this process.
+
+    Backends implement publish() and subscribe(); TRAFFIC_LIVE_BROKER names the class to use.
+    InProcessBroker is enough for a single server process. A multi-node deployment can plug
+    in a backend built on a shared pub/sub channel (e.g. Redis) with the same two methods.
+    """
+
+    def publish(self, event):
+        """Deliver `event` (an (event name, data) pair) to every subscriber. Callable from any thread."""
+        raise NotImplementedError
+
+    def subscribe(self, keepalive):
+        """
+        Async iterator of events for one client. Yields None after `keepalive` seconds
+        without an event, so the caller can keep the connection open through proxies.
+        """
+        raise NotImplementedError
+
+
+class InProcessBroker(LiveBroker):
+    """One asyncio queue per subscriber; publish() hands each event to the subscriber's event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()  # (event loop, queue)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                pass  # The subscriber's loop has closed; its generator will unsubscribe
+
+    @staticmethod
+    def _deliver(queue, event):
+        if queue.full():
+            # The client is not keeping up; drop what it has not read and have it reload once
+            while not queue.empty():
+                queue.get_nowait()
+            event = ('resync', {})
+        queue.put_nowait(event)
+
+    async def subscribe(self, keepalive):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+class SnapshotWatcher:
+    """
+    Background thread that notices new snapshots and publishes one event per snapshot.
+
+    The importer runs in its own process, so each server process checks for a newer
+    recorded_at every TRAFFIC_LIVE_POLL_INTERVAL seconds (one indexed query, however many
+    clients are connected) and publishes build_event(previous, latest) when it finds one.
+    """
+
+    def __init__(self, broker, build_event):
+        self.broker = broker
+        self.build_event = build_event
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='traffic-snapshot-watcher', daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def latest_recorded_at():
+        close_old_connections()
+        return TrafficSegmentData.objects.order_by('-recorded_at').values_list('recorded_at', flat=True).first()
+
+    def _run(self):
+        interval = getattr(settings, 'TRAFFIC_LIVE_POLL_INTERVAL', 2.0)
+        last_seen = None
+        while True:
+            try:
+                latest = self.latest_recorded_at()
+                if last_seen is not None and latest is not None and latest > last_seen:
+                    # Let this process's indexes and response caches pick the snapshot up now
+                    snapshot_timestamps.invalidate()
+                    self.broker.publish(self.build_event(last_seen, latest))
+                if latest is not None:
+                    last_seen = latest
+            except Exception:
+                logger.exception("Live snapshot watcher failed; retrying")
+            time.sleep(interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def live_broker():
+    """The process-wide broker, an instance of the TRAFFIC_LIVE_BROKER class."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'TRAFFIC_LIVE_BROKER', 'web_app.live_updates.InProcessBroker'))()
+        return _broker
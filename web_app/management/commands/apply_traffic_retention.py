@@ -0,0 +1,155 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from web_app.models import CongestionSummary, TrafficSegmentData, TrafficSegmentRollup
+from web_app.db_router import primary_reads
+from web_app.timestamp_index import snapshot_timestamps
+
+ROLLUP_TRUNCATIONS = {
+    TrafficSegmentRollup.HOUR: TruncHour,
+    TrafficSegmentRollup.DAY: TruncDay,
+}
+
+
+class Command(BaseCommand):
+    help = ('Downsamples raw 5-minute traffic observations older than the retention window into hourly and '
+            'daily rollups (mean/min/max speed per segment), then drops the raw rows and per-corridor '
+            'congestion summaries, one day at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--raw_days',
+            type=int,
+            default=getattr(settings, 'TRAFFIC_RAW_RETENTION_DAYS', 30),
+            help='Keep raw observations for this many days (default: TRAFFIC_RAW_RETENTION_DAYS or 30).',
+        )
+        parser.add_argument(
+            '--hourly_days',
+            type=int,
+            default=getattr(settings, 'TRAFFIC_HOURLY_RETENTION_DAYS', 365),
+            help='Keep hourly rollups for this many days; daily rollups are kept forever '
+                 '(default: TRAFFIC_HOURLY_RETENTION_DAYS or 365).',
+        )
+        parser.add_argument(
+            '--dry_run',
+            action='store_true',
+            help='Report which days would be rolled up and dropped without changing anything.',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Run VACUUM afterwards so SQLite returns the freed pages to the file system.',
+        )
+
+    @primary_reads()  # Never act on a replica that is behind the primary
+    def handle(self, *args, **options):
+        raw_days = options['raw_days']
+        hourly_days = options['hourly_days']
+        dry_run = options['dry_run']
+
+        if raw_days < 1 or hourly_days < raw_days:
+            raise CommandError("--raw_days must be at least 1 and --hourly_days at least --raw_days")
+
+        # Whole UTC days only, so a day is always rolled up and dropped in one go
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        raw_cutoff = today - timedelta(days=raw_days)
+        hourly_cutoff = today - timedelta(days=hourly_days)
+
+        self.stdout.write(f"Rolling up and dropping raw observations before {raw_cutoff:%Y-%m-%d}"
+                          + (" (dry run)" if dry_run else ""))
+        started = time.perf_counter()
+        days = 0
+        dropped_rows = 0
+
+        day_start = self.next_day_with_data(None, raw_cutoff)
+        while day_start is not None:
+            day_end = day_start + timedelta(days=1)
+            observations = TrafficSegmentData.objects.filter(recorded_at__gte=day_start, recorded_at__lt=day_end)
+
+            if dry_run:
+                self.stdout.write(f"Would roll up {day_start:%Y-%m-%d}: {observations.count()} raw rows")
+            else:
+                # Rollups and the raw delete commit together, so a day is never half processed
+                with transaction.atomic():
+                    rollups = self.write_rollups(observations)
+                    deleted, _ = observations.delete()
+                    # Corridor summaries go with the raw data; the city-wide rows are the long-term
+                    # congestion index and are kept
+                    CongestionSummary.objects.filter(
+                        recorded_at__gte=day_start, recorded_at__lt=day_end).exclude(street='').delete()
+                dropped_rows += deleted
+                self.stdout.write(f"Rolled up {day_start:%Y-%m-%d}: {rollups} rollup rows, "
+                                  f"{deleted} raw rows dropped")
+            days += 1
+            day_start = self.next_day_with_data(day_end, raw_cutoff)
+
+        expired_hourly = TrafficSegmentRollup.objects.filter(
+            period=TrafficSegmentRollup.HOUR, period_start__lt=hourly_cutoff)
+        if dry_run:
+            self.stdout.write(f"Would drop {expired_hourly.count()} hourly rollups before {hourly_cutoff:%Y-%m-%d}")
+        else:
+            deleted, _ = expired_hourly.delete()
+            self.stdout.write(f"Dropped {deleted} hourly rollups before {hourly_cutoff:%Y-%m-%d}")
+
+            if days or deleted:
+                # The oldest snapshots are gone; let the API stop offering them, and drop series
+                # responses resampled from the rollups
+                snapshot_timestamps.invalidate()
+
+            if options['vacuum']:
+                self.vacuum()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {days} days, dropped {dropped_rows} raw rows in {time.perf_counter() - started:.2f}s."))
+
+    def next_day_with_data(self, after, before):
+        """Start of the first UTC day at or after `after` (None for the beginning) that has raw rows before `before`."""
+        observations = TrafficSegmentData.objects.filter(recorded_at__lt=before)
+        if after is not None:
+            observations = observations.filter(recorded_at__gte=after)
+        first = observations.order_by('recorded_at').values_list('recorded_at', flat=True).first()
+        if first is None:
+            return None
+        return first.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def write_rollups(self, observations):
+        """Upsert hourly and daily rollups for `observations`; return the number of rollup rows written."""
+        rollups = []
+        for period, truncate in ROLLUP_TRUNCATIONS.items():
+            rows = (
+                observations
+                .filter(current_speed__gte=0)  # -1 means the feed had no estimate
+                .annotate(period_start=truncate('recorded_at'))
+                .values('segment_id', 'period_start')
+                .annotate(
+                    sample_count=Count('id'),
+                    mean_speed=Avg('current_speed'),
+                    min_speed=Min('current_speed'),
+                    max_speed=Max('current_speed'),
+                )
+                .order_by()
+            )
+            rollups.extend(TrafficSegmentRollup(period=period, **row) for row in rows)
+
+        # Upsert, so re-running after an interrupted run cannot create duplicates
+        TrafficSegmentRollup.objects.bulk_create(
+            rollups,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=['segment', 'period', 'period_start'],
+            update_fields=['sample_count', 'mean_speed', 'min_speed', 'max_speed'],
+        )
+        return len(rollups)
+
+    def vacuum(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.stdout.write(self.style.WARNING(f"VACUUM is not supported on {connection.vendor}; skipped."))
+            return
+        self.stdout.write("Running VACUUM...")
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
@@ -0,0 +1,95 @@
+import os
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.utils import timezone
+from web_app.models import TrafficSegmentData
+from web_app.snapshot_binary import archive_filename, encode_segment_rows
+from web_app.traffic_csv import SEGMENT_FIELDS
+
+# segment_id, current_speed, then the other SEGMENT_FIELDS from the joined segment
+ARCHIVE_COLUMNS = ('segment_id', 'current_speed') + tuple(f'segment__{field}' for field in SEGMENT_FIELDS[1:])
+
+
+class Command(BaseCommand):
+    help = ('Writes each stored snapshot to a compact binary archive (web_app/snapshot_binary.py) named like '
+            'its source CSV. import_traffic_data restores archives from --data_dir like CSV files, reading '
+            'them through a memory map.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output_dir',
+            type=str,
+            default=getattr(settings, 'TRAFFIC_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'web_app', 'archive')),
+            help='Directory the archives are written to (default: TRAFFIC_ARCHIVE_DIR or web_app/archive).',
+        )
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='ISO-formatted datetime of the first snapshot to archive (default: the oldest).',
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='ISO-formatted datetime of the last snapshot to archive (default: the latest).',
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Rewrite archives that already exist instead of skipping them.',
+        )
+
+    def parse_datetime(self, value, name):
+        if value is None:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError as e:
+            raise CommandError(f"Invalid --{name}: '{value}'. Error: {e}")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir']
+        start = self.parse_datetime(options['start'], 'start')
+        end = self.parse_datetime(options['end'], 'end')
+        os.makedirs(output_dir, exist_ok=True)
+
+        observations = TrafficSegmentData.objects.all()
+        if start is not None:
+            observations = observations.filter(recorded_at__gte=start)
+        if end is not None:
+            observations = observations.filter(recorded_at__lte=end)
+        timestamps = observations.order_by('recorded_at').values_list('recorded_at', flat=True).distinct()
+
+        started = time.perf_counter()
+        written = skipped = total_bytes = 0
+        for recorded_at in timestamps:
+            # Named in the time zone the importer reads CSV file names in, so restoring gives the same recorded_at
+            filename = archive_filename(timezone.make_naive(recorded_at))
+            path = os.path.join(output_dir, filename)
+            if os.path.exists(path) and not options['overwrite']:
+                skipped += 1
+                continue
+
+            rows = list(TrafficSegmentData.objects.filter(recorded_at=recorded_at).order_by(
+                'segment_id').values_list(*ARCHIVE_COLUMNS))
+            body = encode_segment_rows(
+                [(row[0],) + row[2:] for row in rows],
+                {"recorded_at": recorded_at.isoformat(), "segment_count": len(rows)},
+                speeds=[row[1] for row in rows],
+                double_precision=True,  # Restoring must give back the exact coordinates and lengths
+            )
+
+            # Write next to the target and rename, so a reader never sees a partial archive
+            temporary_path = path + '.tmp'
+            with open(temporary_path, 'wb') as file:
+                file.write(body)
+            os.replace(temporary_path, path)
+            written += 1
+            total_bytes += len(body)
+            self.stdout.write(f"Archived {filename}: {len(rows)} segments, {len(body) / 1024:.0f} KiB")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} archives ({total_bytes / 1e6:.1f} MB), skipped {skipped} existing, "
+            f"in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,115 @@
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from web_app.traffic_csv import FILENAME_PATTERN, PARSERS, parse_traffic_file
+
+SEGMENT_ID_STRIDE = 100000  # Offset added to SEGMENTID for each synthetic copy of the source rows
+
+
+class Command(BaseCommand):
+    help = ('Micro-benchmark of the import_traffic_data CSV parser backends on a bundled Chicago CSV '
+            'scaled up synthetically. Also checks that every backend returns the same rows and rejected rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data_dir',
+            type=str,
+            help='Directory containing the CSV files (default: web_app/data)',
+            default=os.path.join(settings.BASE_DIR, 'web_app', 'data')
+        )
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=50,
+            help='Number of copies of the source rows written to the synthetic file (default: 50).',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per backend; the fastest is reported (default: 5).',
+        )
+        parser.add_argument(
+            '--malformed_every',
+            type=int,
+            default=0,
+            help='Blank out or corrupt one row in every N to exercise the error-reporting path '
+                 '(default: 0, all rows valid).',
+        )
+
+    def handle(self, *args, **options):
+        data_dir = options['data_dir']
+        scale = options['scale']
+        repeat = options['repeat']
+        malformed_every = options['malformed_every']
+
+        if scale < 1 or repeat < 1 or malformed_every < 0:
+            raise CommandError("--scale and --repeat must be positive and --malformed_every must not be negative")
+
+        sources = sorted(name for name in os.listdir(data_dir) if FILENAME_PATTERN.match(name)) \
+            if os.path.isdir(data_dir) else []
+        if not sources:
+            raise CommandError(f"No Chicago congestion CSV files found in {data_dir}")
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, sources[0])
+            rows = self.write_synthetic_file(os.path.join(data_dir, sources[0]), path, scale, malformed_every)
+            self.stdout.write(f"Synthetic file: {rows:,} rows ({os.path.getsize(path) / 1e6:.1f} MB) "
+                              f"from {sources[0]} x {scale}")
+
+            results = {}
+            timings = {name: float('inf') for name in PARSERS}
+            # Interleave the backends and start each run from a collected heap, so they see the same conditions
+            for _ in range(repeat):
+                for name in sorted(PARSERS):
+                    results.pop(name, None)
+                    gc.collect()
+                    started = time.perf_counter()
+                    results[name] = parse_traffic_file(path, parser=name)
+                    timings[name] = min(timings[name], time.perf_counter() - started)
+
+        baseline = results['rows']
+        for name in sorted(PARSERS):
+            parsed = results[name]
+            matches = all(parsed[key] == baseline[key]
+                          for key in ('error', 'rows', 'skipped', 'segments', 'speeds', 'rejected'))
+            self.stdout.write(
+                f"{name:>9}: {timings[name] * 1000:8.1f} ms  "
+                f"{rows / timings[name]:>12,.0f} rows/sec  "
+                f"{timings['rows'] / timings[name]:5.2f}x  "
+                f"{parsed['skipped']} skipped  "
+                + (self.style.SUCCESS("output matches 'rows'") if matches
+                   else self.style.ERROR("OUTPUT DIFFERS from 'rows'")))
+
+    def write_synthetic_file(self, source_path, path, scale, malformed_every):
+        """Write `scale` copies of the source rows with distinct SEGMENTIDs; return the number of data rows."""
+        with open(source_path, mode='r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            source_rows = list(reader)
+        segment_col = [name.strip().upper() for name in header].index('SEGMENTID')
+        speed_col = [name.strip().upper() for name in header].index('CURRENT_SPEED')
+
+        randomizer = random.Random(0)  # Same file every run
+        count = 0
+        with open(path, mode='w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for copy in range(scale):
+                for source_row in source_rows:
+                    row = list(source_row)
+                    row[segment_col] = str(int(row[segment_col]) + copy * SEGMENT_ID_STRIDE)
+                    count += 1
+                    if malformed_every and count % malformed_every == 0:
+                        # Alternate between the two kinds of malformed rows the importer reports
+                        if randomizer.random() < 0.5:
+                            row[segment_col] = ''
+                        else:
+                            row[speed_col] = 'n/a'
+                    writer.writerow(row)
+        return count
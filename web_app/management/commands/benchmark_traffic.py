@@ -0,0 +1,489 @@
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from io import StringIO
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+from web_app.hot_store import hot_snapshots
+from web_app.models import TrafficSegmentData
+from web_app.snapshot_cache import snapshot_responses
+from web_app.timestamp_index import snapshot_timestamps
+from web_app.traffic_csv import FILENAME_PATTERN, PARSERS
+
+try:  # Optional: peak resident memory (not available on Windows)
+    import resource
+except ImportError:
+    resource = None
+
+RESULT_FORMAT_VERSION = 1  # Bump when the layout of the JSON results changes
+SEGMENT_ID_STRIDE = 100000  # Offset added to SEGMENTID for each synthetic copy of the source rows
+COPY_LONGITUDE_OFFSET = 0.5  # Degrees each copy is moved east, so a bbox selects a share of the copies
+SNAPSHOT_INTERVAL = timedelta(minutes=5)  # Spacing of the Chicago feed
+FIRST_SNAPSHOT = datetime(2025, 7, 31, 12, 31)
+
+# Load scenarios against traffic_segments_api: (description, served from the response cache)
+SCENARIOS = {
+    'cached': ('newest snapshot, answered from the response cache', True),
+    'snapshots': ('every snapshot in turn, response cache off', False),
+    'bbox': ('every snapshot in turn with a bbox around the central quarter of the source area, '
+             'response cache off', False),
+    'binary': ('every snapshot in turn with format=binary, response cache off', False),
+}
+
+# Numbers printed by --compare, as paths into the results
+COMPARED_METRICS = (
+    ('import', 'rows_per_second'),
+    ('import', 'peak_rss_mb'),
+    ('api', '*', 'requests_per_second'),
+    ('api', '*', 'latency_ms', 'p50'),
+    ('api', '*', 'latency_ms', 'p95'),
+    ('api', '*', 'latency_ms', 'p99'),
+    ('api', '*', 'response_bytes', 'identity'),
+    ('api', '*', 'response_bytes', 'gzip'),
+    ('api', '*', 'peak_rss_mb'),
+)
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))  # ceil without floats
+    return sorted_values[int(rank) - 1]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, or None where the platform can't tell."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_revision():
+    """(commit, dirty) of the checkout the benchmark runs from, or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def write_synthetic_snapshots(source_paths, output_dir, segment_count, snapshot_count):
+    """
+    Write `snapshot_count` snapshot CSVs of `segment_count` rows each, shaped like the bundled files.
+
+    Segments are the rows of the first source file, repeated with distinct SEGMENTIDs and moved
+    COPY_LONGITUDE_OFFSET further east per copy. Snapshot N takes its speeds from source file
+    N modulo the number of sources, so the speed mix (including the feed's -1 "no estimate")
+    matches the real data. Returns the dataset description stored with the results; its
+    `extent` (west, south, east, north) covers every copy.
+    """
+    sources = []
+    for path in source_paths:
+        with open(path, mode='r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = [name.strip().upper() for name in next(reader)]
+            sources.append((header, list(reader)))
+    header, source_rows = sources[0]
+    if not source_rows:
+        raise CommandError(f"{source_paths[0]} has no data rows")
+    segment_col = header.index('SEGMENTID')
+    speed_col = header.index('CURRENT_SPEED')
+    longitude_cols = [header.index('START_LONGITUDE'), header.index('END_LONGITUDE')]
+    latitude_cols = [header.index('START_LATITUDE'), header.index('END_LATITUDE')]
+
+    # Speeds of each source file by SEGMENTID; segments missing from a file keep the first file's speed
+    source_speeds = []
+    for source_header, rows in sources:
+        segment_index = source_header.index('SEGMENTID')
+        speed_index = source_header.index('CURRENT_SPEED')
+        source_speeds.append({row[segment_index]: row[speed_index] for row in rows if len(row) > speed_index})
+
+    template = []
+    for position in range(segment_count):
+        copy, index = divmod(position, len(source_rows))
+        row = list(source_rows[index])
+        if copy:
+            row[segment_col] = str(int(row[segment_col]) + copy * SEGMENT_ID_STRIDE)
+            for column in longitude_cols:
+                row[column] = str(float(row[column]) + copy * COPY_LONGITUDE_OFFSET)
+        template.append((source_rows[index][segment_col], row))
+
+    total_bytes = 0
+    for snapshot in range(snapshot_count):
+        recorded_at = FIRST_SNAPSHOT + snapshot * SNAPSHOT_INTERVAL
+        filename = f"Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_{recorded_at:%Y-%m-%d-%H-%M-%S}.csv"
+        speeds = source_speeds[snapshot % len(source_speeds)]
+        path = os.path.join(output_dir, filename)
+        with open(path, mode='w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for source_id, row in template:
+                row[speed_col] = speeds.get(source_id, row[speed_col])
+                writer.writerow(row)
+        total_bytes += os.path.getsize(path)
+
+    # Central quarter of the area covered by the source rows (the first copy)
+    longitudes = [float(row[column]) for row in source_rows for column in longitude_cols]
+    latitudes = [float(row[column]) for row in source_rows for column in latitude_cols]
+    west, east, south, north = min(longitudes), max(longitudes), min(latitudes), max(latitudes)
+    width, height = east - west, north - south
+    bbox = (west + width / 4, south + height / 4, east - width / 4, north - height / 4)
+    last_copy = (segment_count - 1) // len(source_rows)
+
+    return {
+        'segments': segment_count,
+        'snapshots': snapshot_count,
+        'rows': segment_count * snapshot_count,
+        'csv_bytes': total_bytes,
+        'bbox': [round(value, 6) for value in bbox],
+        'extent': [west, south, east + last_copy * COPY_LONGITUDE_OFFSET, north],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the import and the traffic API on synthetic snapshots shaped like the bundled Chicago '
+            'CSVs: import throughput, latency percentiles of /api/traffic-segments/ under concurrent load from '
+            "Django's test client, response sizes and peak memory. Runs offline against a throwaway test "
+            'database (a temporary SQLite file with the default settings) and writes the results as JSON, '
+            'so runs can be compared across commits with --compare. Use --settings '
+            'Traffic_sample.settings_asgi to measure the async views.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data_dir',
+            type=str,
+            help='Directory containing the CSV files the synthetic data is modelled on (default: web_app/data)',
+            default=os.path.join(settings.BASE_DIR, 'web_app', 'data')
+        )
+        parser.add_argument(
+            '--segments',
+            type=int,
+            help='Segments per synthetic snapshot (default: the number of rows in the first source file).',
+        )
+        parser.add_argument(
+            '--snapshots',
+            type=int,
+            default=12,
+            help='Number of synthetic snapshots, 5 minutes apart (default: 12, one hour).',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Timed requests per API scenario (default: 200).',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Threads sending the API requests at the same time, each with its own test client '
+                 'and database connection (default: 4).',
+        )
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            choices=sorted(SCENARIOS),
+            default=list(SCENARIOS),
+            help='API scenarios to run (default: all). ' + '; '.join(
+                f'{name}: {description}' for name, (description, _) in SCENARIOS.items()),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Passed to import_traffic_data --workers (default: 1).',
+        )
+        parser.add_argument(
+            '--parser',
+            choices=sorted(PARSERS),
+            default='rows',
+            help='Passed to import_traffic_data --parser (default: rows).',
+        )
+        parser.add_argument(
+            '--trace_memory',
+            action='store_true',
+            help='Also record the peak Python heap of each phase with tracemalloc. Slows everything down, '
+                 'so the timings of such a run are not comparable with runs without it.',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='-',
+            help="File the JSON results are written to (default: '-', standard output; progress goes to "
+                 "standard error).",
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='JSON results of an earlier run; prints how the main numbers changed.',
+        )
+
+    def log(self, message):
+        if self.verbosity > 0:
+            self.stderr.write(message, style_func=lambda text: text)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        data_dir = options['data_dir']
+        if options['snapshots'] < 1 or options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--snapshots, --requests and --concurrency must be positive")
+        if options['segments'] is not None and options['segments'] < 1:
+            raise CommandError("--segments must be positive")
+
+        sources = sorted(name for name in os.listdir(data_dir) if FILENAME_PATTERN.match(name)) \
+            if os.path.isdir(data_dir) else []
+        if not sources:
+            raise CommandError(f"No Chicago congestion CSV files found in {data_dir}")
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        commit, dirty = git_revision()
+        results = {
+            'format_version': RESULT_FORMAT_VERSION,
+            'environment': {
+                'git_commit': commit,
+                'git_dirty': dirty,
+                'started_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'database': connection.vendor,
+                'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+                'async_views': getattr(settings, 'TRAFFIC_ASYNC_VIEWS', False),
+            },
+            'parameters': {name: options[name] for name in (
+                'segments', 'snapshots', 'requests', 'concurrency', 'scenarios', 'workers', 'parser',
+                'trace_memory')},
+        }
+        if connection.vendor == 'sqlite':
+            import sqlite3
+            results['environment']['sqlite'] = sqlite3.sqlite_version
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            csv_dir = os.path.join(work_dir, 'data')
+            os.makedirs(csv_dir)
+            segment_count = options['segments']
+            if segment_count is None:
+                with open(os.path.join(data_dir, sources[0]), encoding='utf-8', newline='') as file:
+                    segment_count = sum(1 for _ in csv.reader(file)) - 1
+            self.log(f"Writing {options['snapshots']} synthetic snapshots of {segment_count:,} segments...")
+            dataset = write_synthetic_snapshots(
+                [os.path.join(data_dir, name) for name in sources], csv_dir, segment_count, options['snapshots'])
+            results['dataset'] = dataset
+
+            # Never touch the configured databases: run against fresh test databases (a read replica
+            # alias mirrors the primary's), kept in the temporary directory for SQLite, with
+            # production-like settings. A configured hot store is moved there as well, and the import
+            # bounds cover the copies moved east of Chicago, so the importer keeps them.
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(work_dir, 'benchmark.sqlite3')
+            setup_test_environment()
+            try:
+                hot_store_path = os.path.join(work_dir, 'hot_snapshots.tsnp') if hot_snapshots.path else None
+                with override_settings(DEBUG=False, TRAFFIC_SERVER_TIMING=False, TRAFFIC_TIMESTAMP_INDEX_CACHE=None,
+                                       TRAFFIC_HOT_STORE_PATH=hot_store_path,
+                                       TRAFFIC_IMPORT_BOUNDS=tuple(dataset['extent'])):
+                    old_databases = setup_databases(verbosity=0, interactive=False, serialized_aliases=())
+                    try:
+                        snapshot_timestamps.invalidate()
+                        snapshot_responses.clear()
+                        results['import'] = self.measure(
+                            options['trace_memory'], self.benchmark_import, csv_dir, dataset, options)
+                        results['api'] = {}
+                        for name in options['scenarios']:
+                            results['api'][name] = self.measure(
+                                options['trace_memory'], self.benchmark_scenario, name, dataset, options)
+                    finally:
+                        snapshot_timestamps.invalidate()
+                        snapshot_responses.clear()
+                        teardown_databases(old_databases, verbosity=0)
+            finally:
+                teardown_test_environment()
+
+        output = json.dumps(results, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.log(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            self.print_comparison(baseline, results)
+
+    def measure(self, trace_memory, benchmark, *args):
+        """Run one benchmark phase and add the memory it peaked at to its results."""
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            phase_results = benchmark(*args)
+            if trace_memory:
+                phase_results['python_heap_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        phase_results['peak_rss_mb'] = peak_rss_mb()  # Process-wide peak so far, so never lower than earlier phases
+        return phase_results
+
+    def benchmark_import(self, csv_dir, dataset, options):
+        self.log(f"Importing {dataset['rows']:,} rows ({dataset['csv_bytes'] / 1e6:.1f} MB of CSV)...")
+        started = time.perf_counter()
+        call_command('import_traffic_data', data_dir=csv_dir, workers=options['workers'], parser=options['parser'],
+                     stdout=StringIO())
+        elapsed = time.perf_counter() - started
+
+        rows = TrafficSegmentData.objects.count()
+        if rows != dataset['rows']:
+            raise CommandError(f"Expected {dataset['rows']} imported rows, found {rows}")
+        self.log(f"  {elapsed:.2f}s, {rows / elapsed:,.0f} rows/sec")
+        return {
+            'seconds': round(elapsed, 4),
+            'rows': rows,
+            'rows_per_second': round(rows / elapsed, 1),
+            'mb_per_second': round(dataset['csv_bytes'] / 1e6 / elapsed, 2),
+        }
+
+    def scenario_urls(self, name, dataset):
+        url = reverse('traffic_segments_api')
+        timestamps = [timestamp.isoformat() for timestamp in snapshot_timestamps.timestamps()]
+        if name == 'cached':
+            return [f"{url}?{urlencode({'datetime': timestamps[-1]})}"]
+        extra = {}
+        if name == 'bbox':
+            extra['bbox'] = ','.join(str(value) for value in dataset['bbox'])
+        elif name == 'binary':
+            extra['format'] = 'binary'
+        return [f"{url}?{urlencode({'datetime': timestamp, **extra})}" for timestamp in timestamps]
+
+    def benchmark_scenario(self, name, dataset, options):
+        description, cached = SCENARIOS[name]
+        self.log(f"Scenario '{name}' ({description}): {options['requests']} requests, "
+                 f"{options['concurrency']} at a time...")
+        urls = self.scenario_urls(name, dataset)
+        cache_bytes = getattr(settings, 'TRAFFIC_SNAPSHOT_CACHE_MAX_BYTES', 64 * 1024 * 1024) if cached else 0
+
+        with override_settings(TRAFFIC_SNAPSHOT_CACHE_MAX_BYTES=cache_bytes):
+            snapshot_responses.clear()
+            # Untimed: the first request of a scenario loads the indexes and (when cached) fills the cache.
+            # The gzip size is what a browser downloads.
+            client = Client()
+            warmup = client.get(urls[0])
+            if warmup.status_code != 200:
+                raise CommandError(f"{urls[0]} returned HTTP {warmup.status_code}")
+            gzip_size = len(client.get(urls[0], HTTP_ACCEPT_ENCODING='gzip').content)
+
+            latencies = []
+            sizes = []
+            errors = []
+            lock = threading.Lock()
+            next_request = iter(range(options['requests']))
+
+            def send_requests():
+                thread_client = Client()
+                try:
+                    while True:
+                        with lock:
+                            index = next(next_request, None)
+                        if index is None:
+                            return
+                        url = urls[index % len(urls)]
+                        started = time.perf_counter()
+                        response = thread_client.get(url)
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            latencies.append(elapsed)
+                            sizes.append(len(response.content))
+                            if response.status_code != 200:
+                                errors.append(response.status_code)
+                finally:
+                    connections.close_all()  # This thread's connections
+
+            threads = [threading.Thread(target=send_requests) for _ in range(options['concurrency'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        latency_ms = {
+            'min': latencies[0],
+            'mean': sum(latencies) / len(latencies),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1],
+        }
+        latency_ms = {key: round(value * 1000, 3) for key, value in latency_ms.items()}
+        self.log(f"  p50 {latency_ms['p50']:.1f} ms, p95 {latency_ms['p95']:.1f} ms, p99 {latency_ms['p99']:.1f} ms, "
+                 f"{len(latencies) / elapsed:,.0f} requests/sec" + (f", {len(errors)} errors" if errors else ""))
+        return {
+            'description': description,
+            'distinct_urls': len(urls),
+            'requests': len(latencies),
+            'errors': len(errors),
+            'seconds': round(elapsed, 4),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'latency_ms': latency_ms,
+            'response_bytes': {
+                'identity': round(sum(sizes) / len(sizes)),
+                'gzip': gzip_size,
+            },
+        }
+
+    def print_comparison(self, baseline, results):
+        if baseline.get('format_version') != RESULT_FORMAT_VERSION:
+            self.stderr.write(f"--compare: {baseline.get('format_version')} results can't be compared with "
+                              f"version {RESULT_FORMAT_VERSION}")
+            return
+
+        def expand(node, path, prefix=()):
+            """(name, value) for every number the path reaches; '*' matches each key."""
+            if not path:
+                if isinstance(node, (int, float)) and not isinstance(node, bool):
+                    yield '.'.join(prefix), node
+                return
+            if not isinstance(node, dict):
+                return
+            keys = node if path[0] == '*' else [path[0]] if path[0] in node else []
+            for key in keys:
+                yield from expand(node[key], path[1:], prefix + (key,))
+
+        before = dict(item for path in COMPARED_METRICS for item in expand(baseline, path))
+        self.log(f"\nCompared with {(baseline['environment'].get('git_commit') or 'unknown')[:12]} "
+                 f"({baseline['environment'].get('started_at')}):")
+        if baseline.get('parameters') != results['parameters'] or baseline.get('dataset') != results['dataset']:
+            self.log(self.style.WARNING("  The runs used different parameters; the numbers may not be comparable."))
+        for path in COMPARED_METRICS:
+            for name, value in expand(results, path):
+                if name not in before:
+                    continue
+                previous = before[name]
+                change = f"{(value - previous) / previous * 100:+7.1f}%" if previous else '       '
+                self.log(f"  {name:<42} {previous:>12,.1f} -> {value:>12,.1f}  {change}")
@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from web_app.anomalies import detect_snapshot_anomalies
+from web_app.db_router import primary_reads
+from web_app.models import SegmentBaseline, TrafficEvent, TrafficSegmentData
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class Command(BaseCommand):
+    help = ('Updates the per-segment speed baselines and TrafficEvents from stored snapshots. '
+            'import_traffic_data does this for every file it imports; use this to backfill older data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Delete all baselines and events and replay every snapshot in time order, '
+                 'e.g. after changing the TRAFFIC_ANOMALY_* settings.',
+        )
+
+    @primary_reads()  # Never act on a replica that is behind the primary
+    def handle(self, *args, **options):
+        timestamps = snapshot_timestamps.timestamps()
+        if options['rebuild']:
+            with transaction.atomic():
+                TrafficEvent.objects.all().delete()
+                SegmentBaseline.objects.all().delete()
+        else:
+            # Baselines skip samples they have already seen, so only newer snapshots matter
+            latest = SegmentBaseline.objects.aggregate(latest=Max('updated_at'))['latest']
+            if latest is not None:
+                timestamps = [timestamp for timestamp in timestamps if timestamp > latest]
+
+        self.stdout.write(f"Replaying {len(timestamps)} snapshots...")
+        started = time.perf_counter()
+        opened = closed = 0
+        for recorded_at in timestamps:
+            speeds = dict(TrafficSegmentData.objects.filter(recorded_at=recorded_at).values_list(
+                'segment_id', 'current_speed'))
+            with transaction.atomic():
+                events_opened, events_closed = detect_snapshot_anomalies(recorded_at, speeds)
+            opened += events_opened
+            closed += events_closed
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {len(timestamps)} snapshots in {time.perf_counter() - started:.2f}s: "
+            f"{opened} events started, {closed} ended."))
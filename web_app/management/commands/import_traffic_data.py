@@ -1,13 +1,60 @@
 import os
-import csv
-from datetime import datetime
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from web_app.models import TrafficSegmentData  # Make sure to replace 'web_app' with your actual app name
+from django.db import connections, transaction
+from web_app.models import CongestionSummary, ImportedFile, QuarantinedRow, SegmentBaseline, TrafficEvent, TrafficSegment, TrafficSegmentData, TrafficSegmentRollup  # Make sure to replace 'web_app' with your actual app name
+from web_app.timestamp_index import snapshot_timestamps
+from web_app.anomalies import detect_snapshot_anomalies
+from web_app.congestion import summarize_snapshot
+from web_app.data_quality import quarantined_rows, validate_snapshot
+from web_app.db_router import primary_reads
+from web_app.hot_store import hot_snapshots
+from web_app.traffic_csv import FILENAME_PATTERN, PARSERS, SEGMENT_FIELDS, parse_traffic_file
+from web_app.snapshot_binary import ARCHIVE_FILENAME_PATTERN, parse_snapshot_archive
+
+try:  # Optional: react to new files through inotify (Linux) instead of polling the directory
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+DEFAULT_BATCH_SIZE = 2000  # Rows per bulk INSERT; ~1.6 Chicago snapshots worth of segments
+DEFAULT_POLL_INTERVAL = 2.0  # Seconds between directory checks in --watch mode
+FILES_IN_FLIGHT_PER_WORKER = 2  # Parsed files allowed to wait for the writer, per worker process
+PRINTED_WARNINGS = 10  # Rejected-row messages printed per file below verbosity 2; all are quarantined
+
+# Static TrafficSegment columns refreshed from the newest file when a segment already exists
+SEGMENT_UPDATE_FIELDS = [field for field in SEGMENT_FIELDS if field != 'segment_id']
+
+
+def is_snapshot_file(filename):
+    """A snapshot CSV, or a binary archive of one written by archive_traffic_snapshots."""
+    return bool(FILENAME_PATTERN.match(filename) or ARCHIVE_FILENAME_PATTERN.match(filename))
+
+
+def parse_snapshot_file(path, known_checksum=None, parser='rows'):
+    """parse_traffic_file for CSVs, parse_snapshot_archive (memory-mapped, no CSV parsing) for archives."""
+    if ARCHIVE_FILENAME_PATTERN.match(os.path.basename(path)):
+        return parse_snapshot_archive(path, known_checksum)
+    return parse_traffic_file(path, known_checksum, parser)
+
+
+def scan_directory(data_dir):
+    """Map each regular file in data_dir to its (size, mtime) signature."""
+    signatures = {}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                signatures[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return signatures
 
 
 class Command(BaseCommand):
-    help = 'Imports traffic segment data from dated CSV files into the database.'
+    help = ('Imports traffic segment data from dated CSV files (or their binary archives written by '
+            'archive_traffic_snapshots) into the database.')
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -19,142 +66,378 @@ class Command(BaseCommand):
         parser.add_argument(
             '--clear_existing',
             action='store_true',
-            help='Clear all existing TrafficSegmentData before importing new data.',
+            help='Clear all existing TrafficSegmentData (and their TrafficSegments) before importing new data.',
+        )
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of rows written per bulk INSERT (default: {DEFAULT_BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-import files even if the import ledger says they were already imported unchanged.',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='After the initial import, keep running and import new files as they arrive in --data_dir.',
+        )
+        parser.add_argument(
+            '--poll_interval',
+            type=float,
+            default=DEFAULT_POLL_INTERVAL,
+            help=f'Seconds between directory checks in --watch mode when inotify is not available '
+                 f'(default: {DEFAULT_POLL_INTERVAL}).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes that parse CSV files in parallel; rows are still written by a single '
+                 'process. Try the number of CPU cores for large backfills (default: 1, parse in-process).',
+        )
+        parser.add_argument(
+            '--parser',
+            choices=sorted(PARSERS),
+            default='rows',
+            help="CSV parser backend: 'rows' converts one row at a time, 'columnar' converts whole columns "
+                 "into typed arrays and is faster on large files (default: rows).",
+        )
+
+    def write_batch(self, segments, observations, batch_size):
+        """
+        Upsert the static segment rows seen in this batch, then upsert the observations.
+        Both are keyed on their natural keys (segment_id, and segment_id + recorded_at),
+        so importing the same file twice leaves the database unchanged.
+        """
+        TrafficSegment.objects.bulk_create(
+            segments,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['segment_id'],
+            update_fields=SEGMENT_UPDATE_FIELDS,
+        )
+        TrafficSegmentData.objects.bulk_create(
+            observations,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['segment', 'recorded_at'],
+            update_fields=['current_speed'],
         )
 
+    @primary_reads()  # Never act on a replica that is behind the primary
     def handle(self, *args, **options):
         data_dir = options['data_dir']
         clear_existing = options['clear_existing']
+        workers = options['workers']
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        self.force = options['force']
+        self.parser = options['parser']
 
         if not os.path.isdir(data_dir):
             raise CommandError(f"Data directory does not exist: {data_dir}")
 
+        if self.batch_size < 1:
+            raise CommandError(f"--batch_size must be a positive integer, got {self.batch_size}")
+
+        if workers < 1:
+            raise CommandError(f"--workers must be a positive integer, got {workers}")
+
+        self.hot_store_stale = clear_existing  # Set once a snapshot is committed; see publish_hot_snapshots
         if clear_existing:
-            self.stdout.write(self.style.WARNING("Clearing all existing TrafficSegmentData..."))
+            self.stdout.write(self.style.WARNING("Clearing all existing TrafficSegmentData and TrafficSegments..."))
+            # Delete observations first so removing the segments does not have to cascade row by row
             TrafficSegmentData.objects.all().delete()
+            TrafficSegmentRollup.objects.all().delete()
+            CongestionSummary.objects.all().delete()
+            SegmentBaseline.objects.all().delete()
+            TrafficEvent.objects.all().delete()
+            QuarantinedRow.objects.all().delete()
+            TrafficSegment.objects.all().delete()
+            ImportedFile.objects.all().delete()  # Everything must be re-imported now
+            snapshot_timestamps.invalidate()
             self.stdout.write(self.style.SUCCESS("Existing data cleared."))
 
         self.stdout.write(f"Starting data import from: {data_dir}")
 
-        total_files = 0
-        processed_files = 0
-        total_rows = 0
-        inserted_rows = 0
-        skipped_rows_overall = 0
-
-        # Regex to match the expected filename pattern for easy parsing
-        # Matches "Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_"
-        # followed by YYYY-MM-DD-HH-MM-SS and then ".csv"
-        filename_pattern = r'Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_(\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})\.csv'
-        import re
-
-        for filename in os.listdir(data_dir):
-            match = re.match(filename_pattern, filename)
-            if match:
-                total_files += 1
-                csv_path = os.path.join(data_dir, filename)
-                datetime_str = match.group(1)  # Extract the YYYY-MM-DD-HH-MM-SS part
-                self.stdout.write(f"Processing {filename}...")
-
-                try:
-                    # Parse the datetime string from the filename
-                    # Format: YYYY-MM-DD-HH-MM-SS
-                    recorded_at = datetime.strptime(datetime_str, '%Y-%m-%d-%H-%M-%S')
-                except ValueError as e:
-                    self.stderr.write(self.style.ERROR(
-                        f"Skipping {filename}: Invalid datetime format in filename '{datetime_str}'. Error: {e}"))
-                    skipped_rows_overall += 1  # Count this file's rows as skipped for overall count
-                    continue
-
-                rows_in_file = 0
-                rows_inserted_from_file = 0
-                rows_skipped_in_file = 0
-
-                try:
-                    with open(csv_path, mode='r', encoding='utf-8') as file:
-                        reader = csv.DictReader(file)
-
-                        # Get a list of expected clean column names to map incoming data
-                        # These should match your TrafficSegmentData model fields
-                        expected_columns = [
-                            'SEGMENTID', 'STREET', 'DIRECTION', 'FROM_STREET', 'TO_STREET',
-                            'LENGTH', 'STREET_HEADING', 'COMMENTS', 'START_LONGITUDE',
-                            'START_LATITUDE', 'END_LONGITUDE', 'END_LATITUDE', 'CURRENT_SPEED',
-                            'LAST_UPDATED'  # Though LAST_UPDATED from CSV is less relevant now as we use recorded_at
-                        ]
-
-                        # Mapping for potentially messy CSV headers to clean model fields
-                        # This handles cases where CSV headers have leading/trailing spaces
-                        header_map = {col.strip().upper(): col for col in reader.fieldnames}
-
-                        for row_num, row_data in enumerate(reader):
-                            rows_in_file += 1
-                            total_rows += 1
-                            try:
-                                # Clean data: Strip whitespace from values and map keys
-                                cleaned_row = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in
-                                               row_data.items()}
-                                # If your CSV has headers like " CURRENT_SPEED", this ensures you map it
-                                # to "CURRENT_SPEED" for access below.
-
-                                # Basic validation for required fields
-                                if not all(cleaned_row.get(col_name.strip(), '') for col_name in
-                                           ['SEGMENTID', 'STREET', 'START_LONGITUDE', 'START_LATITUDE', 'END_LONGITUDE',
-                                            'END_LATITUDE']):
-                                    self.stderr.write(self.style.WARNING(
-                                        f"Skipping row {row_num + 1} in {filename}: Missing essential data."))
-                                    rows_skipped_in_file += 1
-                                    skipped_rows_overall += 1
-                                    continue
-
-                                # Create TrafficSegmentData instance
-                                TrafficSegmentData.objects.create(
-                                    segment_id=int(cleaned_row.get(header_map.get('SEGMENTID'), '-1')),
-                                    street=cleaned_row.get(header_map.get('STREET'), ''),
-                                    direction=cleaned_row.get(header_map.get('DIRECTION'), ''),
-                                    from_street=cleaned_row.get(header_map.get('FROM_STREET'), ''),
-                                    to_street=cleaned_row.get(header_map.get('TO_STREET'), ''),
-                                    length=float(cleaned_row.get(header_map.get('LENGTH'), 0.0)),
-                                    street_heading=cleaned_row.get(header_map.get('STREET_HEADING'), ''),
-                                    comments=cleaned_row.get(header_map.get('COMMENTS'), ''),
-                                    start_longitude=float(cleaned_row.get(header_map.get('START_LONGITUDE'), 0.0)),
-                                    start_latitude=float(cleaned_row.get(header_map.get('START_LATITUDE'), 0.0)),
-                                    end_longitude=float(cleaned_row.get(header_map.get('END_LONGITUDE'), 0.0)),
-                                    end_latitude=float(cleaned_row.get(header_map.get('END_LATITUDE'), 0.0)),
-                                    current_speed=int(float(cleaned_row.get(header_map.get('CURRENT_SPEED'), -1))),
-                                    recorded_at=recorded_at  # Use the datetime parsed from the filename
-                                )
-                                rows_inserted_from_file += 1
-                                inserted_rows += 1
-
-                            except ValueError as ve:
-                                self.stderr.write(self.style.ERROR(
-                                    f"Data type error in row {row_num + 1} of {filename}: {ve} - Row: {row_data}"))
-                                rows_skipped_in_file += 1
-                                skipped_rows_overall += 1
-                            except Exception as e:
-                                self.stderr.write(self.style.ERROR(
-                                    f"Error inserting row {row_num + 1} from {filename}: {e} - Row: {row_data}"))
-                                rows_skipped_in_file += 1
-                                skipped_rows_overall += 1
-                except Exception as e:
-                    self.stderr.write(self.style.ERROR(f"Failed to read or process file {filename}: {e}"))
-                    skipped_rows_overall += rows_in_file - rows_inserted_from_file  # Account for rows in partially read files
-                    continue
-
-                self.stdout.write(self.style.SUCCESS(
-                    f"Finished {filename}: {rows_inserted_from_file}/{rows_in_file} rows inserted, {rows_skipped_in_file} skipped."))
-                processed_files += 1
+        self.totals = {
+            'total_files': 0,
+            'processed_files': 0,
+            'unchanged_files': 0,
+            'total_rows': 0,
+            'inserted_rows': 0,
+            'skipped_rows': 0,
+        }
+        self.import_started = time.perf_counter()
+
+        # Remember what the directory looked like, so --watch only reacts to later changes
+        initial_files = scan_directory(data_dir)
+        filenames = []
+        for filename in sorted(initial_files):
+            if is_snapshot_file(filename):
+                filenames.append(filename)
             else:
                 self.stdout.write(self.style.WARNING(f"Skipping non-matching file: {filename}"))
 
+        if workers > 1 and len(filenames) > 1:
+            self.import_files_in_pool(data_dir, filenames, workers)
+        else:
+            for filename in filenames:
+                self.import_file(data_dir, filename)
+
+        self.publish_hot_snapshots()
+        self.write_summary()
+
+        if options['watch']:
+            self.watch(data_dir, options['poll_interval'], initial_files)
+
+    def ledger_checksum(self, filename):
+        """Checksum the import ledger holds for `filename`, or None if it must be (re)imported regardless."""
+        if self.force:
+            return None
+        return ImportedFile.objects.filter(filename=filename).values_list('checksum', flat=True).first()
+
+    def import_file(self, data_dir, filename):
+        """Parse one CSV file (or archive) in this process and write it."""
+        self.write_parsed_file(
+            parse_snapshot_file(os.path.join(data_dir, filename), self.ledger_checksum(filename), self.parser))
+
+    def import_files_in_pool(self, data_dir, filenames, workers):
+        """
+        Parse files in `workers` processes and write them from this one, in filename order.
+
+        Only parsing is parallel: SQLite allows a single writer, so every INSERT still goes
+        through this process. At most FILES_IN_FLIGHT_PER_WORKER parsed files per worker wait
+        for the writer, which bounds memory on large backfills.
+        """
+        self.stdout.write(f"Parsing with {workers} worker processes...")
+        # Forked workers must not share this process's database connections
+        connections.close_all()
+        pending = deque()
+        remaining = iter(filenames)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            def submit_next():
+                filename = next(remaining, None)
+                if filename is not None:
+                    pending.append(executor.submit(
+                        parse_snapshot_file, os.path.join(data_dir, filename), self.ledger_checksum(filename),
+                        self.parser))
+
+            for _ in range(workers * FILES_IN_FLIGHT_PER_WORKER):
+                submit_next()
+            while pending:
+                parsed = pending.popleft().result()
+                submit_next()
+                self.write_parsed_file(parsed)
+
+    def write_parsed_file(self, parsed):
+        """Write one parse_snapshot_file result inside a single transaction and record it in the import ledger."""
+        totals = self.totals
+        filename = parsed['filename']
+        totals['total_files'] += 1
+
+        if parsed['recorded_at'] is None:
+            self.stderr.write(self.style.ERROR(f"Skipping {filename}: {parsed['error']}"))
+            totals['skipped_rows'] += 1  # Count this file's rows as skipped for overall count
+            return
+        if parsed['unchanged']:
+            # Files the ledger already has with the same contents are skipped, unless --force
+            self.stdout.write(f"Skipping {filename}: already imported and unchanged.")
+            totals['unchanged_files'] += 1
+            return
+
+        self.stdout.write(f"Processing {filename}...")
+        rows_in_file = parsed['rows']
+        if parsed['error'] is not None:
+            self.stderr.write(self.style.ERROR(f"Failed to read or process file {filename}: {parsed['error']}"))
+            totals['total_rows'] += rows_in_file
+            totals['skipped_rows'] += rows_in_file
+            return
+
+        recorded_at = parsed['recorded_at']
+        validate_snapshot(parsed, self.known_geometry())
+        self.report_rejected(parsed)
+        batch_size = self.batch_size
+        rows_inserted_from_file = 0
+        rows_skipped_in_file = parsed['skipped']
+        file_started = time.perf_counter()
+
+        try:
+            # One transaction per file: a snapshot is either fully imported or not at all,
+            # and SQLite only has to fsync once instead of once per row.
+            with transaction.atomic():
+                for start in range(0, len(parsed['segments']), batch_size):
+                    # validate_snapshot dropped repeated segment_ids, so each batch has one row per segment
+                    batch_segments = {}
+                    batch = {}
+                    for values, (segment_id, current_speed) in zip(
+                            parsed['segments'][start:start + batch_size], parsed['speeds'][start:start + batch_size]):
+                        batch_segments[segment_id] = TrafficSegment(**dict(zip(SEGMENT_FIELDS, values)))
+                        batch[segment_id] = TrafficSegmentData(
+                            segment_id=segment_id,
+                            current_speed=current_speed,
+                            recorded_at=recorded_at,  # Use the datetime parsed from the filename
+                        )
+                    self.write_batch(batch_segments.values(), batch.values(), batch_size)
+                    rows_inserted_from_file += len(batch)
+
+                # Dashboard statistics for this snapshot, rebuilt from everything now stored for it
+                summarize_snapshot(recorded_at)
+
+                # Slowdowns against each segment's norm; updates the rolling baselines in place
+                events_opened, events_closed = detect_snapshot_anomalies(recorded_at, dict(parsed['speeds']))
+
+                # Rejected rows replace those of an earlier import of this file
+                QuarantinedRow.objects.filter(filename=filename).delete()
+                QuarantinedRow.objects.bulk_create(quarantined_rows(parsed, recorded_at), batch_size=batch_size)
+
+                # Committed together with the rows, so the ledger never claims a file that was rolled back
+                ImportedFile.objects.update_or_create(filename=filename, defaults={
+                    'checksum': parsed['checksum'],
+                    'size': parsed['size'],
+                    'recorded_at': recorded_at,
+                    'rows_inserted': rows_inserted_from_file,
+                    'rows_skipped': rows_skipped_in_file,
+                    'rows_no_speed': parsed['quality']['no_speed'],
+                    'rejected_reasons': parsed['quality']['rejected'],
+                    # Read by /metrics for the importer's throughput
+                    'import_seconds': time.perf_counter() - file_started,
+                })
+        except Exception as e:
+            # The transaction was rolled back, so nothing from this file was kept
+            self.stderr.write(self.style.ERROR(f"Failed to write file {filename}: {e}"))
+            totals['total_rows'] += rows_in_file
+            totals['skipped_rows'] += rows_in_file  # Account for rows rolled back
+            return
+
+        totals['total_rows'] += rows_in_file
+        totals['inserted_rows'] += rows_inserted_from_file
+        totals['skipped_rows'] += rows_skipped_in_file
+        totals['processed_files'] += 1
+        # The snapshot is committed; let the API see the new timestamp
+        snapshot_timestamps.invalidate()
+        self.hot_store_stale = True
+        file_elapsed = time.perf_counter() - file_started
+        self.stdout.write(self.style.SUCCESS(
+            f"Finished {filename}: {rows_inserted_from_file}/{rows_in_file} rows inserted, "
+            f"{rows_skipped_in_file} skipped in {file_elapsed:.2f}s "
+            f"({self.rows_per_second(rows_inserted_from_file, file_elapsed):,.0f} rows/sec)."))
+        if events_opened or events_closed:
+            self.stdout.write(f"Traffic events: {events_opened} started, {events_closed} ended.")
+
+    @staticmethod
+    def known_geometry():
+        """Stored endpoints of every segment, for validate_snapshot's geometry drift check."""
+        return {
+            segment[0]: segment[1:] for segment in TrafficSegment.objects.values_list(
+                'segment_id', 'start_longitude', 'start_latitude', 'end_longitude', 'end_latitude')
+        }
+
+    def report_rejected(self, parsed):
+        """Print the rejected rows of one file: each one at verbosity 2, else the first few and a count per reason."""
+        rejected = parsed['quality']['rejected']
+        if not rejected:
+            return
+        limit = None if self.verbosity >= 2 else PRINTED_WARNINGS
+        for row_number, reason, message, values in parsed['rejected'][:limit]:
+            location = f"row {row_number}" if row_number is not None else f"segment {values['segment_id']}"
+            self.stderr.write(self.style.WARNING(f"Rejected {location} of {parsed['filename']} ({reason}): {message}"))
+        counts = ', '.join(f"{reason}: {count}" for reason, count in sorted(rejected.items()))
+        self.stderr.write(self.style.WARNING(
+            f"{sum(rejected.values())} rows of {parsed['filename']} quarantined ({counts})."))
+
+    def publish_hot_snapshots(self):
+        """
+        Republish the latest snapshots to the shared hot store (web_app/hot_store.py) once per
+        batch of files, if any snapshot was committed or cleared since the last time.
+        """
+        if not self.hot_store_stale:
+            return
+        self.hot_store_stale = False
+        try:
+            published = hot_snapshots.publish()
+        except OSError as e:
+            # The API reads the database instead; the next import tries again
+            self.stderr.write(self.style.ERROR(f"Failed to publish the hot snapshot store: {e}"))
+            return
+        if published is not None:
+            self.stdout.write(f"Published the latest {published} snapshots to the hot store.")
+
+    def write_summary(self):
+        totals = self.totals
+        import_elapsed = time.perf_counter() - self.import_started
+
         self.stdout.write(self.style.SUCCESS("\n--- Import Summary ---"))
-        self.stdout.write(self.style.SUCCESS(f"Total files found matching pattern: {total_files}"))
-        self.stdout.write(self.style.SUCCESS(f"Files successfully processed: {processed_files}"))
-        self.stdout.write(self.style.SUCCESS(f"Total rows attempted: {total_rows}"))
-        self.stdout.write(self.style.SUCCESS(f"Total rows inserted: {inserted_rows}"))
+        self.stdout.write(self.style.SUCCESS(f"Total files found matching pattern: {totals['total_files']}"))
+        self.stdout.write(self.style.SUCCESS(f"Files successfully processed: {totals['processed_files']}"))
+        self.stdout.write(self.style.SUCCESS(f"Files already imported (unchanged): {totals['unchanged_files']}"))
+        self.stdout.write(self.style.SUCCESS(f"Total rows attempted: {totals['total_rows']}"))
+        self.stdout.write(self.style.SUCCESS(f"Total rows inserted: {totals['inserted_rows']}"))
         self.stdout.write(
-            self.style.WARNING(f"Total rows skipped (due to errors or missing data): {skipped_rows_overall}"))
+            self.style.WARNING(f"Total rows skipped (due to errors or missing data): {totals['skipped_rows']}"))
+        self.stdout.write(self.style.SUCCESS(f"Elapsed time: {import_elapsed:.2f}s"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Throughput: {self.rows_per_second(totals['inserted_rows'], import_elapsed):,.0f} rows/sec "
+            f"(batch size {self.batch_size})"))
         self.stdout.write(self.style.SUCCESS("----------------------"))
-        if total_files > processed_files or skipped_rows_overall > 0:
-            self.stdout.write(self.style.WARNING("Please review the logs above for skipped files or rows with errors."))
\ No newline at end of file
+        if totals['total_files'] > totals['processed_files'] + totals['unchanged_files'] or totals['skipped_rows'] > 0:
+            self.stdout.write(self.style.WARNING("Please review the logs above for skipped files or rows with errors."))
+
+    def watch(self, data_dir, poll_interval, initial_files):
+        """
+        Import files as they land in data_dir until interrupted.
+
+        With inotify_simple installed, files are picked up when the writer closes them (or moves
+        them into place). Otherwise the directory is polled and a file is imported once its size
+        and modification time have stayed the same for one poll interval.
+        """
+        self.stdout.write(self.style.SUCCESS(
+            f"Watching {data_dir} for new files ({'inotify' if INotify is not None else 'polling'}). "
+            f"Press Ctrl-C to stop."))
+        if INotify is not None:
+            changes = self.inotify_changes(data_dir, poll_interval)
+        else:
+            changes = self.polled_changes(data_dir, poll_interval, initial_files)
+        try:
+            for filenames in changes:
+                for filename in sorted(filenames):
+                    if is_snapshot_file(filename):
+                        self.import_file(data_dir, filename)
+                self.publish_hot_snapshots()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping watch.")
+            self.write_summary()
+
+    def inotify_changes(self, data_dir, poll_interval):
+        """Yield the names of files closed after writing or moved into data_dir."""
+        inotify = INotify()
+        inotify.add_watch(data_dir, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+        while True:
+            events = inotify.read(timeout=int(poll_interval * 1000))
+            if events:
+                yield {event.name for event in events}
+
+    def polled_changes(self, data_dir, poll_interval, initial_files):
+        """Yield the names of new or modified files once they have stopped changing."""
+        handled = dict(initial_files)  # filename -> (size, mtime) when it was last handed out
+        previous = dict(initial_files)
+        while True:
+            time.sleep(poll_interval)
+            current = scan_directory(data_dir)
+
+            # Files seen with the same signature on two consecutive polls are done being written
+            ready = {
+                filename for filename, signature in current.items()
+                if previous.get(filename) == signature and handled.get(filename) != signature
+            }
+            previous = current
+            if ready:
+                handled.update({filename: current[filename] for filename in ready})
+                yield ready
+
+    @staticmethod
+    def rows_per_second(rows, elapsed):
+        return rows / elapsed if elapsed > 0 else 0.0
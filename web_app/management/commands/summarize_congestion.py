@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from web_app.congestion import summarize_snapshot
+from web_app.db_router import primary_reads
+from web_app.models import CongestionSummary
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class Command(BaseCommand):
+    help = ('Computes the city-wide and per-corridor CongestionSummary rows for stored snapshots. '
+            'import_traffic_data does this for every file it imports; use this to backfill older data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every snapshot, not only the ones without summaries.',
+        )
+
+    @primary_reads()  # Never act on a replica that is behind the primary
+    def handle(self, *args, **options):
+        timestamps = snapshot_timestamps.timestamps()
+        if not options['rebuild']:
+            summarized = set(CongestionSummary.objects.filter(street='', direction='').values_list(
+                'recorded_at', flat=True))
+            timestamps = [timestamp for timestamp in timestamps if timestamp not in summarized]
+
+        self.stdout.write(f"Summarizing {len(timestamps)} snapshots...")
+        started = time.perf_counter()
+        rows = 0
+        for recorded_at in timestamps:
+            with transaction.atomic():
+                rows += summarize_snapshot(recorded_at)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} summary rows for {len(timestamps)} snapshots in {time.perf_counter() - started:.2f}s."))
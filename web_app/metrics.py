@@ -0,0 +1,284 @@
+"""
+Request-level performance metrics, exposed in the Prometheus text format at /metrics.
+
+RequestMetricsMiddleware times every request and, through a database execute wrapper,
+counts its queries and the time spent in them. Views mark their phases with
+`with metrics.phase('resolve'):`; the response cache records the 'serialize' phase
+when it encodes a body. Each request's numbers are kept in a context variable, which
+asgiref copies into sync_to_async threads, so queries that async views run on other
+threads are still attributed to the request.
+
+Metrics are per server process: run one scrape target per worker, or read them as
+samples of the whole deployment. The importer runs in its own process and records
+its throughput in the ImportedFile ledger, which /metrics reads from the database.
+
+Settings:
+- TRAFFIC_METRICS_ENABLED (default True): serve /metrics; requests are measured either way.
+- TRAFFIC_METRICS_ALLOWED_IPS (default None, anyone): addresses or networks ('10.0.0.0/8')
+  whose REMOTE_ADDR may read /metrics; settings_production allows loopback and private ones.
+- TRAFFIC_SERVER_TIMING (default False): add a Server-Timing header with the request's
+  database time, query count and phases, for the browser's network panel.
+"""
+import contextvars
+import ipaddress
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.http import Http404, HttpResponse
+
+# Upper bounds of the latency histograms, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the response size histogram, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Upper bounds of the queries-per-request histogram
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(zip(self.label_names, label_values))} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                labels = list(zip(self.label_names, label_values))
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_label_text(labels + [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_label_text(labels)} {series[-1]}')
+                lines.append(f'{self.name}_count{_label_text(labels)} {cumulative}')
+        return lines
+
+
+requests_total = Counter(
+    'traffic_http_requests_total', 'HTTP requests by URL name and status code.', ('view', 'status'))
+request_duration = Histogram(
+    'traffic_http_request_duration_seconds', 'Time until the response (or the start of a streamed one).',
+    ('view',))
+response_size = Histogram(
+    'traffic_http_response_size_bytes', 'Response body size; streamed responses are not counted.',
+    ('view',), SIZE_BUCKETS)
+request_queries = Histogram(
+    'traffic_db_queries_per_request', 'Database queries run by one request.', ('view',), QUERY_COUNT_BUCKETS)
+request_db_duration = Histogram(
+    'traffic_db_duration_seconds', 'Time one request spent executing database queries.', ('view',))
+phase_duration = Histogram(
+    'traffic_view_phase_duration_seconds', 'Time spent in one phase of a view (resolve, fetch, serialize).',
+    ('view', 'phase'))
+
+REQUEST_METRICS = (requests_total, request_duration, response_size, request_queries, request_db_duration,
+                   phase_duration)
+
+
+class RequestMetrics:
+    """What one request did so far; shared by every thread working for it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.phases = {}  # phase -> seconds, in first-seen order
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+_current = contextvars.ContextVar('traffic_request_metrics', default=None)
+
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block as phase `name` of the current request (no-op outside a request)."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting queries and their time towards the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver: wrap every new database connection with record_query."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """Records REQUEST_METRICS for every request; adds Server-Timing when TRAFFIC_SERVER_TIMING is on."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def finish(request, response, metrics):
+        elapsed = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match is not None else 'unmatched'
+
+        requests_total.inc(view, response.status_code)
+        request_duration.observe(elapsed, view)
+        request_queries.observe(metrics.queries, view)
+        request_db_duration.observe(metrics.db_seconds, view)
+        for name, seconds in metrics.phases.items():
+            phase_duration.observe(seconds, view, name)
+        if not response.streaming:
+            response_size.observe(len(response.content), view)
+
+        if getattr(settings, 'TRAFFIC_SERVER_TIMING', False):
+            timings = [f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries"']
+            timings.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics.phases.items())
+            timings.append(f'total;dur={elapsed * 1000:.1f}')
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+def _gauge(name, documentation, value):
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} gauge', f'{name} {value}']
+
+
+def import_metrics():
+    """Importer and data freshness gauges, read from the ImportedFile ledger and the snapshot index."""
+    from web_app.models import ImportedFile
+    from web_app.timestamp_index import snapshot_timestamps
+
+    ledger = ImportedFile.objects.aggregate(
+        files=Count('id'), rows=Sum('rows_inserted'), skipped=Sum('rows_skipped'), no_speed=Sum('rows_no_speed'),
+        seconds=Sum('import_seconds'), last=Max('imported_at'))
+    latest = snapshot_timestamps.latest()
+    lines = []
+    lines += _gauge('traffic_import_files', 'Files in the import ledger.', ledger['files'])
+    lines += _gauge('traffic_import_rows_inserted', 'Rows written by the imports in the ledger.', ledger['rows'] or 0)
+    lines += _gauge('traffic_import_rows_skipped', 'Rows rejected by the imports in the ledger (see QuarantinedRow).',
+                    ledger['skipped'] or 0)
+    lines += _gauge('traffic_import_rows_no_speed', 'Rows imported without a speed estimate (-1).',
+                    ledger['no_speed'] or 0)
+    lines += _gauge('traffic_import_duration_seconds', 'Time spent writing the files in the ledger; '
+                    'divide traffic_import_rows_inserted by it for rows/sec.', ledger['seconds'] or 0.0)
+    lines += _gauge('traffic_import_last_timestamp_seconds', 'Unix time of the most recent import.',
+                    ledger['last'].timestamp() if ledger['last'] else 0)
+    lines += _gauge('traffic_latest_snapshot_timestamp_seconds', 'Unix time of the newest snapshot in the database.',
+                    latest.timestamp() if latest else 0)
+    return lines
+
+
+def is_allowed_client(remote_addr, allowed_ips):
+    """Whether remote_addr falls in one of the addresses or networks of allowed_ips."""
+    try:
+        address = ipaddress.ip_address(remote_addr)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(allowed, strict=False) for allowed in allowed_ips)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: this process's request metrics plus the import and freshness gauges."""
+    if not getattr(settings, 'TRAFFIC_METRICS_ENABLED', True):
+        raise Http404("Metrics are disabled")
+    allowed_ips = getattr(settings, 'TRAFFIC_METRICS_ALLOWED_IPS', None)
+    if allowed_ips is not None and not is_allowed_client(request.META.get('REMOTE_ADDR', ''), allowed_ips):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    lines = []
+    for metric in REQUEST_METRICS:
+        lines += metric.render()
+    lines += import_metrics()
+    return HttpResponse('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,99 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+SEGMENT_FIELDS = (
+    "street", "direction", "from_street", "to_street", "length", "street_heading", "comments",
+    "start_longitude", "start_latitude", "end_longitude", "end_latitude",
+)
+
+
+def copy_segments(apps, schema_editor):
+    """
+    Build one TrafficSegment per distinct segment_id from the existing per-snapshot rows.
+    The most recent observation wins if a segment's static attributes ever changed.
+    """
+    TrafficSegment = apps.get_model("web_app", "TrafficSegment")
+    TrafficSegmentData = apps.get_model("web_app", "TrafficSegmentData")
+    db_alias = schema_editor.connection.alias
+
+    rows = (
+        TrafficSegmentData.objects.using(db_alias)
+        .order_by("segment_id", "-recorded_at")
+        .values_list("segment_id", *SEGMENT_FIELDS)
+        .iterator()
+    )
+
+    segments = []
+    last_segment_id = None
+    for row in rows:
+        if row[0] == last_segment_id:
+            continue
+        last_segment_id = row[0]
+        segments.append(TrafficSegment(segment_id=row[0], **dict(zip(SEGMENT_FIELDS, row[1:]))))
+
+    TrafficSegment.objects.using(db_alias).bulk_create(segments, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrafficSegment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("segment_id", models.IntegerField(unique=True)),
+                ("street", models.CharField(max_length=255)),
+                ("direction", models.CharField(max_length=10)),
+                ("from_street", models.CharField(max_length=255)),
+                ("to_street", models.CharField(max_length=255)),
+                ("length", models.FloatField()),
+                (
+                    "street_heading",
+                    models.CharField(blank=True, max_length=100, null=True),
+                ),
+                ("comments", models.TextField(blank=True, null=True)),
+                ("start_longitude", models.FloatField()),
+                ("start_latitude", models.FloatField()),
+                ("end_longitude", models.FloatField()),
+                ("end_latitude", models.FloatField()),
+            ],
+            options={
+                "verbose_name": "Traffic Segment",
+                "verbose_name_plural": "Traffic Segments",
+            },
+        ),
+        migrations.RunPython(copy_segments, migrations.RunPython.noop),
+        # Turn the plain integer column into a foreign key on TrafficSegment.segment_id
+        # without touching the stored values: rename the field, then alter it back onto
+        # the original segment_id column.
+        migrations.RenameField(
+            model_name="trafficsegmentdata",
+            old_name="segment_id",
+            new_name="segment",
+        ),
+        migrations.AlterField(
+            model_name="trafficsegmentdata",
+            name="segment",
+            field=models.ForeignKey(
+                db_column="segment_id",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="observations",
+                to="web_app.trafficsegment",
+                to_field="segment_id",
+            ),
+        ),
+    ] + [
+        migrations.RemoveField(model_name="trafficsegmentdata", name=field_name)
+        for field_name in SEGMENT_FIELDS
+    ]
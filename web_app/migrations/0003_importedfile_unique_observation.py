@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+def drop_duplicate_observations(apps, schema_editor):
+    """
+    Earlier imports could store the same (segment_id, recorded_at) more than once.
+    Keep the most recently inserted row of each pair so the unique constraint can be added.
+    """
+    TrafficSegmentData = apps.get_model("web_app", "TrafficSegmentData")
+    table = schema_editor.quote_name(TrafficSegmentData._meta.db_table)
+    schema_editor.execute(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT MAX(id) FROM {table} GROUP BY segment_id, recorded_at)"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web_app", "0002_trafficsegment_normalize"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("filename", models.CharField(max_length=255, unique=True)),
+                ("checksum", models.CharField(max_length=64)),
+                ("size", models.BigIntegerField()),
+                ("recorded_at", models.DateTimeField(db_index=True)),
+                ("rows_inserted", models.IntegerField(default=0)),
+                ("rows_skipped", models.IntegerField(default=0)),
+                ("imported_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Imported File",
+                "verbose_name_plural": "Imported Files",
+            },
+        ),
+        migrations.RunPython(drop_duplicate_observations, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="trafficsegmentdata",
+            unique_together={("segment", "recorded_at")},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_app', '0003_importedfile_unique_observation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrafficSegmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('period_start', models.DateTimeField()),
+                ('sample_count', models.IntegerField()),
+                ('mean_speed', models.FloatField()),
+                ('min_speed', models.IntegerField()),
+                ('max_speed', models.IntegerField()),
+                ('segment', models.ForeignKey(db_column='segment_id', on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='web_app.trafficsegment', to_field='segment_id')),
+            ],
+            options={
+                'verbose_name': 'Traffic Segment Rollup',
+                'verbose_name_plural': 'Traffic Segment Rollups',
+                'indexes': [models.Index(fields=['period', 'period_start'], name='web_app_tra_period_609bd0_idx')],
+                'unique_together': {('segment', 'period', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_app', '0004_trafficsegmentrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trafficsegmentdata',
+            name='segment',
+            field=models.ForeignKey(db_column='segment_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='observations', to='web_app.trafficsegment', to_field='segment_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficsegmentdata',
+            index=models.Index(fields=['segment', 'recorded_at', 'current_speed'], name='web_app_observation_series'),
+        ),
+    ]
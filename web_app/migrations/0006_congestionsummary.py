@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_app', '0005_observation_series_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CongestionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('street', models.CharField(blank=True, max_length=255)),
+                ('direction', models.CharField(blank=True, max_length=10)),
+                ('segment_count', models.IntegerField()),
+                ('reporting_count', models.IntegerField()),
+                ('reporting_length', models.FloatField()),
+                ('mean_speed', models.FloatField(null=True)),
+                ('share_below_15', models.FloatField(null=True)),
+                ('share_below_25', models.FloatField(null=True)),
+                ('congestion_index', models.FloatField(null=True)),
+                ('worst_segments', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Congestion Summary',
+                'verbose_name_plural': 'Congestion Summaries',
+                'indexes': [models.Index(fields=['street', 'direction', 'recorded_at'], name='web_app_congestion_series')],
+                'unique_together': {('recorded_at', 'street', 'direction')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_app', '0006_congestionsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importedfile',
+            name='import_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
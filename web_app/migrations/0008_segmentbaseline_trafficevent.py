@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_app', '0007_importedfile_import_seconds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.SmallIntegerField()),
+                ('mean_speed', models.FloatField()),
+                ('variance', models.FloatField(default=0.0)),
+                ('sample_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+                ('segment', models.ForeignKey(db_column='segment_id', on_delete=django.db.models.deletion.CASCADE, related_name='baselines', to='web_app.trafficsegment', to_field='segment_id')),
+            ],
+            options={
+                'verbose_name': 'Segment Baseline',
+                'verbose_name_plural': 'Segment Baselines',
+                'unique_together': {('slot', 'segment')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrafficEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('baseline_speed', models.FloatField()),
+                ('start_speed', models.IntegerField()),
+                ('min_speed', models.IntegerField()),
+                ('min_z_score', models.FloatField()),
+                ('snapshot_count', models.IntegerField(default=1)),
+                ('segment', models.ForeignKey(db_column='segment_id', on_delete=django.db.models.deletion.CASCADE, related_name='events', to='web_app.trafficsegment', to_field='segment_id')),
+            ],
+            options={
+                'verbose_name': 'Traffic Event',
+                'verbose_name_plural': 'Traffic Events',
+                'indexes': [models.Index(fields=['started_at'], name='web_app_event_started'), models.Index(fields=['ended_at', 'segment'], name='web_app_event_open')],
+            },
+        ),
+    ]
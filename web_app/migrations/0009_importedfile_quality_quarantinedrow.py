@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_app', '0008_segmentbaseline_trafficevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importedfile',
+            name='rejected_reasons',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='importedfile',
+            name='rows_no_speed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='QuarantinedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('recorded_at', models.DateTimeField()),
+                ('row_number', models.IntegerField(blank=True, null=True)),
+                ('segment_id', models.IntegerField(blank=True, null=True)),
+                ('reason', models.CharField(choices=[('missing_field', 'Missing field'), ('invalid_value', 'Invalid value'), ('out_of_bounds', 'Out of bounds'), ('invalid_speed', 'Invalid speed'), ('duplicate_segment', 'Duplicate segment'), ('geometry_drift', 'Geometry drift')], max_length=20)),
+                ('detail', models.TextField(blank=True)),
+                ('values', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name': 'Quarantined Row',
+                'verbose_name_plural': 'Quarantined Rows',
+                'indexes': [models.Index(fields=['filename'], name='web_app_quarantine_file'), models.Index(fields=['recorded_at', 'reason'], name='web_app_quarantine_time')],
+            },
+        ),
+    ]
@@ -1,10 +1,10 @@
 from django.db import models
-from django.contrib.gis.db import models as gis_models  # Optional, for GeoDjango if you set it up
 
 
-class TrafficSegmentData(models.Model):
-    # Data from your CSV file
-    segment_id = models.IntegerField(db_index=True)  # Index for faster lookup
+class TrafficSegment(models.Model):
+    # Static description of a road segment. These values do not change between snapshots,
+    # so they are stored once per segment instead of once per observation.
+    segment_id = models.IntegerField(unique=True)  # SEGMENTID from the CSV feed
     street = models.CharField(max_length=255)
     direction = models.CharField(max_length=10)
     from_street = models.CharField(max_length=255)
@@ -19,6 +19,31 @@ class TrafficSegmentData(models.Model):
     end_longitude = models.FloatField()
     end_latitude = models.FloatField()
 
+    # Optional: GeoDjango LineString field for spatial queries if you configure PostGIS
+    # (requires `from django.contrib.gis.db import models as gis_models` and a GDAL install)
+    # geometry = gis_models.LineStringField(srid=4326, blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Traffic Segment"
+        verbose_name_plural = "Traffic Segments"
+
+    def __str__(self):
+        return f"Segment {self.segment_id} on {self.street} {self.direction}"
+
+
+class TrafficSegmentData(models.Model):
+    # One speed observation for a segment at a snapshot time.
+    # The column stays named segment_id and holds the feed's SEGMENTID, so
+    # `observation.segment_id` is the same integer it always was.
+    segment = models.ForeignKey(
+        TrafficSegment,
+        to_field='segment_id',
+        db_column='segment_id',
+        on_delete=models.CASCADE,
+        related_name='observations',
+        db_index=False,  # Lookups by segment use the composite indexes below, which start with segment_id
+    )
+
     current_speed = models.IntegerField(default=-1)  # Use -1 or null=True, blank=True if speed can be missing
 
     # Crucial field for storing the timestamp of the data point
@@ -26,14 +51,202 @@ class TrafficSegmentData(models.Model):
     # This will be derived from your 'LAST_UPDATED' and potentially the date in the filename
     recorded_at = models.DateTimeField(db_index=True)  # Index for faster time-based queries
 
-    # Optional: GeoDjango LineString field for spatial queries if you configure PostGIS
-    # geometry = gis_models.LineStringField(srid=4326, blank=True, null=True)
-
     class Meta:
         verbose_name = "Traffic Segment Data"
         verbose_name_plural = "Traffic Segment Data"
-        # If segment_id + recorded_at is unique, you can add a unique_together constraint
-        # unique_together = (('segment_id', 'recorded_at'),)
+        # One observation per segment per snapshot; the importer upserts on this key,
+        # so re-importing a file never duplicates rows
+        unique_together = (('segment', 'recorded_at'),)
+        indexes = [
+            # Covering index for per-segment time series: a range scan over (segment_id, recorded_at)
+            # reads current_speed from the index without touching the table
+            models.Index(fields=['segment', 'recorded_at', 'current_speed'], name='web_app_observation_series'),
+        ]
+
+    def __str__(self):
+        return f"Segment {self.segment_id} on {self.segment.street} ({self.recorded_at.strftime('%Y-%m-%d %H:%M')})"
+
+
+class ImportedFile(models.Model):
+    # Ledger of CSV files the importer has committed, so scheduled and --watch runs
+    # skip files they already ingested and re-ingest ones whose contents changed.
+    filename = models.CharField(max_length=255, unique=True)
+    checksum = models.CharField(max_length=64)  # SHA-256 of the file contents
+    size = models.BigIntegerField()
+    recorded_at = models.DateTimeField(db_index=True)  # Snapshot time parsed from the filename
+    rows_inserted = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)  # Rejected rows, kept in QuarantinedRow
+    # Data quality of the file: rows stored without a speed estimate (-1) and rejected rows per reason
+    rows_no_speed = models.IntegerField(default=0)
+    rejected_reasons = models.JSONField(default=dict, blank=True)  # {QuarantinedRow.reason: count}
+    import_seconds = models.FloatField(null=True, blank=True)  # Time spent writing the file; null for older entries
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Imported File"
+        verbose_name_plural = "Imported Files"
+
+    def __str__(self):
+        return f"{self.filename} ({self.rows_inserted} rows)"
+
+
+class TrafficSegmentRollup(models.Model):
+    # Downsampled speeds for one segment over an hour or a day. Written by the
+    # apply_traffic_retention command before it drops the raw 5-minute observations.
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [(HOUR, 'Hourly'), (DAY, 'Daily')]
+
+    segment = models.ForeignKey(
+        TrafficSegment,
+        to_field='segment_id',
+        db_column='segment_id',
+        on_delete=models.CASCADE,
+        related_name='rollups',
+    )
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateTimeField()
+    # Only observations with a speed estimate (current_speed >= 0) are counted
+    sample_count = models.IntegerField()
+    mean_speed = models.FloatField()
+    min_speed = models.IntegerField()
+    max_speed = models.IntegerField()
+
+    class Meta:
+        verbose_name = "Traffic Segment Rollup"
+        verbose_name_plural = "Traffic Segment Rollups"
+        unique_together = (('segment', 'period', 'period_start'),)
+        indexes = [models.Index(fields=['period', 'period_start'])]
+
+    def __str__(self):
+        return f"Segment {self.segment_id} {self.period} from {self.period_start.strftime('%Y-%m-%d %H:%M')}"
+
+
+class CongestionSummary(models.Model):
+    # Congestion statistics for one snapshot, per corridor (street + direction) and for the
+    # whole city (street and direction both ''). Computed once at import time by
+    # web_app.congestion.summarize_snapshot so dashboards read a few rows instead of a snapshot.
+    recorded_at = models.DateTimeField()
+    street = models.CharField(max_length=255, blank=True)  # '' for the city-wide row
+    direction = models.CharField(max_length=10, blank=True)
+
+    segment_count = models.IntegerField()
+    reporting_count = models.IntegerField()  # Segments with a speed estimate (current_speed >= 0)
+    reporting_length = models.FloatField()  # Total length of the reporting segments
+    # The remaining statistics cover reporting segments only and are null when there are none
+    mean_speed = models.FloatField(null=True)  # Length-weighted
+    share_below_15 = models.FloatField(null=True)  # Share of segments under 15 mph (red on the map)
+    share_below_25 = models.FloatField(null=True)  # Share of segments under 25 mph (red or orange)
+    congestion_index = models.FloatField(null=True)  # Share of reporting length under 25 mph, 0-1
+    worst_segments = models.JSONField(default=list)  # [{"segment_id", "speed"}, ...], slowest first
+
+    class Meta:
+        verbose_name = "Congestion Summary"
+        verbose_name_plural = "Congestion Summaries"
+        unique_together = (('recorded_at', 'street', 'direction'),)
+        indexes = [
+            # Time series of one corridor, or of the city-wide row
+            models.Index(fields=['street', 'direction', 'recorded_at'], name='web_app_congestion_series'),
+        ]
+
+    def __str__(self):
+        scope = f"{self.street} {self.direction}" if self.street else "City"
+        return f"{scope} congestion ({self.recorded_at.strftime('%Y-%m-%d %H:%M')})"
+
+
+class SegmentBaseline(models.Model):
+    # Rolling speed norm of one segment in one time-of-day slot (see web_app.anomalies.time_slot).
+    # Updated in place by web_app.anomalies.detect_snapshot_anomalies as each snapshot is imported,
+    # so detection never rescans history: the state is one row per segment and slot.
+    segment = models.ForeignKey(
+        TrafficSegment,
+        to_field='segment_id',
+        db_column='segment_id',
+        on_delete=models.CASCADE,
+        related_name='baselines',
+    )
+    slot = models.SmallIntegerField()
+    mean_speed = models.FloatField()  # Exponentially weighted moving average of the speed estimates
+    variance = models.FloatField(default=0.0)  # Exponentially weighted variance around mean_speed
+    sample_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField()  # Snapshot of the last sample; earlier snapshots are not applied again
+
+    class Meta:
+        verbose_name = "Segment Baseline"
+        verbose_name_plural = "Segment Baselines"
+        # Slot first: each snapshot reads and upserts every segment of one slot
+        unique_together = (('slot', 'segment'),)
+
+    def __str__(self):
+        return f"Segment {self.segment_id} slot {self.slot}: {self.mean_speed:.1f} mph"
+
+
+class TrafficEvent(models.Model):
+    # A sharp speed drop on one segment against its baseline for that time of day, detected at
+    # import time. Open (ended_at null) while the segment stays below its baseline.
+    segment = models.ForeignKey(
+        TrafficSegment,
+        to_field='segment_id',
+        db_column='segment_id',
+        on_delete=models.CASCADE,
+        related_name='events',
+    )
+    started_at = models.DateTimeField()  # First snapshot below the baseline
+    last_seen_at = models.DateTimeField()  # Latest snapshot still below it
+    ended_at = models.DateTimeField(null=True, blank=True)  # First snapshot back to normal; null while active
+    baseline_speed = models.FloatField()  # The segment's norm when the event started
+    start_speed = models.IntegerField()
+    min_speed = models.IntegerField()
+    min_z_score = models.FloatField()  # Most negative (speed - norm) / standard deviation seen
+    snapshot_count = models.IntegerField(default=1)  # Snapshots below the baseline
+
+    class Meta:
+        verbose_name = "Traffic Event"
+        verbose_name_plural = "Traffic Events"
+        indexes = [
+            models.Index(fields=['started_at'], name='web_app_event_started'),
+            # Open events (ended_at null) are read for every imported snapshot
+            models.Index(fields=['ended_at', 'segment'], name='web_app_event_open'),
+        ]
+
+    def __str__(self):
+        state = "active" if self.ended_at is None else f"until {self.ended_at.strftime('%Y-%m-%d %H:%M')}"
+        return f"Segment {self.segment_id} slowdown from {self.started_at.strftime('%Y-%m-%d %H:%M')} ({state})"
+
+
+class QuarantinedRow(models.Model):
+    # A row the importer rejected, kept with the reason instead of only being reported on stderr.
+    # Written in the transaction of its file and replaced when the file is re-imported.
+    MISSING_FIELD = 'missing_field'  # An essential column is empty
+    INVALID_VALUE = 'invalid_value'  # A numeric column does not convert
+    OUT_OF_BOUNDS = 'out_of_bounds'  # Coordinates outside TRAFFIC_IMPORT_BOUNDS
+    INVALID_SPEED = 'invalid_speed'  # Below -1 or above TRAFFIC_IMPORT_MAX_SPEED
+    DUPLICATE_SEGMENT = 'duplicate_segment'  # segment_id already listed earlier in the snapshot
+    GEOMETRY_DRIFT = 'geometry_drift'  # Endpoints moved more than TRAFFIC_IMPORT_MAX_GEOMETRY_DRIFT from the stored ones
+    REASON_CHOICES = [
+        (MISSING_FIELD, 'Missing field'),
+        (INVALID_VALUE, 'Invalid value'),
+        (OUT_OF_BOUNDS, 'Out of bounds'),
+        (INVALID_SPEED, 'Invalid speed'),
+        (DUPLICATE_SEGMENT, 'Duplicate segment'),
+        (GEOMETRY_DRIFT, 'Geometry drift'),
+    ]
+
+    filename = models.CharField(max_length=255)
+    recorded_at = models.DateTimeField()  # Snapshot time parsed from the filename
+    row_number = models.IntegerField(null=True, blank=True)  # Data row in the file (1 = first after the header)
+    segment_id = models.IntegerField(null=True, blank=True)  # As given in the row; not a key, it may be unknown
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    detail = models.TextField(blank=True)
+    values = models.JSONField(default=dict)  # The row: CSV cells by column, or the parsed fields
+
+    class Meta:
+        verbose_name = "Quarantined Row"
+        verbose_name_plural = "Quarantined Rows"
+        indexes = [
+            models.Index(fields=['filename'], name='web_app_quarantine_file'),
+            models.Index(fields=['recorded_at', 'reason'], name='web_app_quarantine_time'),
+        ]
 
     def __str__(self):
-        return f"Segment {self.segment_id} on {self.street} ({self.recorded_at.strftime('%Y-%m-%d %H:%M')})"
\ No newline at end of file
+        return f"{self.filename} row {self.row_number or '?'}: {self.get_reason_display()}"
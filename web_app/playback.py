@@ -0,0 +1,150 @@
+"""
+Interpolated playback frames for /api/traffic-playback/.
+
+The feed delivers a snapshot about every 5 minutes; playback at finer steps (e.g. 30 s)
+needs frames between them. Each frame is computed from the two snapshots around its
+time with one pass over their aligned speed arrays. Those arrays are decoded from the
+database once and kept in SnapshotArrayCache, so consecutive playback windows cost no
+queries for snapshots they share. A window reads all its missing snapshots in one query,
+except the recent ones the hot store (web_app/hot_store.py) holds.
+
+Segments without a usable speed in one of the two snapshots take the value of the nearer
+snapshot instead of being interpolated. That covers both missing observations and the
+feed's -1 "no estimate". Snapshots further apart than TRAFFIC_PLAYBACK_MAX_GAP seconds
+(a feed outage) are not interpolated across either; frames show the nearer one.
+
+Settings:
+- TRAFFIC_PLAYBACK_CACHE_SNAPSHOTS (default 288, one day): decoded snapshots kept per worker.
+- TRAFFIC_PLAYBACK_MAX_GAP (default 900): longest gap between snapshots, in seconds,
+  that frames are interpolated across.
+"""
+import threading
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
+
+from web_app.hot_store import hot_snapshots
+from web_app.models import TrafficSegmentData
+from web_app.snapshot_binary import NO_OBSERVATION
+from web_app.timestamp_index import snapshot_timestamps
+
+MISSING = -32768  # Stored speed of a segment without an observation
+LOAD_CHUNK = 200  # Snapshots read per query, well below every backend's parameter limit
+
+
+class SnapshotArrayCache:
+    """
+    Speeds of whole snapshots as int16 arrays aligned to segment_index order (MISSING where a
+    segment has no observation), in a size-bounded LRU local to the worker process.
+
+    Entries are keyed by (segments_version, recorded_at, snapshot generation): a new segment
+    set changes the alignment and re-importing a snapshot changes its generation, and either
+    makes the old entries unreachable.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def max_snapshots(self):
+        return getattr(settings, 'TRAFFIC_PLAYBACK_CACHE_SNAPSHOTS', 288)
+
+    def get_many(self, timestamps, positions, segments_version):
+        """Return {recorded_at: array} for `timestamps`, loading the ones not cached."""
+        keys = {timestamp: (segments_version, timestamp, snapshot_timestamps.snapshot_generation(timestamp))
+                for timestamp in timestamps}
+        found = {}
+        with self._lock:
+            for timestamp, key in keys.items():
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    found[timestamp] = entry
+
+        missing = [timestamp for timestamp in timestamps if timestamp not in found]
+        for start in range(0, len(missing), LOAD_CHUNK):
+            loaded = self.load(missing[start:start + LOAD_CHUNK], positions, segments_version)
+            found.update(loaded)
+            with self._lock:
+                for timestamp, speeds in loaded.items():
+                    self._entries[keys[timestamp]] = speeds
+                while len(self._entries) > self.max_snapshots:
+                    self._entries.popitem(last=False)
+        return found
+
+    @staticmethod
+    def load(timestamps, positions, segments_version=None):
+        arrays = {}
+        for timestamp in timestamps:
+            # Recent snapshots are copied out of the shared hot store instead of queried
+            published = hot_snapshots.speeds(timestamp, segments_version) if segments_version is not None else None
+            if published is not None:
+                arrays[timestamp] = array('h', (speed if speed != NO_OBSERVATION else MISSING for speed in published))
+        timestamps = [timestamp for timestamp in timestamps if timestamp not in arrays]
+        if not timestamps:
+            return arrays
+
+        arrays.update((timestamp, array('h', [MISSING]) * len(positions)) for timestamp in timestamps)
+        observations = TrafficSegmentData.objects.filter(recorded_at__in=timestamps).values_list(
+            'recorded_at', 'segment_id', 'current_speed')
+        for recorded_at, segment_id, current_speed in observations.iterator(chunk_size=2000):
+            position = positions.get(segment_id)
+            if position is not None:  # Segment appeared after the index was loaded
+                arrays[recorded_at][position] = max(min(current_speed, 32767), -1)
+        return arrays
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the playback views
+snapshot_arrays = SnapshotArrayCache()
+
+
+def bracket(frame_time):
+    """(snapshot at or before frame_time, snapshot after it or None, weight of the later one)."""
+    before = snapshot_timestamps.at_or_before(frame_time)
+    after = snapshot_timestamps.after(frame_time)
+    if after is None or before == frame_time:
+        return before, None, 0.0
+    gap = (after - before).total_seconds()
+    weight = (frame_time - before).total_seconds() / gap
+    if gap > getattr(settings, 'TRAFFIC_PLAYBACK_MAX_GAP', 900):
+        # Too long to draw a line through; show the nearer snapshot
+        return (before, None, 0.0) if weight < 0.5 else (after, None, 0.0)
+    return before, after, weight
+
+
+def interpolate(before, after, weight):
+    """
+    Speeds at `weight` (0..1) of the way from one aligned snapshot array to the next, rounded
+    to whole mph; None where a segment has no observation in the snapshot used.
+    """
+    nearer = before if weight < 0.5 else after
+    return [
+        round(start + (end - start) * weight) if start >= 0 and end >= 0
+        else (held if held != MISSING else None)
+        for start, end, held in zip(before, after, nearer)
+    ]
+
+
+def playback_frames(frame_times, positions, segments_version):
+    """
+    Interpolated speeds for each of `frame_times` (inside the range of snapshots), one list
+    aligned to segment_index order per frame, plus the snapshot timestamps they were computed from.
+    """
+    brackets = [bracket(frame_time) for frame_time in frame_times]
+    sources = sorted({timestamp for before, after, _ in brackets for timestamp in (before, after)
+                      if timestamp is not None})
+    arrays = snapshot_arrays.get_many(sources, positions, segments_version)
+
+    frames = []
+    for before, after, weight in brackets:
+        if after is None:
+            frames.append([speed if speed != MISSING else None for speed in arrays[before]])
+        else:
+            frames.append(interpolate(arrays[before], arrays[after], weight))
+    return frames, sources
@@ -0,0 +1,70 @@
+import hashlib
+import threading
+
+from web_app.models import TrafficSegment
+from web_app.timestamp_index import snapshot_timestamps
+
+
+# Static columns kept per segment by SegmentIndex, in SegmentIndex.static_rows tuple order
+SEGMENT_ROW_COLUMNS = (
+    'street', 'direction', 'from_street', 'to_street', 'length', 'street_heading', 'comments',
+    'start_longitude', 'start_latitude', 'end_longitude', 'end_latitude',
+)
+
+
+def segments_version(ids):
+    """Short hash of a segment_id list; speed arrays aligned to lists with the same hash line up."""
+    return hashlib.blake2b(','.join(map(str, ids)).encode(), digest_size=8).hexdigest()
+
+
+class SegmentIndex:
+    """
+    The segment_id-ordered list of known segments, shared by the compact endpoints.
+
+    Speed arrays returned by the API are aligned to this order, so a client that loaded
+    the geometry once can apply them by position. `version` is a short hash of the id list;
+    clients reload the geometry when it changes. Segments only change on import, so the list
+    is reloaded whenever the snapshot timestamp index version changes. It also keeps each
+    segment's static columns, so a snapshot from the hot store needs no database join.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot_version = object()  # Never equal to a real version, forces the first load
+        self._ids = []
+        self._positions = {}
+        self._version = ''
+        self._rows = []
+
+    def _refresh(self):
+        snapshot_version = snapshot_timestamps.version
+        with self._lock:
+            if snapshot_version == self._snapshot_version:
+                return
+            segments = list(TrafficSegment.objects.order_by('segment_id').values_list(
+                'segment_id', *SEGMENT_ROW_COLUMNS))
+            ids = [segment[0] for segment in segments]
+            self._ids = ids
+            self._rows = [segment[1:] for segment in segments]
+            self._positions = {segment_id: position for position, segment_id in enumerate(ids)}
+            self._version = segments_version(ids)
+            self._snapshot_version = snapshot_version
+
+    def current(self):
+        """
+        Return (ids, positions, version) from one consistent load, where positions maps
+        segment_id -> index into ids.
+        """
+        self._refresh()
+        with self._lock:
+            return self._ids, self._positions, self._version
+
+    def static_rows(self):
+        """Return (ids, rows, version) from one consistent load; rows are SEGMENT_ROW_COLUMNS tuples aligned to ids."""
+        self._refresh()
+        with self._lock:
+            return self._ids, self._rows, self._version
+
+
+# Shared by the API views
+segment_index = SegmentIndex()
@@ -0,0 +1,295 @@
+"""
+Compact binary encoding of traffic snapshots ("TSNP"), used by the API's format=binary
+option and by the snapshot archives written by `archive_traffic_snapshots`.
+
+GeoJSON repeats every property name (and the snapshot timestamp) on every feature. Here
+each column is stored once as a packed array, and everything that is the same for the
+whole response goes into one small JSON metadata block. All numbers are little-endian,
+and every section starts at a multiple of 8 bytes from the start of the buffer, so
+decoders can view the columns in place: typed arrays in JavaScript, memoryview.cast()
+over an mmap in Python.
+
+Layout, version 1:
+
+    offset  size  field
+    0       4     magic b"TSNP"
+    4       2     uint16 format version (1)
+    6       2     uint16 flags: IDS, GEOMETRY, PROPERTIES, SPEEDS, DOUBLE_PRECISION
+    8       4     uint32 segment count N
+    12      4     uint32 frame count F (speed vectors stored; 0 without SPEEDS)
+    16      4     uint32 metadata length M
+    20      4     reserved (0)
+    24      M     metadata: UTF-8 JSON object
+    then, in this order and only when their flag is set:
+    IDS         int32[N]    segment_id
+    GEOMETRY    float[4N]   start_longitude, start_latitude, end_longitude, end_latitude per segment
+    SPEEDS      int8[F*N]   frame-major: frame 0's N speeds, then frame 1's, ... in mph.
+                            -1 = the feed had no estimate, NO_OBSERVATION (-128) = no row for the
+                            segment at that time. Speeds are clamped to 127.
+    PROPERTIES  float[N]    length, then one string column per STRING_PROPERTIES entry:
+                            uint32[N+1] byte offsets followed by the UTF-8 bytes of all values
+    "float" is float32, or float64 when DOUBLE_PRECISION is set (archives, so restoring them is lossless).
+
+Nothing here touches Django, so archives can be read in worker processes.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+from web_app.traffic_csv import SEGMENT_FIELDS, file_checksum
+
+MAGIC = b'TSNP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIII4x')
+ALIGNMENT = 8
+
+# Header flags
+IDS = 1
+GEOMETRY = 2
+PROPERTIES = 4
+SPEEDS = 8
+DOUBLE_PRECISION = 16
+
+NO_OBSERVATION = -128  # Speed stored for a segment without an observation at that time
+MAX_SPEED = 127
+
+STRING_PROPERTIES = ('street', 'direction', 'from_street', 'to_street', 'street_heading', 'comments')
+
+CONTENT_TYPE = 'application/vnd.traffic-snapshot'
+
+# Archives are named like the CSV they replace, with the .tsnp extension
+ARCHIVE_SUFFIX = '.tsnp'
+ARCHIVE_FILENAME_PATTERN = re.compile(
+    r'Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_(\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})\.tsnp$')
+
+
+def archive_filename(recorded_at):
+    return f"Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_{recorded_at:%Y-%m-%d-%H-%M-%S}{ARCHIVE_SUFFIX}"
+
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(view, typecode):
+    if sys.byteorder == 'little':
+        return view.cast(typecode)  # No copy; stays backed by the buffer (or mmap)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+def _speed_byte(speed):
+    if speed is None:
+        return NO_OBSERVATION
+    return min(int(speed), MAX_SPEED)
+
+
+def encode_snapshot(metadata, segment_ids=None, coordinates=None, properties=None, speed_frames=None,
+                    double_precision=False):
+    """
+    Encode one response or archive.
+
+    - metadata: JSON-serializable dict (metadata block).
+    - segment_ids: segment_ids in order, or None to leave the IDS section out.
+    - coordinates: one (start_lon, start_lat, end_lon, end_lat) per segment, or None.
+    - properties: one (length, *STRING_PROPERTIES values) tuple per segment, or None.
+    - speed_frames: list of speed sequences, each one entry (or None) per segment, or None.
+    Every column given must have the same number of segments.
+    """
+    columns = [column for column in (segment_ids, coordinates, properties) if column is not None]
+    if speed_frames:
+        columns.extend(speed_frames)
+    segment_count = len(columns[0]) if columns else 0
+    if any(len(column) != segment_count for column in columns):
+        raise ValueError("All columns of a snapshot must have one entry per segment")
+
+    float_code = 'd' if double_precision else 'f'
+    flags = DOUBLE_PRECISION if double_precision else 0
+    sections = []
+    if segment_ids is not None:
+        flags |= IDS
+        sections.append(_little_endian(array('i', segment_ids)))
+    if coordinates is not None:
+        flags |= GEOMETRY
+        sections.append(_little_endian(array(float_code, (value for segment in coordinates for value in segment))))
+    frame_count = 0
+    if speed_frames is not None:
+        flags |= SPEEDS
+        frame_count = len(speed_frames)
+        sections.append(array('b', (_speed_byte(speed) for frame in speed_frames for speed in frame)).tobytes())
+    if properties is not None:
+        flags |= PROPERTIES
+        sections.append(_little_endian(array(float_code, (segment[0] or 0.0 for segment in properties))))
+        for index in range(1, len(STRING_PROPERTIES) + 1):
+            encoded = [(segment[index] or '').encode('utf-8') for segment in properties]
+            offsets = array('I', [0])
+            for value in encoded:
+                offsets.append(offsets[-1] + len(value))
+            sections.append(_little_endian(offsets))
+            sections.append(b''.join(encoded))
+
+    metadata_bytes = json.dumps(metadata, separators=(',', ':'), default=str).encode('utf-8')
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, flags, segment_count, frame_count, len(metadata_bytes))]
+    size = HEADER.size
+    for section in [metadata_bytes] + sections:
+        parts.append(section)
+        size += len(section)
+        padding = -size % ALIGNMENT
+        parts.append(b'\0' * padding)
+        size += padding
+    return b''.join(parts)
+
+
+def encode_segment_rows(segments, metadata, speeds=None, double_precision=False):
+    """
+    encode_snapshot for segment tuples in traffic_csv.SEGMENT_FIELDS order: ids, geometry and
+    properties, plus one speed frame when `speeds` (one per segment) is given.
+    """
+    segments = list(segments)
+    return encode_snapshot(
+        metadata,
+        segment_ids=[segment[0] for segment in segments],
+        coordinates=[segment[8:12] for segment in segments],
+        properties=[(segment[5],) + segment[1:5] + segment[6:8] for segment in segments],
+        speed_frames=[speeds] if speeds is not None else None,
+        double_precision=double_precision,
+    )
+
+
+def decode_snapshot(buffer):
+    """
+    Decode encode_snapshot output from any buffer (bytes, mmap).
+
+    Returns a dict with flags, segment_count, frame_count and metadata, plus the sections
+    present: segment_ids, coordinates (flat, 4 per segment) and lengths as number
+    sequences viewing the buffer; speeds as a list of F int8 views; and one list of
+    strings per STRING_PROPERTIES name.
+    """
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError("Truncated snapshot: no header")
+    magic, version, flags, segment_count, frame_count, metadata_length = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a TSNP snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported TSNP format version {version}")
+
+    position = HEADER.size
+
+    def take(size):
+        nonlocal position
+        if position + size > len(view):
+            raise ValueError("Truncated snapshot")
+        section = view[position:position + size]
+        position += size
+        position += -position % ALIGNMENT
+        return section
+
+    float_code, float_size = ('d', 8) if flags & DOUBLE_PRECISION else ('f', 4)
+    decoded = {
+        'flags': flags,
+        'segment_count': segment_count,
+        'frame_count': frame_count,
+        'metadata': json.loads(bytes(take(metadata_length)).decode('utf-8')),
+    }
+    if flags & IDS:
+        decoded['segment_ids'] = _from_little_endian(take(4 * segment_count), 'i')
+    if flags & GEOMETRY:
+        decoded['coordinates'] = _from_little_endian(take(4 * segment_count * float_size), float_code)
+    if flags & SPEEDS:
+        speeds = take(segment_count * frame_count).cast('b')
+        decoded['speeds'] = [speeds[frame * segment_count:(frame + 1) * segment_count] for frame in range(frame_count)]
+    if flags & PROPERTIES:
+        decoded['lengths'] = _from_little_endian(take(segment_count * float_size), float_code)
+        for name in STRING_PROPERTIES:
+            offsets = _from_little_endian(take(4 * (segment_count + 1)), 'I')
+            data = bytes(take(offsets[-1] if segment_count else 0))
+            decoded[name] = [data[offsets[index]:offsets[index + 1]].decode('utf-8') for index in range(segment_count)]
+    return decoded
+
+
+def read_archive(path):
+    """Memory-map an archive and decode it; the numeric columns are read from the mapping on access."""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ValueError("Empty snapshot archive")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode_snapshot(mapped)
+
+
+def parse_snapshot_archive(path, known_checksum=None, parser=None):
+    """
+    Load an archive written by `archive_traffic_snapshots` into the same result dict as
+    traffic_csv.parse_traffic_file, so the importer can restore it like a CSV. `parser`
+    is accepted for the same call signature and ignored.
+    """
+    filename = os.path.basename(path)
+    result = {
+        'filename': filename,
+        'checksum': None,
+        'size': None,
+        'recorded_at': None,
+        'unchanged': False,
+        'error': None,
+        'rows': 0,
+        'skipped': 0,
+        'segments': [],
+        'speeds': [],
+        'rejected': [],
+    }
+
+    match = ARCHIVE_FILENAME_PATTERN.match(filename)
+    if not match:
+        result['error'] = 'File name does not match the expected pattern.'
+        return result
+    datetime_str = match.group(1)
+    try:
+        result['recorded_at'] = datetime.strptime(datetime_str, '%Y-%m-%d-%H-%M-%S')
+    except ValueError as e:
+        result['error'] = f"Invalid datetime format in filename '{datetime_str}'. Error: {e}"
+        return result
+
+    try:
+        result['checksum'] = file_checksum(path)
+        result['size'] = os.path.getsize(path)
+        if result['checksum'] == known_checksum:
+            result['unchanged'] = True
+            return result
+
+        snapshot = read_archive(path)
+        required = IDS | GEOMETRY | PROPERTIES | SPEEDS
+        if snapshot['flags'] & required != required or snapshot['frame_count'] != 1:
+            raise ValueError("not a full single-snapshot archive")
+
+        segment_ids = snapshot['segment_ids']
+        coordinates = snapshot['coordinates']
+        speeds = snapshot['speeds'][0]
+        lengths = snapshot['lengths']
+        result['rows'] = snapshot['segment_count']
+        for index in range(snapshot['segment_count']):
+            values = {
+                'segment_id': segment_ids[index],
+                'length': lengths[index],
+                'start_longitude': coordinates[4 * index],
+                'start_latitude': coordinates[4 * index + 1],
+                'end_longitude': coordinates[4 * index + 2],
+                'end_latitude': coordinates[4 * index + 3],
+            }
+            values.update((name, snapshot[name][index]) for name in STRING_PROPERTIES)
+            if speeds[index] == NO_OBSERVATION:
+                result['skipped'] += 1
+                continue
+            result['segments'].append(tuple(values[field] for field in SEGMENT_FIELDS))
+            result['speeds'].append((segment_ids[index], speeds[index]))
+    except Exception as e:
+        result['error'] = f"Failed to read or process file: {e}"
+    return result
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from web_app.metrics import phase
+
+try:  # Optional: serve brotli to clients that accept it when the package is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CachedSnapshot:
+    """
+    An encoded API response kept in memory: the body bytes, optional pre-compressed
+    copies, and the validators (strong ETag, Last-Modified) used for conditional GETs.
+    """
+
+    def __init__(self, body, compress=True, content_type='application/json', cache_control='no-cache'):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.last_modified = int(time.time())
+        self.encoded = {}  # content-coding -> compressed bytes
+        if compress:
+            self.encoded['gzip'] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                self.encoded['br'] = brotli.compress(body)
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+    def _pick_encoding(self, request):
+        accepted = request.headers.get('Accept-Encoding', '')
+        for coding in ('br', 'gzip'):
+            if coding in self.encoded and coding in accepted:
+                return coding
+        return None
+
+    def _etag_for(self, coding):
+        # Strong ETags must differ between representations, so tag compressed variants
+        return self.etag if coding is None else f'{self.etag[:-1]}-{coding}"'
+
+    def is_not_modified(self, request, etag):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+            return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and self.last_modified <= if_modified_since
+
+    def as_response(self, request):
+        coding = self._pick_encoding(request)
+        etag = self._etag_for(coding)
+
+        if self.is_not_modified(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(self.encoded.get(coding, self.body), content_type=self.content_type)
+            if coding is not None:
+                response.headers['Content-Encoding'] = coding
+
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(self.last_modified)
+        response.headers['Vary'] = 'Accept-Encoding'
+        # By default browsers keep the body but revalidate every time; a match costs a 304 with no body
+        response.headers['Cache-Control'] = self.cache_control
+        return response
+
+
+class SnapshotResponseCache:
+    """
+    Size-bounded LRU of CachedSnapshot objects, local to the worker process.
+
+    Settings:
+    - TRAFFIC_SNAPSHOT_CACHE_MAX_BYTES (default 64 MiB): total bytes kept by the JSON response
+      cache, counting the compressed copies. 0 disables the cache. Other instances name
+      their own setting through `max_bytes_setting`.
+    - TRAFFIC_SNAPSHOT_CACHE_COMPRESS (default True): store gzip (and brotli, if installed)
+      copies next to the plain body.
+    """
+
+    def __init__(self, max_bytes_setting='TRAFFIC_SNAPSHOT_CACHE_MAX_BYTES', default_max_bytes=64 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._max_bytes_setting = max_bytes_setting
+        self._default_max_bytes = default_max_bytes
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, self._max_bytes_setting, self._default_max_bytes)
+
+    @property
+    def compress(self):
+        return getattr(settings, 'TRAFFIC_SNAPSHOT_CACHE_COMPRESS', True)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, data):
+        """Encode `data` as JSON, store it under `key` and return the CachedSnapshot."""
+        with phase('serialize'):
+            body = json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+        return self.put_bytes(key, body)
+
+    def put_bytes(self, key, body, content_type='application/json', cache_control='no-cache'):
+        """Store an already encoded body under `key` and return the CachedSnapshot."""
+        with phase('serialize'):  # Compression
+            entry = CachedSnapshot(body, compress=self.compress, content_type=content_type, cache_control=cache_control)
+
+        max_bytes = self.max_bytes
+        if entry.size > max_bytes:
+            return entry  # Too big (or caching disabled); serve it once without keeping it
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._size > max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Encoded JSON API responses, keyed by (timestamp index version, request parameters)
+snapshot_responses = SnapshotResponseCache()
+
+# Encoded vector tiles, keyed by (snapshot timestamp, z, x, y)
+tile_responses = SnapshotResponseCache('TRAFFIC_TILE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
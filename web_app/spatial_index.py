@@ -0,0 +1,99 @@
+import threading
+
+from web_app.models import TrafficSegment
+from web_app.timestamp_index import snapshot_timestamps
+
+NODE_CAPACITY = 16  # Entries per STR-tree node
+
+
+class STRTree:
+    """
+    Static R-tree over bounding boxes, bulk-loaded with Sort-Tile-Recursive packing.
+
+    Works on any database backend: it is built in memory from TrafficSegment coordinates,
+    so viewport queries do not depend on SpatiaLite, the SQLite R*Tree module or PostGIS.
+    Entries are (min_x, min_y, max_x, max_y, item).
+    """
+
+    def __init__(self, entries, capacity=NODE_CAPACITY):
+        self.capacity = capacity
+        level = [(min_x, min_y, max_x, max_y, item, True) for min_x, min_y, max_x, max_y, item in entries]
+        # Pack each level into parent nodes until a single root remains
+        while len(level) > capacity:
+            level = self._pack(level)
+        self.root = self._node(level) if level else None
+
+    @staticmethod
+    def _node(children):
+        return (
+            min(child[0] for child in children),
+            min(child[1] for child in children),
+            max(child[2] for child in children),
+            max(child[3] for child in children),
+            children,
+            False,
+        )
+
+    def _pack(self, entries):
+        node_count = -(-len(entries) // self.capacity)
+        slab_count = max(1, round(node_count ** 0.5))
+        slab_size = -(-len(entries) // slab_count)
+
+        # Sort by x center into vertical slabs, then by y center inside each slab
+        entries = sorted(entries, key=lambda entry: entry[0] + entry[2])
+        parents = []
+        for slab_start in range(0, len(entries), slab_size):
+            slab = sorted(entries[slab_start:slab_start + slab_size], key=lambda entry: entry[1] + entry[3])
+            for node_start in range(0, len(slab), self.capacity):
+                parents.append(self._node(slab[node_start:node_start + self.capacity]))
+        return parents
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """Items whose bounding box intersects the given box."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_min_x, node_min_y, node_max_x, node_max_y, content, is_leaf = stack.pop()
+            if node_min_x > max_x or node_max_x < min_x or node_min_y > max_y or node_max_y < min_y:
+                continue
+            if is_leaf:
+                found.append(content)
+            else:
+                stack.extend(content)
+        return found
+
+
+class SegmentSpatialIndex:
+    """
+    STR-tree of segment bounding boxes in longitude/latitude, returning segment_ids.
+    Rebuilt whenever the snapshot timestamp index version changes (i.e. after an import).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot_version = object()  # Never equal to a real version, forces the first build
+        self._tree = None
+
+    def _refresh(self):
+        snapshot_version = snapshot_timestamps.version
+        with self._lock:
+            if snapshot_version == self._snapshot_version:
+                return self._tree
+            rows = TrafficSegment.objects.values_list(
+                'segment_id', 'start_longitude', 'start_latitude', 'end_longitude', 'end_latitude')
+            self._tree = STRTree(
+                (min(start_lon, end_lon), min(start_lat, end_lat), max(start_lon, end_lon), max(start_lat, end_lat),
+                 segment_id)
+                for segment_id, start_lon, start_lat, end_lon, end_lat in rows
+            )
+            self._snapshot_version = snapshot_version
+            return self._tree
+
+    def segment_ids_in_bbox(self, west, south, east, north):
+        return self._refresh().query(west, south, east, north)
+
+
+# Shared by the API views
+segment_spatial_index = SegmentSpatialIndex()
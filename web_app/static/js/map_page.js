@@ -55,91 +55,206 @@ function getLineWidth(speed) {
 let hold_data;
 
 let next_timestamp = ""; // Initialize as an empty string for the first call
+let current_timestamp = ""; // Timestamp of the speeds currently drawn
+let segmentLayers = []; // Leaflet layers in segment_id order, aligned with the speed arrays from the API
+let segmentsVersion = ""; // segments_version the geometry was loaded with
+let frameBuffer = []; // Prefetched frames waiting to be shown: {timestamp, speeds}
+let rangeRequestInFlight = false;
+const PREFETCH_FRAMES = 12; // Frames requested per /api/traffic-range/ call
+const PREFETCH_THRESHOLD = 3; // Request the next window when this few frames are left
+// ?live=1 shows the latest snapshot and applies pushed updates instead of playing history
+const LIVE_MODE = new URLSearchParams(window.location.search).has('live') && !!window.EventSource;
+// ?step=30 plays history in 30-second frames interpolated by /api/traffic-playback/ instead of raw
+// snapshots, advancing every ?interval= milliseconds (default 500)
+const PLAYBACK_STEP = parseInt(new URLSearchParams(window.location.search).get('step')) || 0;
+const PLAYBACK_FRAMES = 60; // Frames requested per /api/traffic-playback/ call
+const PLAYBACK_PREFETCH_THRESHOLD = 15; // Frames left when the next playback window is requested
+const FRAME_INTERVAL = PLAYBACK_STEP
+    ? parseInt(new URLSearchParams(window.location.search).get('interval')) || 500
+    : 2000; // Milliseconds each frame is shown
+
+// Compact binary snapshots (format=binary); the layout is documented in web_app/snapshot_binary.py
+const SNAPSHOT_IDS = 1;
+const SNAPSHOT_GEOMETRY = 2;
+const SNAPSHOT_PROPERTIES = 4;
+const SNAPSHOT_SPEEDS = 8;
+const SNAPSHOT_DOUBLE_PRECISION = 16;
+const SNAPSHOT_STRING_PROPERTIES = ['street', 'direction', 'from_street', 'to_street', 'street_heading', 'comments'];
+const NO_OBSERVATION = -128; // Stored speed of a segment without an observation
+
+// Turn an API error response into an exception, using the JSON error message from the Django view
+function apiError(response) {
+    return response.json().then(errorData => {
+        const errorMessage = errorData.error || (errorData.debug && errorData.debug.error_messages ? errorData.debug.error_messages.join(', ') : 'Unknown API error');
+        throw new Error(`API Error ${response.status}: ${errorMessage}`);
+    });
+}
 
-// Function to load traffic segments
-function loadTrafficSegments() {
-    let apiUrl = "/api/traffic-segments/";
-
-    // If next_timestamp is available, append it as a query parameter
-    if (next_timestamp) {
-        // Encode the timestamp to ensure it's a valid URL component
-        apiUrl += `?datetime=${encodeURIComponent(next_timestamp)}`;
-    }
-
-    fetch(apiUrl)
+// Fetch JSON from the API, turning error responses into exceptions
+function fetchJson(apiUrl) {
+    return fetch(apiUrl)
         .then(response => {
             if (!response.ok) {
-                // Handle HTTP errors and parse JSON error messages from Django view
-                return response.json().then(errorData => {
-                    const errorMessage = errorData.error || (errorData.debug && errorData.debug.error_messages ? errorData.debug.error_messages.join(', ') : 'Unknown API error');
-                    throw new Error(`API Error ${response.status}: ${errorMessage}`);
-                });
+                return apiError(response);
             }
             return response.json();
+        });
+}
+
+// Fetch a format=binary response and decode it; error responses are still JSON
+function fetchSnapshot(apiUrl) {
+    return fetch(apiUrl)
+        .then(response => {
+            if (!response.ok) {
+                return apiError(response);
+            }
+            return response.arrayBuffer();
         })
+        .then(decodeSnapshot);
+}
+
+// Decode a TSNP buffer. Numeric columns are typed-array views on the buffer (the format is
+// little-endian, like every browser platform); speed frames become arrays with null for no observation.
+function decodeSnapshot(buffer) {
+    const header = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'TSNP' || header.getUint16(4, true) !== 1) {
+        throw new Error('Unsupported snapshot format');
+    }
+    const flags = header.getUint16(6, true);
+    const count = header.getUint32(8, true);
+    const frameCount = header.getUint32(12, true);
+    const metadataLength = header.getUint32(16, true);
+
+    // Sections follow the 24-byte header, each starting on an 8-byte boundary
+    let offset = 24;
+    function take(length) {
+        const start = offset;
+        offset = Math.ceil((offset + length) / 8) * 8;
+        return start;
+    }
+
+    const textDecoder = new TextDecoder();
+    const FloatArray = (flags & SNAPSHOT_DOUBLE_PRECISION) ? Float64Array : Float32Array;
+    const snapshot = {
+        count: count,
+        metadata: JSON.parse(textDecoder.decode(new Uint8Array(buffer, take(metadataLength), metadataLength)))
+    };
+    if (flags & SNAPSHOT_IDS) {
+        snapshot.segmentIds = new Int32Array(buffer, take(4 * count), count);
+    }
+    if (flags & SNAPSHOT_GEOMETRY) {
+        snapshot.coordinates = new FloatArray(buffer, take(4 * count * FloatArray.BYTES_PER_ELEMENT), 4 * count);
+    }
+    if (flags & SNAPSHOT_SPEEDS) {
+        const speeds = new Int8Array(buffer, take(count * frameCount), count * frameCount);
+        snapshot.speeds = [];
+        for (let frame = 0; frame < frameCount; frame++) {
+            snapshot.speeds.push(Array.from(speeds.subarray(frame * count, (frame + 1) * count),
+                speed => speed === NO_OBSERVATION ? null : speed));
+        }
+    }
+    if (flags & SNAPSHOT_PROPERTIES) {
+        snapshot.lengths = new FloatArray(buffer, take(count * FloatArray.BYTES_PER_ELEMENT), count);
+        SNAPSHOT_STRING_PROPERTIES.forEach(name => {
+            const offsets = new Uint32Array(buffer, take(4 * (count + 1)), count + 1);
+            const bytes = new Uint8Array(buffer, take(offsets[count]), offsets[count]);
+            snapshot[name] = [];
+            for (let i = 0; i < count; i++) {
+                snapshot[name].push(textDecoder.decode(bytes.subarray(offsets[i], offsets[i + 1])));
+            }
+        });
+    }
+    return snapshot;
+}
+
+// GeoJSON FeatureCollection of a decoded geometry snapshot, as /api/traffic-geometry/ returns it
+function snapshotToGeoJSON(snapshot) {
+    const coordinates = snapshot.coordinates;
+    const features = [];
+    for (let i = 0; i < snapshot.count; i++) {
+        const properties = {
+            segment_id: snapshot.segmentIds[i],
+            // float32 on the wire; keep its 7 significant digits (0.2800000011920929 -> 0.28)
+            length: parseFloat(snapshot.lengths[i].toPrecision(7))
+        };
+        SNAPSHOT_STRING_PROPERTIES.forEach(name => {
+            properties[name] = snapshot[name][i];
+        });
+        features.push({
+            type: 'Feature',
+            properties: properties,
+            geometry: {
+                type: 'LineString',
+                coordinates: [
+                    [coordinates[4 * i], coordinates[4 * i + 1]],
+                    [coordinates[4 * i + 2], coordinates[4 * i + 3]]
+                ]
+            }
+        });
+    }
+    return {type: 'FeatureCollection', features: features, metadata: snapshot.metadata.metadata};
+}
+
+function buildPopupContent(props) {
+    const speed = props._current_speed;
+    // Ensure speedText handles null, undefined, and -1 appropriately
+    const speedText = (speed !== null && speed !== undefined && speed !== -1) ? `${speed} mph` : 'No data';
+
+    return `
+        <div style="font-size: 12px;">
+            <strong>${props.street} ${props.direction}</strong><br>
+            From: ${props.from_street}<br>
+            To: ${props.to_street}<br>
+            Current Speed: <strong>${speedText}</strong><br>
+            Length: ${props.length} miles<br>
+            Last Updated: ${current_timestamp ? new Date(current_timestamp).toLocaleString() : 'N/A'}
+        </div>
+    `;
+}
+
+// Function to load the static segment geometry once; speeds are applied to it afterwards
+function loadTrafficGeometry() {
+    return fetchSnapshot("/api/traffic-geometry/?format=binary")
+        .then(snapshotToGeoJSON)
         .then(data => {
             // Remove existing traffic layer if it exists
             if (trafficLayer) {
                 map.removeLayer(trafficLayer);
             }
 
-            // Set the next_timestamp from the API response metadata
-            // This is the timestamp for the *next* request
-            if (data.metadata && data.metadata.next_timestamp) {
-                next_timestamp = data.metadata.next_timestamp;
-            } else {
-                console.warn("API response did not contain 'next_timestamp' metadata.");
-                // Potentially reset or handle this scenario (e.g., if no data is found)
-                next_timestamp = ""; // Reset to initial state or oldest
-            }
-
-            console.log("Current data timestamp (from API response):", data.metadata.current_timestamp);
-            console.log("Next timestamp for subsequent request:", next_timestamp);
-
-            hold_data = data; // Assuming hold_data is used elsewhere
+            segmentLayers = [];
+            segmentsVersion = data.metadata.segments_version;
 
             // Create new traffic layer
             trafficLayer = L.geoJSON(data, {
                 style: function(feature) {
-                    const speed = feature.properties._current_speed;
                     return {
-                        color: getSpeedColor(speed),
-                        weight: getLineWidth(speed),
+                        color: getSpeedColor(null),
+                        weight: getLineWidth(null),
                         opacity: 0.8,
                         lineCap: 'round',
                         lineJoin: 'round'
                     };
                 },
                 onEachFeature: function(feature, layer) {
-                    const props = feature.properties;
-                    const speed = props._current_speed;
-                    // Ensure speedText handles null, undefined, and -1 appropriately
-                    const speedText = (speed !== null && speed !== undefined && speed !== -1) ? `${speed} mph` : 'No data';
-
-                    const popupContent = `
-                        <div style="font-size: 12px;">
-                            <strong>${props.street} ${props.direction}</strong><br>
-                            From: ${props.from_street}<br>
-                            To: ${props.to_street}<br>
-                            Current Speed: <strong>${speedText}</strong><br>
-                            Length: ${props.length} miles<br>
-                            Last Updated: ${props._last_updated ? new Date(props._last_updated).toLocaleString() : 'N/A'}
-                        </div>
-                    `;
-
-                    layer.bindPopup(popupContent);
+                    feature.properties._current_speed = null;
+                    segmentLayers.push(layer);
+
+                    // Built when opened so it always shows the latest speed
+                    layer.bindPopup(() => buildPopupContent(feature.properties));
 
                     // Add hover effects
                     layer.on('mouseover', function(e) {
                         this.setStyle({
-                            weight: this.options.weight + 2,
+                            weight: getLineWidth(this.feature.properties._current_speed) + 2,
                             opacity: 1
                         });
                     });
 
                     layer.on('mouseout', function(e) {
                         this.setStyle({
-                            weight: this.options.weight - 2,
+                            weight: getLineWidth(this.feature.properties._current_speed),
                             opacity: 0.8
                         });
                     });
@@ -153,15 +268,157 @@ function loadTrafficSegments() {
             if (data.features.length > 0) {
                 map.fitBounds(trafficLayer.getBounds());
             } else {
-                console.warn("No features returned for this timestamp.");
+                console.warn("No segments returned by the geometry API.");
             }
+        });
+}
+
+// Restyle one existing segment layer in place, skipping layers whose speed did not change
+function applySpeed(position, speed) {
+    const layer = segmentLayers[position];
+    if (!layer || layer.feature.properties._current_speed === speed) {
+        return;
+    }
+    layer.feature.properties._current_speed = speed;
+    layer.setStyle({
+        color: getSpeedColor(speed),
+        weight: getLineWidth(speed)
+    });
+}
+
+// Fetch the next window of frames (raw snapshots, or interpolated frames with ?step=) in one
+// request and queue them for local playback
+function prefetchFrames() {
+    // Only one window in flight at a time; frames must be queued in order
+    if (rangeRequestInFlight) {
+        return;
+    }
+
+    const params = new URLSearchParams({format: 'binary'});
+    if (PLAYBACK_STEP) {
+        params.set('step', PLAYBACK_STEP);
+        params.set('count', PLAYBACK_FRAMES);
+    } else {
+        params.set('count', PREFETCH_FRAMES);
+    }
+    // If next_timestamp is available, the window starts there
+    if (next_timestamp) {
+        params.set('start', next_timestamp);
+    }
+    const apiUrl = `/api/${PLAYBACK_STEP ? 'traffic-playback' : 'traffic-range'}/?${params.toString()}`;
+
+    rangeRequestInFlight = true;
+    fetchSnapshot(apiUrl)
+        .then(snapshot => {
+            const data = snapshot.metadata;
+            if (data.segments_version !== segmentsVersion) {
+                // Segments changed since the geometry was loaded; reload it and fetch this window again
+                console.log("Segment set changed, reloading geometry.");
+                frameBuffer = [];
+                return loadTrafficGeometry();
+            }
+
+            // One decoded speed frame per timestamp, aligned to the geometry order
+            data.timestamps.forEach((timestamp, column) => {
+                frameBuffer.push({
+                    timestamp: timestamp,
+                    speeds: snapshot.speeds[column]
+                });
+            });
+
+            // Set the next_timestamp from the API response metadata
+            // This is where the *next* window starts
+            if (data.metadata && data.metadata.next_timestamp) {
+                next_timestamp = data.metadata.next_timestamp;
+            } else {
+                console.warn("API response did not contain 'next_timestamp' metadata.");
+                // Potentially reset or handle this scenario (e.g., if no data is found)
+                next_timestamp = ""; // Reset to initial state or oldest
+            }
+
+            hold_data = data; // Assuming hold_data is used elsewhere
         })
         .catch(error => {
             console.error('Error loading traffic segments:', error);
             // Optionally, handle error by stopping the interval or showing a user message
+        })
+        .finally(() => {
+            rangeRequestInFlight = false;
+        });
+}
+
+// Function to advance the map by one frame, prefetching more frames when the buffer runs low
+function loadTrafficSegments() {
+    if (frameBuffer.length <= (PLAYBACK_STEP ? PLAYBACK_PREFETCH_THRESHOLD : PREFETCH_THRESHOLD)) {
+        prefetchFrames();
+    }
+
+    const frame = frameBuffer.shift();
+    if (!frame) {
+        return; // Still waiting for the first window
+    }
+
+    frame.speeds.forEach((speed, position) => applySpeed(position, speed));
+    current_timestamp = frame.timestamp;
+    console.log("Current data timestamp:", current_timestamp);
+}
+
+// Live mode: load one snapshot's full speed vector, reloading the geometry first if it changed
+function loadLiveSpeeds(timestamp) {
+    return fetchSnapshot(`/api/traffic-speeds/?datetime=${encodeURIComponent(timestamp)}&format=binary`)
+        .then(snapshot => {
+            const data = snapshot.metadata;
+            if (data.segments_version !== segmentsVersion) {
+                return loadTrafficGeometry().then(() => loadLiveSpeeds(timestamp));
+            }
+            snapshot.speeds[0].forEach((speed, position) => applySpeed(position, speed));
+            current_timestamp = data.metadata.current_timestamp;
+            console.log("Current data timestamp:", current_timestamp);
         });
 }
 
+// Live mode: subscribe to /api/traffic-live/ and apply each new snapshot as it is pushed
+function startLiveUpdates() {
+    const source = new EventSource('/api/traffic-live/');
+
+    // Sent on every (re)connect with the latest snapshot
+    source.addEventListener('hello', event => {
+        const data = JSON.parse(event.data);
+        if (data.timestamp) {
+            loadLiveSpeeds(data.timestamp).catch(error => console.error('Error loading live speeds:', error));
+        }
+    });
+
+    source.addEventListener('snapshot', event => {
+        const data = JSON.parse(event.data);
+        if (data.segments_version !== segmentsVersion || data.previous_timestamp !== current_timestamp) {
+            // The delta is relative to a snapshot we are not showing; load this one in full
+            loadLiveSpeeds(data.timestamp).catch(error => console.error('Error loading live speeds:', error));
+            return;
+        }
+        if (data.changes) {
+            data.changes.positions.forEach((position, i) => applySpeed(position, data.changes.speeds[i]));
+        } else {
+            data.speeds.forEach((speed, position) => applySpeed(position, speed));
+        }
+        current_timestamp = data.timestamp;
+        console.log("Current data timestamp:", current_timestamp);
+    });
+
+    // The server refused the stream (e.g. 501 under WSGI); EventSource does not retry that
+    source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED) {
+            console.error('Live updates are unavailable on this server; reload without ?live=1');
+        }
+    });
+
+    // We fell behind and missed events; reconnecting gets a fresh hello
+    source.addEventListener('resync', () => {
+        source.close();
+        startLiveUpdates();
+    });
+}
+
 // Function to create legend
 function createLegend() {
     const legend = L.control({position: 'bottomright'});
@@ -231,13 +488,25 @@ $(document).ready(function () {
     initializeMap();
     resizeMap();
 
-    loadTrafficSegments();
-
     // Create legend
     createLegend();
 
-    // Auto-refresh traffic data every 5 minutes
-    setInterval(loadTrafficSegments, 2000);
+    if (LIVE_MODE) {
+        // Geometry is loaded once; the server pushes each new snapshot, so there is no polling
+        loadTrafficGeometry()
+            .then(startLiveUpdates)
+            .catch(error => console.error('Error loading traffic geometry:', error));
+    } else {
+        // Geometry is loaded once; after that frames are prefetched in windows and played locally
+        loadTrafficGeometry()
+            .then(() => {
+                loadTrafficSegments();
+                // Advance the playback every FRAME_INTERVAL milliseconds (2 seconds per raw snapshot),
+                // only once there is geometry to apply the frames to
+                setInterval(loadTrafficSegments, FRAME_INTERVAL);
+            })
+            .catch(error => console.error('Error loading traffic geometry:', error));
+    }
 
 
     $(window).resize(resizeMap);
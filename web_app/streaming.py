@@ -0,0 +1,85 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Array items encoded per chunk written to the client
+STREAM_CHUNK_ITEMS = 500
+
+# Query parameter values that switch an endpoint to a streamed response
+STREAM_TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def wants_stream(request):
+    return request.GET.get('stream', '').lower() in STREAM_TRUE_VALUES
+
+
+def _encode_members(encoder, fields):
+    return ', '.join(f'{json.dumps(key)}: {encoder.encode(value)}' for key, value in fields.items())
+
+
+def _opening(encoder, head, array_key):
+    opening = _encode_members(encoder, head)
+    return ('{' + opening + (', ' if opening else '') + json.dumps(array_key) + ': [').encode('utf-8')
+
+
+def _closing(encoder, tail):
+    closing = _encode_members(encoder, tail())
+    return (']' + (', ' + closing if closing else '') + '}').encode('utf-8')
+
+
+def _encode_chunk(encoder, chunk, first):
+    return (('' if first else ', ') + ', '.join(encoder.encode(item) for item in chunk)).encode('utf-8')
+
+
+def iter_json_object(head, array_key, items, tail):
+    """
+    Yield the UTF-8 JSON encoding of {**head, array_key: [*items], **tail()} in chunks.
+
+    Only STREAM_CHUNK_ITEMS array items are held in memory at once. `tail` is called after
+    the items are exhausted, so it can report counts gathered while streaming.
+    """
+    encoder = DjangoJSONEncoder()
+    yield _opening(encoder, head, array_key)
+
+    first = True
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= STREAM_CHUNK_ITEMS:
+            yield _encode_chunk(encoder, chunk, first)
+            first = False
+            chunk = []
+    if chunk:
+        yield _encode_chunk(encoder, chunk, first)
+
+    yield _closing(encoder, tail)
+
+
+async def aiter_json_object(head, array_key, items, tail):
+    """iter_json_object for an async iterable of items (e.g. QuerySet.aiterator())."""
+    encoder = DjangoJSONEncoder()
+    yield _opening(encoder, head, array_key)
+
+    first = True
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= STREAM_CHUNK_ITEMS:
+            yield _encode_chunk(encoder, chunk, first)
+            first = False
+            chunk = []
+    if chunk:
+        yield _encode_chunk(encoder, chunk, first)
+
+    yield _closing(encoder, tail)
+
+
+def streaming_json_response(head, array_key, items, tail):
+    """StreamingHttpResponse for iter_json_object; memory stays flat regardless of item count."""
+    return StreamingHttpResponse(iter_json_object(head, array_key, items, tail), content_type='application/json')
+
+
+def async_streaming_json_response(head, array_key, items, tail):
+    """StreamingHttpResponse for aiter_json_object, for async views under ASGI."""
+    return StreamingHttpResponse(aiter_json_object(head, array_key, items, tail), content_type='application/json')
@@ -0,0 +1,15 @@
+"""
+web_app.urls as it is built under Traffic_sample/settings_asgi.py, for tests that compare
+the async views with the sync ones in the same process. The module is executed separately,
+so web_app.urls itself keeps the sync views.
+"""
+import importlib.util
+
+from django.test import override_settings
+
+with override_settings(TRAFFIC_ASYNC_VIEWS=True):
+    spec = importlib.util.find_spec('web_app.urls')
+    async_urls = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(async_urls)
+
+urlpatterns = async_urls.urlpatterns
@@ -0,0 +1,78 @@
+import csv
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from web_app import playback, vector_tiles
+from web_app.models import TrafficSegmentData
+from web_app.snapshot_cache import snapshot_responses, tile_responses
+from web_app.timestamp_index import snapshot_timestamps
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'web_app', 'data')
+LATEST_FILE = 'Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_2025-07-31-12-46-00.csv'
+SEGMENT_ID = 1284  # Lake Shore Dr segment present in every bundled file
+
+
+def chicago_tile(zoom=12):
+    """z, x, y of the tile holding downtown Chicago."""
+    x, y = vector_tiles.lonlat_to_tile_fraction(-87.6241, 41.8968, zoom)
+    return zoom, int(x), int(y)
+
+
+def import_traffic_data(data_dir, **options):
+    """Run the importer quietly and return what it printed."""
+    stdout = StringIO()
+    call_command('import_traffic_data', data_dir=data_dir, stdout=stdout, stderr=StringIO(), **options)
+    return stdout.getvalue()
+
+
+def reset_process_caches():
+    """The indexes and caches live in the process, outside the test transaction."""
+    snapshot_timestamps.invalidate()
+    snapshot_responses.clear()
+    tile_responses.clear()
+    playback.snapshot_arrays.clear()
+
+
+# Never publish to a configured hot store or shared timestamp cache. The async views
+# (TRAFFIC_ASYNC_VIEWS) query on their own connections, outside the test transaction, so
+# these tests run against the default sync views; test_async_views covers the async ones.
+@override_settings(TRAFFIC_HOT_STORE_PATH=None, TRAFFIC_TIMESTAMP_INDEX_CACHE=None)
+class BundledDataTestCase(TestCase):
+    """Imports the bundled CSVs once per class; every test starts with empty per-process caches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        import_traffic_data(DATA_DIR)
+
+    def setUp(self):
+        reset_process_caches()
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def write_changed_copy(self, filename, change):
+        """Copy a bundled CSV into self.data_dir, passing each data row (a dict) through `change` first."""
+        with open(os.path.join(DATA_DIR, filename), encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            fieldnames = reader.fieldnames
+            rows = [change(row) or row for row in reader]
+        with open(os.path.join(self.data_dir, filename), 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def set_speed(self, segment_id, speed):
+        """Row change for write_changed_copy setting one segment's CURRENT_SPEED."""
+        def change(row):
+            if row['SEGMENTID'] == str(segment_id):
+                row['CURRENT_SPEED'] = str(speed)
+        return change
+
+    def latest_speed(self, segment_id):
+        return TrafficSegmentData.objects.get(
+            segment_id=segment_id, recorded_at=snapshot_timestamps.latest()).current_speed
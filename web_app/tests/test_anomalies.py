@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import override_settings
+
+from web_app.anomalies import detect_snapshot_anomalies
+from web_app.models import SegmentBaseline, TrafficEvent, TrafficSegment
+from web_app.tests.base import DATA_DIR, SEGMENT_ID, BundledDataTestCase, import_traffic_data
+from web_app.timestamp_index import snapshot_timestamps
+
+MONDAY_3AM = datetime(2025, 8, 4, 8, 0, tzinfo=timezone.utc)  # 03:00 in Chicago, a slot the bundled files miss
+
+
+class DetectionTests(BundledDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Not on the class: the bundled import in setUpTestData keeps the default
+        self.enterContext(override_settings(TRAFFIC_ANOMALY_MIN_SAMPLES=3))
+
+    def detect(self, minutes, speed):
+        return detect_snapshot_anomalies(MONDAY_3AM + timedelta(minutes=minutes), {SEGMENT_ID: speed})
+
+    def event(self):
+        return TrafficEvent.objects.get(segment_id=SEGMENT_ID)
+
+    def test_event_opens_and_closes(self):
+        for minutes in (0, 5, 10):
+            self.assertEqual(self.detect(minutes, 30), (0, 0))
+        self.assertFalse(TrafficEvent.objects.exists())
+
+        self.assertEqual(self.detect(15, 10), (1, 0))
+        event = self.event()
+        self.assertEqual((event.baseline_speed, event.start_speed, event.ended_at), (30, 10, None))
+
+        self.assertEqual(self.detect(20, 8), (0, 0))
+        event = self.event()
+        self.assertEqual((event.min_speed, event.snapshot_count), (8, 2))
+        self.assertEqual(event.last_seen_at, MONDAY_3AM + timedelta(minutes=20))
+
+        self.assertEqual(self.detect(25, 29), (0, 1))
+        self.assertEqual(self.event().ended_at, MONDAY_3AM + timedelta(minutes=25))
+
+    def test_speed_without_estimate_changes_nothing(self):
+        self.detect(0, 30)
+        self.detect(5, -1)
+        self.assertEqual(SegmentBaseline.objects.get(segment_id=SEGMENT_ID, updated_at=MONDAY_3AM).sample_count, 1)
+
+    def test_repeated_snapshot_is_not_applied_twice(self):
+        for minutes in (0, 5, 10, 15, 20):
+            self.detect(minutes, 30 if minutes < 15 else 10)
+        baseline = SegmentBaseline.objects.get(segment_id=SEGMENT_ID, updated_at=MONDAY_3AM + timedelta(minutes=20))
+        self.assertEqual(self.detect(20, 10), (0, 0))
+        self.assertEqual(self.detect(10, 30), (0, 0))  # Older than the baseline's last sample
+        self.assertEqual(SegmentBaseline.objects.get(pk=baseline.pk).sample_count, baseline.sample_count)
+        self.assertEqual(SegmentBaseline.objects.get(pk=baseline.pk).mean_speed, baseline.mean_speed)
+        self.assertEqual(self.event().snapshot_count, 2)
+
+    def test_forced_reimport_leaves_baselines_alone(self):
+        baselines = set(SegmentBaseline.objects.values_list('segment_id', 'slot', 'mean_speed', 'variance',
+                                                            'sample_count', 'updated_at'))
+        self.assertTrue(baselines)
+        import_traffic_data(DATA_DIR, force=True)
+        self.assertEqual(set(SegmentBaseline.objects.values_list('segment_id', 'slot', 'mean_speed', 'variance',
+                                                                 'sample_count', 'updated_at')), baselines)
+
+
+class EventsApiTests(BundledDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        latest = snapshot_timestamps.latest()
+        ashland = TrafficSegment.objects.filter(street='Ashland', direction='NB').first()
+        event = dict(baseline_speed=30, start_speed=10, min_speed=8, min_z_score=-5.0)
+        self.active = TrafficEvent.objects.create(
+            segment=ashland, started_at=latest - timedelta(minutes=10), last_seen_at=latest, **event)
+        self.ended = TrafficEvent.objects.create(
+            segment_id=SEGMENT_ID, started_at=latest - timedelta(hours=2), last_seen_at=latest - timedelta(hours=1),
+            ended_at=latest - timedelta(minutes=55), **event)
+        self.old = TrafficEvent.objects.create(
+            segment_id=SEGMENT_ID, started_at=latest - timedelta(days=3), last_seen_at=latest - timedelta(days=3),
+            ended_at=latest - timedelta(days=2), **event)
+
+    def event_ids(self, **params):
+        response = self.client.get('/api/traffic-events/', params)
+        self.assertEqual(response.status_code, 200)
+        return [event['event_id'] for event in response.json()['events']]
+
+    def test_events_of_the_last_day_newest_first(self):
+        self.assertEqual(self.event_ids(), [self.active.id, self.ended.id])
+
+    def test_active_filter(self):
+        self.assertEqual(self.event_ids(active='true'), [self.active.id])
+        self.assertEqual(self.event_ids(active='false'), [self.ended.id])
+
+    def test_street_and_direction(self):
+        self.assertEqual(self.event_ids(street='ASHLAND', direction='nb'), [self.active.id])
+        self.assertEqual(self.event_ids(street='Ashland', direction='SB'), [])
+
+    def test_range_and_limit(self):
+        start = (snapshot_timestamps.latest() - timedelta(days=4)).isoformat()
+        self.assertEqual(self.event_ids(start=start), [self.active.id, self.ended.id, self.old.id])
+        self.assertEqual(self.event_ids(start=start, limit=2), [self.active.id, self.ended.id])
+
+    def test_event_data(self):
+        event = self.client.get('/api/traffic-events/', {'active': 'true'}).json()['events'][0]
+        self.assertEqual(event['street'], 'Ashland')
+        self.assertTrue(event['active'])
+        self.assertEqual(event['drop_ratio'], round(1 - 8 / 30, 3))
@@ -0,0 +1,84 @@
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase, override_settings
+
+from web_app import async_views
+from web_app.tests.base import DATA_DIR, SEGMENT_ID, chicago_tile, import_traffic_data, reset_process_caches
+from web_app.tests.async_urls import urlpatterns
+from web_app.timestamp_index import snapshot_timestamps
+
+
+def api_urls():
+    """Requests covering every async endpoint and its main options."""
+    # Naive (UTC) datetimes: a '+' in a query string would read as a space
+    oldest, second, latest = (timestamp.replace(tzinfo=None).isoformat() for timestamp in (
+        snapshot_timestamps.oldest(), snapshot_timestamps.timestamps()[1], snapshot_timestamps.latest()))
+    z, x, y = chicago_tile()
+    return [
+        '/api/traffic-segments/',
+        f'/api/traffic-segments/?datetime={latest}',
+        f'/api/traffic-segments/?datetime={latest}&bbox=-87.7,41.8,-87.6,41.9&min_speed=20',
+        '/api/traffic-segments/?stream=1&street=Ashland',
+        f'/api/traffic-segments/?datetime={latest}&format=binary',
+        '/api/traffic-segments/?bbox=1,2',
+        '/api/traffic-segments/?datetime=garbage',
+        '/api/traffic-geometry/',
+        f'/api/traffic-speeds/?datetime={latest}',
+        f'/api/traffic-speeds/?datetime={latest}&base={second}',
+        f'/api/traffic-speeds/?datetime={latest}&format=binary',
+        '/api/traffic-range/?count=3',
+        '/api/traffic-range/?count=3&stream=1',
+        f'/api/traffic-playback/?start={second}&step=150&count=4',
+        f'/api/traffic-series/?segment_ids=951,{SEGMENT_ID},99999999&start={oldest}',
+        f'/api/traffic-series/?segment_ids={SEGMENT_ID}&start={oldest}&bucket=10',
+        '/api/traffic-series/?segment_ids=x',
+        '/api/traffic-congestion/?street=Ashland',
+        f'/api/traffic-congestion-index/?start={oldest}',
+        '/api/traffic-events/',
+        f'/api/traffic-tiles/{z}/{x}/{y}.mvt?datetime={latest}',
+    ]
+
+
+# The async views open their own connections (thread_sensitive=False), which see only
+# committed data, so the bundled files are imported outside a test transaction.
+@override_settings(TRAFFIC_HOT_STORE_PATH=None, TRAFFIC_TIMESTAMP_INDEX_CACHE=None)
+class AsyncViewTests(TransactionTestCase):
+
+    def setUp(self):
+        import_traffic_data(DATA_DIR)
+        reset_process_caches()
+
+    def sync_get(self, url):
+        response = self.client.get(url)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, response.get('Content-Type'), body
+
+    def async_get(self, url, **headers):
+        async def get():
+            response = await self.async_client.get(url, headers=headers)
+            if response.streaming:
+                body = b''.join([chunk async for chunk in response.streaming_content])
+            else:
+                body = response.content
+            return response.status_code, response.get('Content-Type'), body, response
+        with self.settings(ROOT_URLCONF='web_app.tests.async_urls'):
+            return async_to_sync(get)()
+
+    def test_urls_route_to_the_async_views(self):
+        views = {pattern.name: pattern.callback for pattern in urlpatterns}
+        self.assertIs(views['traffic_segments_api'], async_views.traffic_segments_api)
+        self.assertIs(views['traffic_tiles_api'], async_views.traffic_tiles_api)
+
+    def test_same_responses_as_the_sync_views(self):
+        for url in api_urls():
+            with self.subTest(url=url):
+                expected = self.sync_get(url)
+                # Built by the async view, not served from what the sync view cached
+                reset_process_caches()
+                self.assertEqual(self.async_get(url)[:3], expected)
+
+    def test_cached_responses_and_etags(self):
+        url = f'/api/traffic-segments/?datetime={snapshot_timestamps.latest().replace(tzinfo=None).isoformat()}'
+        status, _, body, response = self.async_get(url)
+        self.assertEqual(status, 200)
+        self.assertEqual(self.async_get(url)[2], body)
+        self.assertEqual(self.async_get(url, if_none_match=response['ETag'])[0], 304)
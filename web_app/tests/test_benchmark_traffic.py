@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from web_app.management.commands.benchmark_traffic import RESULT_FORMAT_VERSION, SCENARIOS
+
+
+class BenchmarkSmokeTests(SimpleTestCase):
+
+    def test_tiny_run_writes_a_complete_report(self):
+        # In its own process: the command sets up and tears down its own test databases
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = os.path.join(output_dir, 'results.json')
+            subprocess.run(
+                [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_traffic',
+                 '--segments', '1500', '--snapshots', '2', '--requests', '6', '--concurrency', '2',
+                 '--output', output, '--verbosity', '0'],
+                check=True, capture_output=True, timeout=300)
+            with open(output, encoding='utf-8') as file:
+                results = json.load(file)
+
+        self.assertEqual(results['format_version'], RESULT_FORMAT_VERSION)
+        self.assertEqual(set(results), {'format_version', 'environment', 'parameters', 'dataset', 'import', 'api'})
+        self.assertEqual(results['environment']['database'], 'sqlite')
+        self.assertEqual(results['parameters']['segments'], 1500)
+        # 1500 segments take a second, shifted copy of the source rows
+        dataset = results['dataset']
+        self.assertEqual((dataset['segments'], dataset['snapshots'], dataset['rows']), (1500, 2, 3000))
+        self.assertEqual(len(dataset['bbox']), 4)
+        self.assertEqual(len(dataset['extent']), 4)
+
+        self.assertEqual(results['import']['rows'], 3000)
+        self.assertGreater(results['import']['rows_per_second'], 0)
+        self.assertEqual(set(results['api']), set(SCENARIOS))
+        for name, scenario in results['api'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual((scenario['requests'], scenario['errors']), (6, 0))
+                self.assertEqual(set(scenario['latency_ms']), {'min', 'mean', 'p50', 'p95', 'p99', 'max'})
+                self.assertLessEqual(scenario['latency_ms']['p50'], scenario['latency_ms']['p99'])
+                self.assertGreater(scenario['response_bytes']['identity'], scenario['response_bytes']['gzip'])
@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from web_app.congestion import WORST_SEGMENT_COUNT, build_summary
+from web_app.models import CongestionSummary, TrafficSegmentData, TrafficSegmentRollup
+from web_app.tests.base import BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class BuildSummaryTests(SimpleTestCase):
+
+    def test_statistics(self):
+        # (segment_id, current_speed, length); segment 3 has no estimate
+        summary = build_summary(None, 'Ashland', 'NB', [(1, 10, 1.0), (2, 30, 3.0), (3, -1, 5.0), (4, 20, 0.0)])
+        self.assertEqual((summary.segment_count, summary.reporting_count, summary.reporting_length), (4, 3, 4.0))
+        self.assertEqual(summary.mean_speed, 25.0)  # (10 * 1 + 30 * 3 + 20 * 0) / 4
+        self.assertEqual(summary.congestion_index, 0.25)  # 1 of 4 reporting length units under 25 mph
+        self.assertEqual(summary.share_below_15, 0.3333)
+        self.assertEqual(summary.share_below_25, 0.6667)
+        self.assertEqual(summary.worst_segments, [
+            {"segment_id": 1, "speed": 10}, {"segment_id": 4, "speed": 20}, {"segment_id": 2, "speed": 30}])
+
+    def test_worst_segments_are_capped_and_ordered_by_id_on_ties(self):
+        summary = build_summary(None, '', '', [(segment_id, 20, 1.0) for segment_id in range(10, 0, -1)])
+        self.assertEqual([entry["segment_id"] for entry in summary.worst_segments],
+                         list(range(1, WORST_SEGMENT_COUNT + 1)))
+
+    def test_zero_length_falls_back_to_the_plain_mean(self):
+        summary = build_summary(None, '', '', [(1, 10, 0.0), (2, 30, 0.0)])
+        self.assertEqual(summary.mean_speed, 20.0)
+        self.assertIsNone(summary.congestion_index)
+
+    def test_no_estimates(self):
+        summary = build_summary(None, '', '', [(1, -1, 1.0)])
+        self.assertEqual((summary.segment_count, summary.reporting_count), (1, 0))
+        self.assertIsNone(summary.mean_speed)
+        self.assertEqual(summary.worst_segments, [])
+
+
+class CongestionApiTests(BundledDataTestCase):
+
+    def congestion(self, **params):
+        response = self.client.get('/api/traffic-congestion/', {'datetime': snapshot_timestamps.latest().isoformat(),
+                                                                **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_city_summary_of_the_stored_snapshot(self):
+        observations = TrafficSegmentData.objects.filter(
+            recorded_at=snapshot_timestamps.latest(), current_speed__gte=0).values_list(
+            'segment_id', 'current_speed', 'segment__length')
+        total_length = sum(length for _, _, length in observations)
+        city = self.congestion()['city']
+        self.assertEqual(city['reporting_count'], len(observations))
+        self.assertAlmostEqual(city['mean_speed'],
+                               sum(speed * length for _, speed, length in observations) / total_length, places=2)
+        self.assertAlmostEqual(city['congestion_index'],
+                               sum(length for _, speed, length in observations if speed < 25) / total_length, places=4)
+        self.assertEqual(city['worst_segments'][0]['speed'], min(speed for _, speed, _ in observations))
+
+    def test_corridors_most_congested_first(self):
+        corridors = self.congestion()['corridors']
+        self.assertEqual(len(corridors), CongestionSummary.objects.filter(
+            recorded_at=snapshot_timestamps.latest()).exclude(street='').count())
+        indexes = [corridor['congestion_index'] for corridor in corridors if corridor['congestion_index'] is not None]
+        self.assertEqual(indexes, sorted(indexes, reverse=True))
+
+    def test_corridor_filters(self):
+        data = self.congestion(street='ashland')
+        self.assertIsNotNone(data['city'])
+        self.assertEqual({corridor['street'] for corridor in data['corridors']}, {'Ashland'})
+        self.assertEqual({corridor['direction'] for corridor in data['corridors']}, {'NB', 'SB'})
+
+        data = self.congestion(street='Ashland', direction='nb')
+        self.assertEqual([(corridor['street'], corridor['direction']) for corridor in data['corridors']],
+                         [('Ashland', 'NB')])
+        self.assertEqual({corridor['direction'] for corridor in self.congestion(direction='SW')['corridors']}, {'SW'})
+
+    def test_congestion_index_series(self):
+        start = snapshot_timestamps.oldest().isoformat()
+        response = self.client.get('/api/traffic-congestion-index/', {'start': start}).json()
+        self.assertEqual(response['timestamps'], [timestamp.isoformat() for timestamp in snapshot_timestamps.timestamps()])
+        self.assertEqual(response['congestion_index'][-1], self.congestion()['city']['congestion_index'])
+
+        corridor = self.client.get('/api/traffic-congestion-index/',
+                                   {'start': start, 'street': 'ASHLAND', 'direction': 'nb'}).json()
+        self.assertEqual((corridor['metadata']['street'], corridor['metadata']['direction']), ('Ashland', 'NB'))
+        self.assertEqual(corridor['mean_speed'][-1], self.congestion(street='Ashland', direction='NB')
+                         ['corridors'][0]['mean_speed'])
+
+        # A street alone is not a corridor
+        city = self.client.get('/api/traffic-congestion-index/', {'start': start, 'street': 'Ashland'}).json()
+        self.assertEqual(city['congestion_index'], response['congestion_index'])
+
+    def test_retention_keeps_the_city_rows(self):
+        city = list(CongestionSummary.objects.filter(street='').order_by('recorded_at').values_list(
+            'recorded_at', 'congestion_index'))
+        self.assertEqual(len(city), 4)
+        # The bundled snapshots are far older than the default 30 days of raw retention
+        call_command('apply_traffic_retention', stdout=StringIO())
+        self.assertFalse(TrafficSegmentData.objects.exists())
+        self.assertTrue(TrafficSegmentRollup.objects.exists())
+        self.assertEqual(list(CongestionSummary.objects.order_by('recorded_at').values_list(
+            'recorded_at', 'congestion_index')), city)
@@ -0,0 +1,52 @@
+import csv
+import os
+
+from web_app.models import ImportedFile, QuarantinedRow
+from web_app.tests.base import DATA_DIR, LATEST_FILE, SEGMENT_ID, BundledDataTestCase, import_traffic_data
+
+
+class QuarantineTests(BundledDataTestCase):
+
+    def quarantined_reasons(self):
+        return sorted(QuarantinedRow.objects.filter(filename=LATEST_FILE).values_list('reason', flat=True))
+
+    def bundled_row(self, segment_id):
+        with open(os.path.join(DATA_DIR, LATEST_FILE), encoding='utf-8', newline='') as file:
+            return next(row for row in csv.DictReader(file) if row['SEGMENTID'] == str(segment_id))
+
+    def test_bundled_files_have_no_rejected_rows(self):
+        self.assertFalse(QuarantinedRow.objects.exists())
+        self.assertEqual(ImportedFile.objects.get(filename=LATEST_FILE).rows_skipped, 0)
+
+    def test_reimport_replaces_quarantined_rows(self):
+        def dirty(row):
+            if row['SEGMENTID'] == str(SEGMENT_ID):
+                row['START_LONGITUDE'] = '-10.0'
+            elif row['SEGMENTID'] == '951':
+                row['CURRENT_SPEED'] = '500'
+        self.write_changed_copy(LATEST_FILE, dirty)
+        import_traffic_data(self.data_dir)
+        self.assertEqual(self.quarantined_reasons(), [QuarantinedRow.INVALID_SPEED, QuarantinedRow.OUT_OF_BOUNDS])
+        self.assertEqual(ImportedFile.objects.get(filename=LATEST_FILE).rejected_reasons,
+                         {QuarantinedRow.INVALID_SPEED: 1, QuarantinedRow.OUT_OF_BOUNDS: 1})
+
+        # Fixing one row replaces the file's quarantine instead of adding to it
+        self.write_changed_copy(LATEST_FILE, self.set_speed(951, 500))
+        import_traffic_data(self.data_dir)
+        self.assertEqual(self.quarantined_reasons(), [QuarantinedRow.INVALID_SPEED])
+        self.assertEqual(self.latest_speed(SEGMENT_ID), int(self.bundled_row(SEGMENT_ID)['CURRENT_SPEED']))
+
+    def test_non_finite_values_are_quarantined(self):
+        def dirty(row):
+            if row['SEGMENTID'] == str(SEGMENT_ID):
+                row['START_LONGITUDE'] = 'nan'
+            elif row['SEGMENTID'] == '951':
+                row['LENGTH'] = 'inf'
+        self.write_changed_copy(LATEST_FILE, dirty)
+        import_traffic_data(self.data_dir)
+        self.assertEqual(self.quarantined_reasons(), [QuarantinedRow.INVALID_VALUE, QuarantinedRow.OUT_OF_BOUNDS])
+        self.assertEqual(set(QuarantinedRow.objects.values_list('segment_id', flat=True)), {951, SEGMENT_ID})
+        # The rest of the snapshot is written
+        imported = ImportedFile.objects.get(filename=LATEST_FILE)
+        self.assertEqual((imported.rows_inserted, imported.rows_skipped), (1255, 2))
+        self.assertEqual(self.latest_speed(SEGMENT_ID), int(self.bundled_row(SEGMENT_ID)['CURRENT_SPEED']))
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.test import TransactionTestCase, override_settings
+
+from web_app.db_router import TrafficReadRouter, primary_reads
+from web_app.models import ImportedFile, TrafficSegment, TrafficSegmentData
+
+
+# Reads are only routed outside atomic blocks, so these tests cannot run inside TestCase's
+# transaction. The 'replica' alias is only looked up by name: QuerySet.db never connects.
+@override_settings(DATABASE_ROUTERS=['web_app.db_router.TrafficReadRouter'], TRAFFIC_READ_DATABASE='replica')
+class TrafficReadRouterTests(TransactionTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.DATABASES, replica=settings.DATABASES['default'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(TrafficSegment.objects.all().db, 'replica')
+        self.assertEqual(TrafficSegmentData.objects.filter(current_speed__gte=0).db, 'replica')
+        # Other apps read from the primary
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_primary_reads(self):
+        with primary_reads():
+            self.assertEqual(TrafficSegment.objects.all().db, 'default')
+            # Threads started through asgiref inherit it
+            self.assertEqual(async_to_sync(sync_to_async(lambda: TrafficSegment.objects.all().db,
+                                                         thread_sensitive=False))(), 'default')
+        self.assertEqual(TrafficSegment.objects.all().db, 'replica')
+
+    def test_reads_in_a_transaction_stay_on_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(TrafficSegment.objects.all().db, 'default')
+        self.assertEqual(TrafficSegment.objects.all().db, 'replica')
+
+    def test_writes_go_to_the_primary(self):
+        for model in (TrafficSegment, TrafficSegmentData, ImportedFile, User):
+            self.assertEqual(router.db_for_write(model), 'default')
+        segment = TrafficSegment.objects.create(
+            segment_id=1, street='Ashland', direction='NB', from_street='A', to_street='B', length=0.5,
+            start_longitude=-87.66, start_latitude=41.88, end_longitude=-87.66, end_latitude=41.89)
+        self.assertEqual(segment._state.db, 'default')
+
+    def test_schema_comes_from_the_primary(self):
+        self.assertFalse(TrafficReadRouter().allow_migrate('replica', 'web_app'))
+        self.assertIsNone(TrafficReadRouter().allow_migrate('default', 'web_app'))
+
+    def test_without_a_read_alias_nothing_is_routed(self):
+        with override_settings(TRAFFIC_READ_DATABASE='standby'):
+            self.assertEqual(TrafficSegment.objects.all().db, 'default')
@@ -0,0 +1,22 @@
+import os
+
+from django.test import override_settings
+
+from web_app.hot_store import hot_snapshots
+from web_app.snapshot_cache import snapshot_responses
+from web_app.tests.base import BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class HotStoreTests(BundledDataTestCase):
+
+    def test_published_snapshots_match_the_database(self):
+        latest = snapshot_timestamps.latest().isoformat()
+        from_database = self.client.get('/api/traffic-segments/', {'datetime': latest}).content
+
+        with override_settings(TRAFFIC_HOT_STORE_PATH=os.path.join(self.data_dir, 'hot.tsnp')):
+            self.assertEqual(hot_snapshots.publish(), 4)
+            snapshot_responses.clear()
+            with self.assertNumQueries(0):
+                from_store = self.client.get('/api/traffic-segments/', {'datetime': latest}).content
+        self.assertEqual(from_store, from_database)
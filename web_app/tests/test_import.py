@@ -0,0 +1,29 @@
+from web_app.models import ImportedFile, TrafficSegment, TrafficSegmentData
+from web_app.tests.base import DATA_DIR, LATEST_FILE, SEGMENT_ID, BundledDataTestCase, import_traffic_data
+
+
+class ImportLedgerTests(BundledDataTestCase):
+
+    def test_unchanged_files_are_skipped(self):
+        ledger = dict(ImportedFile.objects.values_list('filename', 'imported_at'))
+        output = import_traffic_data(DATA_DIR)
+        self.assertIn("Files already imported (unchanged): 4", output)
+        self.assertEqual(dict(ImportedFile.objects.values_list('filename', 'imported_at')), ledger)
+
+    def test_changed_file_is_reimported(self):
+        checksum = ImportedFile.objects.get(filename=LATEST_FILE).checksum
+        self.write_changed_copy(LATEST_FILE, self.set_speed(SEGMENT_ID, 77))
+        output = import_traffic_data(self.data_dir)
+        self.assertIn("Files successfully processed: 1", output)
+        self.assertNotEqual(ImportedFile.objects.get(filename=LATEST_FILE).checksum, checksum)
+        self.assertEqual(self.latest_speed(SEGMENT_ID), 77)
+
+    def test_forced_reimport_is_idempotent(self):
+        counts = (TrafficSegment.objects.count(), TrafficSegmentData.objects.count(), ImportedFile.objects.count())
+        speeds = set(TrafficSegmentData.objects.values_list('segment_id', 'recorded_at', 'current_speed'))
+        output = import_traffic_data(DATA_DIR, force=True)
+        self.assertIn("Files successfully processed: 4", output)
+        self.assertEqual(
+            (TrafficSegment.objects.count(), TrafficSegmentData.objects.count(), ImportedFile.objects.count()), counts)
+        self.assertEqual(set(TrafficSegmentData.objects.values_list('segment_id', 'recorded_at', 'current_speed')),
+                         speeds)
@@ -0,0 +1,7 @@
+from web_app.tests.base import BundledDataTestCase
+
+
+class LiveUpdatesTests(BundledDataTestCase):
+
+    def test_stream_needs_asgi(self):
+        self.assertEqual(self.client.get('/api/traffic-live/').status_code, 501)
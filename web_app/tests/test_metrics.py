@@ -0,0 +1,109 @@
+import importlib
+import os
+import re
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from web_app import metrics
+from web_app.tests.base import BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+
+# One sample line of the Prometheus text format: name, optional labels, value
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]+="[^"]*",?)*\})? -?[0-9.e+-]+$')
+
+
+class MetricTypeTests(SimpleTestCase):
+
+    def test_counter(self):
+        counter = metrics.Counter('test_total', 'Test.', ('view',))
+        counter.inc('a')
+        counter.inc('a', amount=2)
+        counter.inc('b"\n')
+        self.assertEqual(counter.render(), [
+            '# HELP test_total Test.', '# TYPE test_total counter',
+            'test_total{view="a"} 3', 'test_total{view="b\\"\\n"} 1'])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', buckets=(1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(value)
+        self.assertEqual(histogram.render(), [
+            '# HELP test_seconds Test.', '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="1"} 2', 'test_seconds_bucket{le="5"} 3', 'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 11.5', 'test_seconds_count 4'])
+
+    def test_allowed_clients(self):
+        allowed = ['127.0.0.1', '10.0.0.0/8', 'fc00::/7']
+        for address in ('127.0.0.1', '10.20.30.40', 'fd12::1'):
+            self.assertTrue(metrics.is_allowed_client(address, allowed), address)
+        for address in ('127.0.0.2', '8.8.8.8', '2001:db8::1', '', 'unknown'):
+            self.assertFalse(metrics.is_allowed_client(address, allowed), address)
+
+    def test_production_only_allows_internal_clients(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('TRAFFIC_METRICS_ALLOWED_IPS', None)
+            production = importlib.reload(importlib.import_module('Traffic_sample.settings_production'))
+        for address in ('127.0.0.1', '::1', '10.1.2.3', '172.16.5.4', '192.168.1.10'):
+            self.assertTrue(metrics.is_allowed_client(address, production.TRAFFIC_METRICS_ALLOWED_IPS), address)
+        for address in ('8.8.8.8', '172.32.0.1', '2001:db8::1'):
+            self.assertFalse(metrics.is_allowed_client(address, production.TRAFFIC_METRICS_ALLOWED_IPS), address)
+
+
+class RequestMetricsTests(BundledDataTestCase):
+
+    def segments_url(self):
+        return f'/api/traffic-segments/?datetime={snapshot_timestamps.latest().replace(tzinfo=None).isoformat()}'
+
+    def series(self, histogram, *label_values):
+        """(count, sum) recorded so far by a histogram for one label set."""
+        series = histogram._series.get(label_values)
+        return (sum(series[:-1]), series[-1]) if series else (0, 0)
+
+    def test_middleware_records_the_request(self):
+        view = 'traffic_segments_api'
+        requests = metrics.requests_total._values.get((view, 200), 0)
+        sizes = self.series(metrics.response_size, view)
+        queries = self.series(metrics.request_queries, view)
+        fetches = self.series(metrics.phase_duration, view, 'fetch')
+
+        response = self.client.get(self.segments_url())
+
+        self.assertEqual(metrics.requests_total._values[(view, 200)], requests + 1)
+        self.assertEqual(self.series(metrics.response_size, view), (sizes[0] + 1, sizes[1] + len(response.content)))
+        self.assertEqual(self.series(metrics.request_queries, view)[0], queries[0] + 1)
+        self.assertGreater(self.series(metrics.request_queries, view)[1], queries[1])
+        self.assertEqual(self.series(metrics.phase_duration, view, 'fetch')[0], fetches[0] + 1)
+
+    def test_server_timing(self):
+        with override_settings(TRAFFIC_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(self.segments_url()))
+        with override_settings(TRAFFIC_SERVER_TIMING=True):
+            header = self.client.get('/api/traffic-geometry/')['Server-Timing']
+        entries = [entry.split(';')[0] for entry in header.split(', ')]
+        self.assertEqual(entries[0], 'db')
+        self.assertEqual(entries[-1], 'total')
+        self.assertRegex(header, r'^db;dur=[0-9.]+;desc="[0-9]+ queries", ')
+
+    def test_exposition_format(self):
+        self.client.get(self.segments_url())
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.PROMETHEUS_CONTENT_TYPE)
+        lines = response.content.decode().splitlines()
+        for line in lines:
+            if line.startswith('#'):
+                self.assertRegex(line, r'^# (HELP [a-z_]+ .+|TYPE [a-z_]+ (counter|histogram|gauge))$')
+            else:
+                self.assertRegex(line, SAMPLE_LINE)
+        self.assertIn('traffic_http_requests_total{view="traffic_segments_api",status="200"}',
+                      '\n'.join(lines))
+        self.assertIn('traffic_import_files 4', lines)
+        self.assertIn(f'traffic_latest_snapshot_timestamp_seconds {snapshot_timestamps.latest().timestamp()}', lines)
+
+    def test_access(self):
+        with override_settings(TRAFFIC_METRICS_ALLOWED_IPS=['10.0.0.0/8']):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)  # The test client is 127.0.0.1
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+        with override_settings(TRAFFIC_METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
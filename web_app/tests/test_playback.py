@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+from web_app import playback
+from web_app.models import TrafficSegment, TrafficSegmentData
+from web_app.tests.base import BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class PlaybackTests(BundledDataTestCase):
+
+    def test_bracket(self):
+        first, second = snapshot_timestamps.timestamps()[:2]
+        self.assertEqual(playback.bracket(first), (first, None, 0.0))
+        self.assertEqual(playback.bracket(first + (second - first) / 2), (first, second, 0.5))
+
+    def test_interpolate(self):
+        missing = playback.MISSING
+        self.assertEqual(playback.interpolate([10, -1, 30, missing], [20, 40, missing, 5], 0.25), [12, -1, 30, None])
+        self.assertEqual(playback.interpolate([10, -1, 30, missing], [20, 40, missing, 5], 0.75), [18, 40, None, 5])
+
+    def test_playback_api_interpolates_between_snapshots(self):
+        first, second = snapshot_timestamps.timestamps()[1:3]  # The first two bundled snapshots have equal speeds
+        response = self.client.get('/api/traffic-playback/', {'start': first.isoformat(), 'step': 150, 'count': 3})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['timestamps'], [(first + timedelta(seconds=150 * index)).isoformat()
+                                              for index in range(3)])
+
+        ids = list(TrafficSegment.objects.order_by('segment_id').values_list('segment_id', flat=True))
+        before = dict(TrafficSegmentData.objects.filter(recorded_at=first).values_list('segment_id', 'current_speed'))
+        after = dict(TrafficSegmentData.objects.filter(recorded_at=second).values_list('segment_id', 'current_speed'))
+        position, segment_id = next((position, segment_id) for position, segment_id in enumerate(ids)
+                                    if before.get(segment_id, -1) >= 0 and after.get(segment_id, -1) >= 0
+                                    and before[segment_id] != after[segment_id])
+        self.assertEqual(data['frames'][0][position], before[segment_id])
+        self.assertEqual(data['frames'][1][position],
+                         round(before[segment_id] + (after[segment_id] - before[segment_id]) * 0.5))
+        self.assertEqual(data['frames'][2][position], after[segment_id])
+
+    def test_step_out_of_range(self):
+        for step in (0, settings.TRAFFIC_PLAYBACK_MAX_STEP + 1, 10 ** 18):
+            self.assertEqual(self.client.get('/api/traffic-playback/', {'step': step}).status_code, 400)
@@ -0,0 +1,94 @@
+import random
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from web_app.models import TrafficSegment, TrafficSegmentData
+from web_app.spatial_index import STRTree
+from web_app.tests.base import BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+from web_app.views import bbox_filter
+
+BBOX = (-87.70, 41.85, -87.62, 41.90)  # West side to the Loop
+
+
+class STRTreeTests(SimpleTestCase):
+
+    def test_query_matches_a_scan(self):
+        randomizer = random.Random(0)
+        entries = []
+        for item in range(1000):
+            x, y = randomizer.uniform(0, 100), randomizer.uniform(0, 100)
+            entries.append((x, y, x + randomizer.uniform(0, 5), y + randomizer.uniform(0, 5), item))
+        tree = STRTree(entries)
+        for _ in range(50):
+            x, y = randomizer.uniform(-10, 100), randomizer.uniform(-10, 100)
+            box = (x, y, x + randomizer.uniform(0, 30), y + randomizer.uniform(0, 30))
+            expected = {item for min_x, min_y, max_x, max_y, item in entries
+                        if min_x <= box[2] and max_x >= box[0] and min_y <= box[3] and max_y >= box[1]}
+            self.assertEqual(set(tree.query(*box)), expected)
+
+    def test_empty_tree(self):
+        self.assertEqual(STRTree([]).query(0, 0, 1, 1), [])
+
+
+class SegmentFilterTests(BundledDataTestCase):
+
+    def segments(self, **params):
+        """segment_id -> feature properties of the latest snapshot, filtered by `params`."""
+        response = self.client.get('/api/traffic-segments/', {'datetime': snapshot_timestamps.latest().isoformat(),
+                                                              **params})
+        self.assertEqual(response.status_code, 200)
+        return {feature['properties']['segment_id']: feature['properties']
+                for feature in response.json()['features']}
+
+    def segments_in_bbox(self, west, south, east, north):
+        return {segment.segment_id for segment in TrafficSegment.objects.all()
+                if min(segment.start_longitude, segment.end_longitude) <= east
+                and max(segment.start_longitude, segment.end_longitude) >= west
+                and min(segment.start_latitude, segment.end_latitude) <= north
+                and max(segment.start_latitude, segment.end_latitude) >= south}
+
+    def test_bbox(self):
+        expected = self.segments_in_bbox(*BBOX)
+        self.assertTrue(0 < len(expected) < TrafficSegment.objects.count())
+        self.assertEqual(set(self.segments(bbox=','.join(map(str, BBOX)))), expected)
+
+    def test_bbox_with_more_ids_than_query_params(self):
+        expected = self.segments_in_bbox(*BBOX)
+        with mock.patch.object(connection.features, 'max_query_params', 20):
+            # The database compares the coordinates instead of an IN (...) list of every id
+            self.assertNotIn('segment_id__in', str(bbox_filter(*BBOX)))
+            self.assertEqual(set(self.segments(bbox=','.join(map(str, BBOX)))), expected)
+
+    def test_street_and_direction(self):
+        segments = self.segments(street='ashland', direction='nb')
+        self.assertTrue(segments)
+        self.assertEqual({(properties['street'], properties['direction']) for properties in segments.values()},
+                         {('Ashland', 'NB')})
+        self.assertEqual(len(segments), TrafficSegment.objects.filter(street='Ashland', direction='NB').count())
+
+    def test_speed_range(self):
+        segments = self.segments(min_speed=20, max_speed=30)
+        self.assertEqual(set(segments), set(TrafficSegmentData.objects.filter(
+            recorded_at=snapshot_timestamps.latest(), current_speed__range=(20, 30)).values_list('segment_id', flat=True)))
+        self.assertTrue(all(20 <= properties['_current_speed'] <= 30 for properties in segments.values()))
+
+    def test_invalid_filters(self):
+        for params in ({'bbox': '1,2,3'}, {'bbox': 'a,b,c,d'}, {'bbox': '-87.6,41.9,-87.7,41.8'},
+                       {'min_speed': 'fast'}, {'max_speed': '1.5'}, {'no_data': 'maybe'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/traffic-segments/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_filters_are_cached_separately(self):
+        ashland = self.segments(street='Ashland')
+        western = self.segments(street='Western')
+        self.assertTrue(ashland and western)
+        self.assertFalse(ashland.keys() & western.keys())
+        # Served again from the cache, each under its own key
+        with self.assertNumQueries(0):
+            self.assertEqual(self.segments(street='Ashland'), ashland)
+            self.assertEqual(self.segments(street='Western'), western)
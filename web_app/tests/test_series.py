@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from web_app.models import TrafficSegmentRollup
+from web_app.tests.base import SEGMENT_ID, BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class SeriesTests(BundledDataTestCase):
+
+    def test_rollups_fill_history_before_the_raw_data(self):
+        day = snapshot_timestamps.oldest().replace(hour=0, minute=0) - timedelta(days=1)
+        TrafficSegmentRollup.objects.bulk_create([
+            TrafficSegmentRollup(segment_id=SEGMENT_ID, period=TrafficSegmentRollup.HOUR,
+                                 period_start=day + timedelta(hours=hour), sample_count=12,
+                                 mean_speed=20 + hour, min_speed=10, max_speed=40)
+            for hour in range(24)])
+        response = self.client.get('/api/traffic-series/', {
+            'segment_ids': SEGMENT_ID, 'start': day.isoformat(), 'bucket': 60})
+        self.assertEqual(response.status_code, 200)
+        speeds = dict(zip(response.json()['timestamps'], response.json()['speeds'][0]))
+        self.assertEqual(speeds[day.isoformat()], 20)
+        self.assertEqual(speeds[(day + timedelta(hours=23)).isoformat()], 43)
+
+        # Raw series only hold the snapshots
+        response = self.client.get('/api/traffic-series/', {'segment_ids': SEGMENT_ID, 'start': day.isoformat()})
+        self.assertEqual(len(response.json()['timestamps']), len(snapshot_timestamps.timestamps()))
@@ -0,0 +1,42 @@
+import os
+from io import StringIO
+
+from django.core.management import call_command
+
+from web_app import snapshot_binary
+from web_app.tests.base import DATA_DIR, LATEST_FILE, BundledDataTestCase
+from web_app.timestamp_index import snapshot_timestamps
+from web_app.traffic_csv import parse_traffic_file
+
+
+class SnapshotBinaryTests(BundledDataTestCase):
+
+    def test_segment_rows_round_trip(self):
+        parsed = parse_traffic_file(os.path.join(DATA_DIR, LATEST_FILE))
+        speeds = [speed for _, speed in parsed['speeds']]
+        decoded = snapshot_binary.decode_snapshot(snapshot_binary.encode_segment_rows(
+            parsed['segments'], {'source': LATEST_FILE}, speeds=speeds, double_precision=True))
+
+        self.assertEqual(decoded['metadata'], {'source': LATEST_FILE})
+        self.assertEqual(list(decoded['segment_ids']), [segment[0] for segment in parsed['segments']])
+        self.assertEqual(list(decoded['coordinates']),
+                         [value for segment in parsed['segments'] for value in segment[8:12]])
+        self.assertEqual(list(decoded['speeds'][0]), speeds)
+        self.assertEqual(decoded['street'], [segment[1] for segment in parsed['segments']])
+
+    def test_archive_restores_the_snapshot(self):
+        call_command('archive_traffic_snapshots', output_dir=self.data_dir, stdout=StringIO())
+        archive = os.path.join(self.data_dir, snapshot_binary.archive_filename(
+            snapshot_timestamps.latest().replace(tzinfo=None)))
+        restored = snapshot_binary.parse_snapshot_archive(archive)
+        parsed = parse_traffic_file(os.path.join(DATA_DIR, LATEST_FILE))
+
+        self.assertIsNone(restored['error'])
+        self.assertEqual(restored['recorded_at'], parsed['recorded_at'])
+        self.assertEqual(sorted(restored['segments']), sorted(parsed['segments']))
+        self.assertEqual(sorted(restored['speeds']), sorted(parsed['speeds']))
+
+    def test_invalid_archive_name_is_reported(self):
+        path = os.path.join(
+            self.data_dir, 'Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_2025-13-45-99-00-00.tsnp')
+        self.assertIn("Invalid datetime format", snapshot_binary.parse_snapshot_archive(path)['error'])
@@ -0,0 +1,39 @@
+from web_app.tests.base import LATEST_FILE, SEGMENT_ID, BundledDataTestCase, chicago_tile, import_traffic_data
+from web_app.timestamp_index import snapshot_timestamps
+
+
+class CacheInvalidationTests(BundledDataTestCase):
+
+    def segment_speed(self, response):
+        feature = next(feature for feature in response.json()['features']
+                       if feature['properties']['segment_id'] == SEGMENT_ID)
+        return feature['properties']['_current_speed']
+
+    def test_reimport_changes_cached_responses(self):
+        latest = snapshot_timestamps.latest().isoformat()
+        version = snapshot_timestamps.version
+        response = self.client.get('/api/traffic-segments/', {'datetime': latest})
+        self.assertNotEqual(self.segment_speed(response), 77)
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/traffic-segments/', {'datetime': latest},
+                                         HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        z, x, y = chicago_tile()
+        tile = self.client.get(f'/api/traffic-tiles/{z}/{x}/{y}.mvt', {'datetime': latest}).content
+
+        # Same snapshot timestamp, new content: the importer invalidates the index in this process
+        self.write_changed_copy(LATEST_FILE, self.set_speed(SEGMENT_ID, 77))
+        import_traffic_data(self.data_dir)
+
+        self.assertNotEqual(snapshot_timestamps.version, version)
+        response = self.client.get('/api/traffic-segments/', {'datetime': latest}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.segment_speed(response), 77)
+        self.assertNotEqual(self.client.get(f'/api/traffic-tiles/{z}/{x}/{y}.mvt', {'datetime': latest}).content, tile)
+
+    def test_reimport_only_changes_its_own_snapshot_generation(self):
+        oldest, latest = snapshot_timestamps.oldest(), snapshot_timestamps.latest()
+        generations = (snapshot_timestamps.snapshot_generation(oldest), snapshot_timestamps.snapshot_generation(latest))
+        self.write_changed_copy(LATEST_FILE, self.set_speed(SEGMENT_ID, 77))
+        import_traffic_data(self.data_dir)
+        self.assertEqual(snapshot_timestamps.snapshot_generation(oldest), generations[0])
+        self.assertNotEqual(snapshot_timestamps.snapshot_generation(latest), generations[1])
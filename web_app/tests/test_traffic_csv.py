@@ -0,0 +1,58 @@
+import csv
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from web_app.tests.base import DATA_DIR, LATEST_FILE
+from web_app.traffic_csv import INVALID_VALUE, MISSING_FIELD, PARSERS, parse_traffic_file
+
+
+class ParserBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def write_dirty_copy(self):
+        """The latest bundled file with one malformed row per kind the parsers reject, and a blank line."""
+        with open(os.path.join(DATA_DIR, LATEST_FILE), encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            rows = list(reader)
+        position = {name.strip().upper(): index for index, name in enumerate(header)}
+        changes = [
+            ('STREET', '   '),
+            ('SEGMENTID', ''),
+            ('SEGMENTID', ' '),
+            ('SEGMENTID', 'abc'),
+            ('START_LONGITUDE', '-87.6x'),
+            ('CURRENT_SPEED', 'n/a'),
+        ]
+        for row, (name, value) in zip(rows[10::100], changes):
+            row[position[name]] = value
+        rows[700] = rows[700][:position['STREET'] + 1]  # Short row: the coordinates are missing
+        rows.insert(800, [])
+        path = os.path.join(self.data_dir, LATEST_FILE)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+
+    def test_backends_agree_on_a_dirty_file(self):
+        path = self.write_dirty_copy()
+        results = {parser: parse_traffic_file(path, parser=parser) for parser in PARSERS}
+        rows = results.pop('rows')
+        for parser, result in results.items():
+            with self.subTest(parser=parser):
+                self.assertEqual(result, rows)
+
+        self.assertIsNone(rows['error'])
+        self.assertEqual(rows['rows'], 1257)
+        self.assertEqual(rows['skipped'], 7)
+        self.assertEqual(len(rows['segments']), 1250)
+        self.assertEqual([reason for _, reason, _, _ in rows['rejected']],
+                         [MISSING_FIELD, MISSING_FIELD, MISSING_FIELD, INVALID_VALUE, INVALID_VALUE,
+                          INVALID_VALUE, MISSING_FIELD])
@@ -0,0 +1,32 @@
+from web_app import vector_tiles
+from web_app.tests.base import BundledDataTestCase, chicago_tile
+
+
+class VectorTileTests(BundledDataTestCase):
+
+    def test_tile_of_the_latest_snapshot(self):
+        z, x, y = chicago_tile()
+        response = self.client.get(f'/api/traffic-tiles/{z}/{x}/{y}.mvt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        body = response.content
+        self.assertEqual(body[0], 0x1a)  # Field 3 (layers), length-delimited
+        self.assertIn(b'traffic', body)
+        self.assertIn(b'_current_speed', body)
+
+    def test_empty_tile(self):
+        response = self.client.get('/api/traffic-tiles/12/0/0.mvt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, vector_tiles.encode_tile({'traffic': []}))
+
+    def test_out_of_range_tile(self):
+        self.assertEqual(self.client.get('/api/traffic-tiles/2/4/0.mvt').status_code, 400)
+
+    def test_feature_ids(self):
+        points = [(0, 0), (10, 10)]
+        self.assertIn(b'\x08\x07', vector_tiles.encode_layer('t', [(7, points, {})]))
+        # A negative id cannot be a uint64; the feature goes without one instead of never finishing
+        self.assertEqual(vector_tiles.encode_layer('t', [(-5, points, {})]),
+                         vector_tiles.encode_layer('t', [(None, points, {})]))
+        with self.assertRaises(ValueError):
+            vector_tiles._varint(-1)
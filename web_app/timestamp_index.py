@@ -0,0 +1,174 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from web_app.models import ImportedFile, TrafficSegmentData
+
+# Cache keys used when TRAFFIC_TIMESTAMP_INDEX_CACHE names a Django cache alias
+TIMESTAMPS_CACHE_KEY = 'web_app:snapshot_timestamps'
+GENERATION_CACHE_KEY = 'web_app:snapshot_timestamps:generation'
+
+
+class SnapshotTimestampIndex:
+    """
+    Sorted, in-process list of the distinct TrafficSegmentData.recorded_at values.
+
+    The set of snapshot timestamps is small and only changes when the importer runs,
+    so the API resolves oldest/latest/current/next with a bisect instead of querying
+    the whole observation table on every request.
+
+    Next to each timestamp it keeps the content generation of that snapshot: when the
+    importer last wrote it (ImportedFile.imported_at). Re-importing a changed file for an
+    existing timestamp keeps the list the same but bumps that generation, and with it
+    `version`, so everything cached under either sees the new rows.
+
+    Settings:
+    - TRAFFIC_TIMESTAMP_INDEX_TTL (default 60): seconds a worker trusts its local copy.
+      This is the only invalidation a worker sees when no shared cache is configured.
+    - TRAFFIC_TIMESTAMP_INDEX_CACHE (default None): alias of a Django cache shared by all
+      workers (e.g. Redis/Memcached). When set, the sorted list is stored there and the
+      importer bumps a generation key so every worker reloads right after an import.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timestamps = None
+        self._loaded_at = 0.0
+        self._generation = None
+        self._snapshot_generations = {}
+        self._version = None
+
+    # --- configuration ---
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TRAFFIC_TIMESTAMP_INDEX_TTL', 60)
+
+    @property
+    def shared_cache(self):
+        alias = getattr(settings, 'TRAFFIC_TIMESTAMP_INDEX_CACHE', None)
+        return caches[alias] if alias else None
+
+    # --- loading and invalidation ---
+
+    def _load_from_db(self):
+        """(sorted timestamps, {timestamp: content generation}) from the observations and the import ledger."""
+        timestamps = list(
+            TrafficSegmentData.objects.order_by('recorded_at').values_list('recorded_at', flat=True).distinct()
+        )
+        generations = {}
+        for recorded_at, imported_at in ImportedFile.objects.values_list('recorded_at', 'imported_at'):
+            generations[recorded_at] = max(generations.get(recorded_at, 0.0), imported_at.timestamp())
+        return timestamps, generations
+
+    def timestamps(self):
+        """Return the sorted list of snapshot timestamps, reloading it if stale."""
+        cache = self.shared_cache
+        generation = cache.get(GENERATION_CACHE_KEY) if cache is not None else None
+
+        with self._lock:
+            fresh = (
+                self._timestamps is not None
+                and time.monotonic() - self._loaded_at < self.ttl
+                and generation == self._generation
+            )
+            if fresh:
+                return self._timestamps
+
+            loaded = cache.get(TIMESTAMPS_CACHE_KEY) if cache is not None else None
+            if loaded is None:
+                loaded = self._load_from_db()
+                if cache is not None:
+                    cache.set(TIMESTAMPS_CACHE_KEY, loaded, timeout=None)
+            timestamps, generations = loaded
+
+            self._timestamps = timestamps
+            self._snapshot_generations = generations
+            self._loaded_at = time.monotonic()
+            self._generation = generation
+            self._version = (
+                len(timestamps), timestamps[0], timestamps[-1], max(generations.values(), default=None)
+            ) if timestamps else None
+            return timestamps
+
+    @property
+    def version(self):
+        """
+        Token that changes whenever a snapshot is added, removed or re-imported.
+        Anything derived from the stored snapshots (e.g. next/latest metadata) can be cached under it.
+        """
+        self.timestamps()
+        return self._version
+
+    def snapshot_generation(self, timestamp):
+        """
+        Content generation of one snapshot: changes only when that snapshot is re-imported, so
+        per-snapshot caches (tiles, playback arrays) survive imports of other snapshots.
+        None for snapshots imported before the ledger existed.
+        """
+        self.timestamps()
+        with self._lock:
+            return self._snapshot_generations.get(timestamp)
+
+    def invalidate(self):
+        """
+        Drop the cached index. Called by the importer after it commits a snapshot (its
+        ImportedFile.imported_at, written in the same transaction, is the new generation).
+        Other processes pick this up through the shared cache generation, or after the TTL.
+        """
+        with self._lock:
+            self._timestamps = None
+        cache = self.shared_cache
+        if cache is not None:
+            cache.delete(TIMESTAMPS_CACHE_KEY)
+            cache.set(GENERATION_CACHE_KEY, time.time_ns(), timeout=None)
+
+    # --- lookups ---
+
+    @staticmethod
+    def normalize(value):
+        """Make a naive datetime aware the same way the ORM would before comparing it."""
+        if settings.USE_TZ and timezone.is_naive(value):
+            return timezone.make_aware(value)
+        return value
+
+    def oldest(self):
+        timestamps = self.timestamps()
+        return timestamps[0] if timestamps else None
+
+    def latest(self):
+        timestamps = self.timestamps()
+        return timestamps[-1] if timestamps else None
+
+    def at_or_before(self, value):
+        """Latest snapshot timestamp <= value, or None if value is before the oldest snapshot."""
+        timestamps = self.timestamps()
+        position = bisect.bisect_right(timestamps, self.normalize(value))
+        return timestamps[position - 1] if position else None
+
+    def after(self, value):
+        """First snapshot timestamp > value, or None if value is at or after the latest snapshot."""
+        timestamps = self.timestamps()
+        position = bisect.bisect_right(timestamps, self.normalize(value))
+        return timestamps[position] if position < len(timestamps) else None
+
+
+    def window(self, start, end=None, count=None):
+        """
+        Snapshot timestamps from start (inclusive) through end (inclusive),
+        or the first `count` of them when no end is given.
+        """
+        timestamps = self.timestamps()
+        first = bisect.bisect_left(timestamps, self.normalize(start))
+        if end is not None:
+            last = bisect.bisect_right(timestamps, self.normalize(end))
+        else:
+            last = first + count
+        return timestamps[first:last]
+
+# Shared by the API views and the importer
+snapshot_timestamps = SnapshotTimestampIndex()
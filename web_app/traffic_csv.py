@@ -0,0 +1,281 @@
+"""
+Parsing of the Chicago congestion-estimate CSV files.
+
+Nothing here touches Django or the database, so these functions can run in worker
+processes (see `import_traffic_data --workers`); the caller turns the plain tuples
+they return into model instances and writes them.
+"""
+import csv
+import gc
+import hashlib
+import os
+import re
+from array import array
+from datetime import datetime
+from operator import itemgetter
+
+# Regex to match the expected filename pattern for easy parsing
+# Matches "Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_"
+# followed by YYYY-MM-DD-HH-MM-SS and then ".csv"
+FILENAME_PATTERN = re.compile(
+    r'Chicago_Traffic_Tracker_-_Congestion_Estimates_by_Segments_(\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})\.csv')
+
+# TrafficSegment fields, in the order parse_traffic_file returns them in each segment tuple
+SEGMENT_FIELDS = (
+    'segment_id', 'street', 'direction', 'from_street', 'to_street', 'length', 'street_heading', 'comments',
+    'start_longitude', 'start_latitude', 'end_longitude', 'end_latitude',
+)
+
+# CSV columns read by the parsers, in the order _convert_row uses their positions
+PARSED_COLUMNS = (
+    'SEGMENTID', 'STREET', 'DIRECTION', 'FROM_STREET', 'TO_STREET', 'LENGTH', 'STREET_HEADING', 'COMMENTS',
+    'START_LONGITUDE', 'START_LATITUDE', 'END_LONGITUDE', 'END_LATITUDE', 'CURRENT_SPEED',
+)
+
+# A row missing any of these is skipped
+ESSENTIAL_COLUMNS = ('SEGMENTID', 'STREET', 'START_LONGITUDE', 'START_LATITUDE', 'END_LONGITUDE', 'END_LATITUDE')
+
+# Reasons recorded in result['rejected'] for rows the parsers skip (QuarantinedRow.reason)
+MISSING_FIELD = 'missing_field'
+INVALID_VALUE = 'invalid_value'
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_traffic_file(path, known_checksum=None, parser='rows'):
+    """
+    Read and validate one snapshot CSV with the named PARSERS backend.
+
+    If the file's SHA-256 equals `known_checksum` it is not parsed and the result has
+    `unchanged` set. Otherwise the result holds one segment tuple (SEGMENT_FIELDS order)
+    and one (segment_id, current_speed) pair per valid row, plus one (row number, reason,
+    message, {column: cell}) entry per skipped row in `rejected`, which the caller reports
+    and quarantines. `error` is set when the file as a
+    whole is unusable.
+    """
+    filename = os.path.basename(path)
+    result = {
+        'filename': filename,
+        'checksum': None,
+        'size': None,
+        'recorded_at': None,
+        'unchanged': False,
+        'error': None,
+        'rows': 0,
+        'skipped': 0,
+        'segments': [],
+        'speeds': [],
+        'rejected': [],
+    }
+
+    match = FILENAME_PATTERN.match(filename)
+    if not match:
+        result['error'] = 'File name does not match the expected pattern.'
+        return result
+    datetime_str = match.group(1)  # Extract the YYYY-MM-DD-HH-MM-SS part
+    try:
+        # Format: YYYY-MM-DD-HH-MM-SS
+        result['recorded_at'] = datetime.strptime(datetime_str, '%Y-%m-%d-%H-%M-%S')
+    except ValueError as e:
+        result['error'] = f"Invalid datetime format in filename '{datetime_str}'. Error: {e}"
+        return result
+
+    try:
+        result['checksum'] = file_checksum(path)
+        result['size'] = os.path.getsize(path)
+        if result['checksum'] == known_checksum:
+            result['unchanged'] = True
+            return result
+
+        with open(path, mode='r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            # Column positions by cleaned header name; the feed's headers can carry stray spaces
+            columns = {name.strip().upper(): index for index, name in enumerate(header)}
+            PARSERS[parser](reader, columns, result)
+    except Exception as e:
+        result['error'] = f"Failed to read or process file: {e}"
+    return result
+
+
+def _field(row, index):
+    """Stripped value of one column, or '' if the column is absent from the file or the row."""
+    return row[index].strip() if index is not None and index < len(row) else ''
+
+
+def _convert_row(row, positions):
+    """
+    Convert one CSV row into (segment tuple, current_speed).
+
+    Raises ValueError if a numeric column cannot be converted.
+    """
+    (segment_col, street_col, direction_col, from_col, to_col, length_col, heading_col, comments_col,
+     start_lon_col, start_lat_col, end_lon_col, end_lat_col, speed_col) = positions
+    segment = (
+        int(_field(row, segment_col)),
+        _field(row, street_col),
+        _field(row, direction_col),
+        _field(row, from_col),
+        _field(row, to_col),
+        float(_field(row, length_col) or 0.0),
+        _field(row, heading_col),
+        _field(row, comments_col),
+        float(_field(row, start_lon_col)),
+        float(_field(row, start_lat_col)),
+        float(_field(row, end_lon_col)),
+        float(_field(row, end_lat_col)),
+    )
+    return segment, int(float(_field(row, speed_col) or -1))
+
+
+def _reject_row(result, row_num, row, essential_cols, positions):
+    """
+    The row backend's checks for one row: return (segment tuple, current_speed), or None after
+    recording why the row was skipped in the result's rejected list.
+    """
+    if not all(_field(row, index) for index in essential_cols):
+        reason, detail = MISSING_FIELD, "Missing essential data."
+    else:
+        try:
+            return _convert_row(row, positions)
+        except ValueError as ve:
+            reason, detail = INVALID_VALUE, str(ve)
+    cells = {name: _field(row, index) for name, index in zip(PARSED_COLUMNS, positions)}
+    result['rejected'].append((row_num + 1, reason, detail, cells))
+    result['skipped'] += 1
+    return None
+
+
+def _parse_rows(reader, columns, result):
+    """Row backend: validate and convert one row at a time."""
+    segments = result['segments']
+    speeds = result['speeds']
+
+    # Resolve column positions once instead of looking headers up for every row
+    positions = tuple(columns.get(name) for name in PARSED_COLUMNS)
+    essential_cols = [columns.get(name) for name in ESSENTIAL_COLUMNS]
+
+    # Blank lines are skipped without counting, as csv.DictReader did
+    for row_num, row in enumerate(row for row in reader if row):
+        result['rows'] += 1
+        converted = _reject_row(result, row_num, row, essential_cols, positions)
+        if converted is None:
+            continue
+        segment, speed = converted
+        segments.append(segment)
+        speeds.append((segment[0], speed))
+
+
+def _convert_column(values, typecode, convert, bad_rows):
+    """
+    Convert a whole column into a typed array in one pass.
+
+    If any value fails, fall back to converting one value at a time, add the failing
+    row numbers to `bad_rows` and put a placeholder in their slots.
+    """
+    try:
+        return array(typecode, map(convert, values))
+    except (ValueError, OverflowError):
+        pass
+    converted = array(typecode)
+    for row_num, value in enumerate(values):
+        try:
+            converted.append(convert(value))
+        except (ValueError, OverflowError):
+            bad_rows.add(row_num)
+            converted.append(0)
+    return converted
+
+
+def _parse_columns(reader, columns, result):
+    """
+    Columnar backend: read the whole file, then validate and convert column by column.
+
+    Columns are pulled out with itemgetter and converted into `array`s with map(), so the
+    per-value work happens in C. float() and int() ignore surrounding whitespace, so only
+    the text columns are stripped. Any row the column pass rejects is handed to the row
+    backend's checks, which keeps the skipped rows and their messages identical.
+    """
+    # Everything built here is lists, tuples and arrays of strings and numbers, which cannot
+    # form cycles; pausing the cyclic GC avoids repeated full collections that would walk the
+    # hundreds of thousands of cells that are alive at once.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        rows = [row for row in reader if row]  # Blank lines are skipped without counting
+        _convert_columns(rows, columns, result)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _convert_columns(rows, columns, result):
+    row_count = len(rows)
+    result['rows'] = row_count
+    if not row_count:
+        return
+
+    # Pad short rows so every column has one entry per row, as _field treats missing cells as ''
+    width = max((columns[name] for name in PARSED_COLUMNS if name in columns), default=-1) + 1
+    table = rows
+    if min(map(len, rows)) < width:
+        padding = [''] * width
+        table = [row if len(row) >= width else row + padding[len(row):] for row in rows]
+
+    def column(name, strip=False):
+        if name not in columns:
+            return [''] * row_count
+        values = map(itemgetter(columns[name]), table)
+        return list(map(str.strip, values) if strip else values)
+
+    # Rows missing an essential value, or with a value that does not convert, are re-checked one by one
+    suspect = set()
+    for name in ESSENTIAL_COLUMNS:
+        values = column(name, strip=True)  # A cell of only spaces is missing too, as _field strips
+        if not all(values):
+            suspect.update(row_num for row_num, value in enumerate(values) if not value)
+
+    segment_ids = _convert_column(column('SEGMENTID'), 'q', int, suspect)
+    lengths = _convert_column([value or '0' for value in column('LENGTH')], 'd', float, suspect)
+    start_lons = _convert_column(column('START_LONGITUDE'), 'd', float, suspect)
+    start_lats = _convert_column(column('START_LATITUDE'), 'd', float, suspect)
+    end_lons = _convert_column(column('END_LONGITUDE'), 'd', float, suspect)
+    end_lats = _convert_column(column('END_LATITUDE'), 'd', float, suspect)
+    current_speeds = _convert_column(
+        _convert_column([value or '-1' for value in column('CURRENT_SPEED')], 'd', float, suspect), 'q', int, suspect)
+
+    segments = zip(segment_ids, column('STREET', strip=True), column('DIRECTION', strip=True),
+                   column('FROM_STREET', strip=True), column('TO_STREET', strip=True), lengths,
+                   column('STREET_HEADING', strip=True), column('COMMENTS', strip=True),
+                   start_lons, start_lats, end_lons, end_lats)
+    if not suspect:
+        result['segments'] = list(segments)
+        result['speeds'] = list(zip(segment_ids, current_speeds))
+        return
+
+    # Run the suspect rows through the row backend's checks, keeping file order
+    positions = tuple(columns.get(name) for name in PARSED_COLUMNS)
+    essential_cols = [columns.get(name) for name in ESSENTIAL_COLUMNS]
+    kept_segments = result['segments']
+    kept_speeds = result['speeds']
+    for row_num, (segment, speed) in enumerate(zip(segments, current_speeds)):
+        if row_num in suspect:
+            converted = _reject_row(result, row_num, rows[row_num], essential_cols, positions)
+            if converted is None:
+                continue
+            segment, speed = converted
+        kept_segments.append(segment)
+        kept_speeds.append((segment[0], speed))
+
+
+# Parser backends selectable with `import_traffic_data --parser`
+PARSERS = {
+    'rows': _parse_rows,
+    'columnar': _parse_columns,
+}
@@ -1,8 +1,25 @@
+from django.conf import settings
 from django.urls import path
 
-from web_app import views
+from web_app import metrics, views
+
+# Under ASGI, the async versions of the traffic endpoints (see Traffic_sample/settings_asgi.py)
+api = views
+if getattr(settings, 'TRAFFIC_ASYNC_VIEWS', False):
+    from web_app import async_views as api
 
 urlpatterns = [
     path('', views.index, name='index'),
-    path('api/traffic-segments/', views.traffic_segments_api, name='traffic_segments_api'),
+    path('api/traffic-segments/', api.traffic_segments_api, name='traffic_segments_api'),
+    path('api/traffic-geometry/', api.traffic_geometry_api, name='traffic_geometry_api'),
+    path('api/traffic-speeds/', api.traffic_speeds_api, name='traffic_speeds_api'),
+    path('api/traffic-range/', api.traffic_range_api, name='traffic_range_api'),
+    path('api/traffic-playback/', api.traffic_playback_api, name='traffic_playback_api'),
+    path('api/traffic-live/', views.traffic_live_api, name='traffic_live_api'),  # SSE; 501 under WSGI
+    path('api/traffic-series/', api.traffic_series_api, name='traffic_series_api'),
+    path('api/traffic-congestion/', api.traffic_congestion_api, name='traffic_congestion_api'),
+    path('api/traffic-congestion-index/', api.traffic_congestion_index_api, name='traffic_congestion_index_api'),
+    path('api/traffic-events/', api.traffic_events_api, name='traffic_events_api'),
+    path('api/traffic-tiles/<int:z>/<int:x>/<int:y>.mvt', api.traffic_tiles_api, name='traffic_tiles_api'),
+    path('metrics', metrics.metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
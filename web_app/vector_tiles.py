@@ -0,0 +1,165 @@
+"""
+Minimal Mapbox Vector Tile (MVT 2.1) encoder for traffic segments.
+
+Only what the traffic tiles need is implemented: one or more layers of LineString features
+with scalar properties, encoded straight to protobuf bytes with no third-party dependency.
+See https://github.com/mapbox/vector-tile-spec/tree/master/2.1 for the format.
+"""
+import math
+import struct
+
+TILE_EXTENT = 4096  # Integer grid size of one tile, the spec's default
+TILE_BUFFER = 64  # Extra grid units around the tile included when selecting segments
+
+# Protobuf wire types
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LENGTH_DELIMITED = 2
+
+# Geometry commands and types from the MVT spec
+COMMAND_MOVE_TO = 1
+COMMAND_LINE_TO = 2
+GEOM_TYPE_LINESTRING = 2
+
+
+# --- Tile coordinate math (Web Mercator / XYZ scheme) ---
+
+def lonlat_to_tile_fraction(longitude, latitude, zoom):
+    """Fractional XYZ tile coordinates of a WGS84 point at a zoom level."""
+    n = 2 ** zoom
+    latitude = max(min(latitude, 85.0511287798), -85.0511287798)
+    lat_radians = math.radians(latitude)
+    x = (longitude + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(lat_radians)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_bounds(zoom, x, y, buffer=0):
+    """
+    (west, south, east, north) in degrees of tile x/y at a zoom level, grown by `buffer`
+    tile grid units (out of TILE_EXTENT) on every side.
+    """
+    n = 2 ** zoom
+    pad = buffer / TILE_EXTENT
+
+    def longitude(tile_x):
+        return tile_x / n * 360.0 - 180.0
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return longitude(x - pad), latitude(y + 1 + pad), longitude(x + 1 + pad), latitude(y - pad)
+
+
+def project_to_tile(points, zoom, x, y, extent=TILE_EXTENT):
+    """Convert (longitude, latitude) points to integer grid coordinates inside tile x/y."""
+    projected = []
+    for longitude, latitude in points:
+        tile_x, tile_y = lonlat_to_tile_fraction(longitude, latitude, zoom)
+        projected.append((round((tile_x - x) * extent), round((tile_y - y) * extent)))
+    return projected
+
+
+# --- Protobuf primitives ---
+
+def _varint(value):
+    if value < 0:
+        # Right shifts of a negative int never reach 0; signed values must be zigzag-encoded first
+        raise ValueError(f"varint of a negative value: {value}")
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field_number, wire_type):
+    return _varint((field_number << 3) | wire_type)
+
+
+def _length_delimited(field_number, payload):
+    return _key(field_number, WIRE_LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+
+def _packed_varints(field_number, values):
+    return _length_delimited(field_number, b''.join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    """Encode a property value as an MVT Value message."""
+    if isinstance(value, bool):
+        return _key(7, WIRE_VARINT) + _varint(int(value))
+    if isinstance(value, int):
+        return _key(6, WIRE_VARINT) + _varint(_zigzag(value))  # sint_value
+    if isinstance(value, float):
+        return _key(3, WIRE_FIXED64) + struct.pack('<d', value)  # double_value
+    return _length_delimited(1, str(value).encode('utf-8'))  # string_value
+
+
+def _encode_linestring(points):
+    """Geometry commands for one LineString given as integer grid points."""
+    commands = []
+    cursor_x, cursor_y = 0, 0
+    for index, (point_x, point_y) in enumerate(points):
+        if index == 0:
+            commands.append((COMMAND_MOVE_TO & 0x7) | (1 << 3))
+        elif index == 1:
+            commands.append((COMMAND_LINE_TO & 0x7) | ((len(points) - 1) << 3))
+        commands.append(_zigzag(point_x - cursor_x))
+        commands.append(_zigzag(point_y - cursor_y))
+        cursor_x, cursor_y = point_x, point_y
+    return commands
+
+
+def encode_layer(name, features, extent=TILE_EXTENT):
+    """
+    Encode one layer. `features` is an iterable of (feature_id, points, properties) where
+    points are integer grid coordinates and properties a dict of scalars (None values are skipped).
+    Negative or None feature ids are left out of the feature.
+    """
+    keys, key_index = [], {}
+    values, value_index = [], {}
+    encoded_features = []
+
+    for feature_id, points, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+            value_key = (type(value), value)
+            if value_key not in value_index:
+                value_index[value_key] = len(values)
+                values.append(value)
+            tags.extend((key_index[key], value_index[value_key]))
+
+        # The id field is a uint64; features whose id does not fit go without one
+        feature = _key(1, WIRE_VARINT) + _varint(feature_id) if feature_id is not None and feature_id >= 0 else b''
+        if tags:
+            feature += _packed_varints(2, tags)
+        feature += _key(3, WIRE_VARINT) + _varint(GEOM_TYPE_LINESTRING)
+        feature += _packed_varints(4, _encode_linestring(points))
+        encoded_features.append(_length_delimited(2, feature))
+
+    layer = _key(15, WIRE_VARINT) + _varint(2)  # version
+    layer += _length_delimited(1, name.encode('utf-8'))
+    layer += b''.join(encoded_features)
+    layer += b''.join(_length_delimited(3, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_length_delimited(4, _encode_value(value)) for value in values)
+    layer += _key(5, WIRE_VARINT) + _varint(extent)
+    return layer
+
+
+def encode_tile(layers):
+    """Encode a tile from a mapping of layer name -> features (see encode_layer)."""
+    return b''.join(_length_delimited(3, encode_layer(name, features)) for name, features in layers.items())
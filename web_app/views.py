@@ -1,35 +1,34 @@
 import os
 import csv
+from asgiref.sync import sync_to_async
 from datetime import datetime, time, date, timedelta
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.db.models import Min, Q
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
-from web_app.models import TrafficSegmentData # Import your new model
-from django.db.models import Min, Max # For finding min/max dates
+from web_app.models import CongestionSummary, TrafficEvent, TrafficSegment, TrafficSegmentData, TrafficSegmentRollup # Import your new model
+from web_app.timestamp_index import snapshot_timestamps  # Sorted snapshot timestamps, refreshed on import
+from web_app.snapshot_cache import snapshot_responses, tile_responses  # Encoded responses with ETag/Last-Modified
+from web_app.segment_index import segment_index  # segment_id order that speed arrays are aligned to
+from web_app.hot_store import hot_snapshots  # Latest snapshots in a memory-mapped file shared by all workers
+from web_app.streaming import streaming_json_response, wants_stream
+from web_app.live_updates import SnapshotWatcher, live_broker, sse_message  # Server-Sent Events push
+from web_app.spatial_index import segment_spatial_index  # STR-tree over segment bounding boxes
+from web_app import metrics, playback, snapshot_binary, vector_tiles  # Metrics, interpolated playback, format=binary, tiles
+from web_app.traffic_csv import SEGMENT_FIELDS
 
-version = 1.16  # versioning for js and css
+version = 1.21  # versioning for js and css
 
 def index(request):
 
     return render(request, 'index.html', {'version':version})
 
 
-@require_http_methods(["GET"])
-def traffic_segments_api(request):
-    """
-    API endpoint to return traffic segment data as GeoJSON from the database.
-
-    Query Parameters:
-    - datetime (optional): An ISO-formatted datetime string (e.g., "2025-07-31T12:31:00")
-                          to request data for a specific timestamp.
-                          If not provided, the oldest available data is returned.
-
-    Returns:
-    - GeoJSON FeatureCollection of traffic segments.
-    - Metadata including current_timestamp, next_timestamp, oldest_timestamp, latest_timestamp.
-    """
-    debug_info = {
+def new_debug_info():
+    return {
         'query_filters': {},
         'returned_features': 0,
         'current_data_timestamp': None,
@@ -39,42 +38,33 @@ def traffic_segments_api(request):
         'error_messages': []
     }
 
-    # --- 1. Get overall oldest and latest timestamps from the database ---
-    min_max_dates = TrafficSegmentData.objects.aggregate(min_date=Min('recorded_at'), max_date=Max('recorded_at'))
-
-    oldest_data_datetime = min_max_dates['min_date']
-    latest_data_datetime = min_max_dates['max_date']
 
-    if not oldest_data_datetime:
-        debug_info['error_messages'].append("No traffic data found in the database.")
-        return JsonResponse({'error': 'No traffic data available', 'debug': debug_info}, status=404)
-
-    debug_info['oldest_data_timestamp'] = oldest_data_datetime.isoformat()
-    debug_info['latest_data_timestamp'] = latest_data_datetime.isoformat()
+def resolve_snapshot_timestamp(datetime_param, debug_info, param_name='datetime'):
+    """
+    Map a requested ISO datetime string onto the closest existing snapshot timestamp
+    at or before it. Missing, invalid or too-early values fall back to the oldest snapshot.
+    Notes about any fallback are appended to debug_info['error_messages'].
+    """
+    oldest_data_datetime = snapshot_timestamps.oldest()
 
-    # --- 2. Determine the target datetime for the current request ---
+    # --- Determine the target datetime for the current request ---
     target_datetime = None
 
-    datetime_param = request.GET.get('datetime', None)
-
     if datetime_param:
         try:
             # Parse the ISO-formatted datetime string from the request
             # fromisoformat handles various ISO formats, including with/without Z or timezone offsets
             target_datetime = datetime.fromisoformat(datetime_param)
-            # Ensure timezone awareness if your DB is timezone-aware
-            # if settings.USE_TZ:
-            #     from django.utils import timezone
-            #     target_datetime = timezone.make_aware(target_datetime)
-            debug_info['query_filters']['requested_datetime_param'] = datetime_param
+            # Naive datetimes are made timezone-aware by the snapshot index lookups
+            debug_info['query_filters'][f'requested_{param_name}_param'] = datetime_param
         except ValueError as e:
             debug_info['error_messages'].append(
-                f"Invalid 'datetime' format: '{datetime_param}'. Error: {e}. Returning oldest data.")
+                f"Invalid '{param_name}' format: '{datetime_param}'. Error: {e}. Returning oldest data.")
             # Fallback to oldest data if parsing fails
             target_datetime = oldest_data_datetime
     else:
         # If no specific datetime is sent, default to the oldest data available
-        debug_info['error_messages'].append("No 'datetime' parameter provided. Returning oldest data.")
+        debug_info['error_messages'].append(f"No '{param_name}' parameter provided. Returning oldest data.")
         target_datetime = oldest_data_datetime
 
     # Ensure target_datetime exists in the database. If not, use the closest available.
@@ -82,79 +72,1516 @@ def traffic_segments_api(request):
     # that is less than or equal to the requested target_datetime.
     # This ensures we always return data for an actual timestamp we have.
 
-    # Query for exact match or the nearest earlier timestamp
-    closest_data_query = TrafficSegmentData.objects.filter(recorded_at__lte=target_datetime).order_by(
-        '-recorded_at').first()
+    # Look up the exact match or the nearest earlier timestamp
+    closest_data_timestamp = snapshot_timestamps.at_or_before(target_datetime)
 
-    if closest_data_query:
+    if closest_data_timestamp:
         # Use the actual timestamp found in the DB
-        actual_data_timestamp = closest_data_query.recorded_at
-    else:
-        # If no data is found <= requested, it means the request was for something older than our oldest.
-        # So, just use the absolute oldest data.
-        actual_data_timestamp = oldest_data_datetime
-        debug_info['error_messages'].append("Requested datetime was before earliest data. Using absolute oldest data.")
+        return closest_data_timestamp
 
-    debug_info['current_data_timestamp'] = actual_data_timestamp.isoformat()
+    # If no data is found <= requested, it means the request was for something older than our oldest.
+    # So, just use the absolute oldest data.
+    debug_info['error_messages'].append("Requested datetime was before earliest data. Using absolute oldest data.")
+    return oldest_data_datetime
 
-    # --- 3. Fetch data for the determined actual_data_timestamp ---
-    # Filter for all segments recorded at this exact timestamp
-    current_data_segments = TrafficSegmentData.objects.filter(recorded_at=actual_data_timestamp).order_by('segment_id')
 
-    features = []
-    for segment_data in current_data_segments:
-        feature = {
-            "type": "Feature",
-            "properties": {
-                "segment_id": segment_data.segment_id,
-                "street": segment_data.street,
-                "direction": segment_data.direction,
-                "from_street": segment_data.from_street,
-                "to_street": segment_data.to_street,
-                "length": segment_data.length,
-                "street_heading": segment_data.street_heading,
-                "comments": segment_data.comments,
-                "_current_speed": segment_data.current_speed,
-                "_last_updated": segment_data.recorded_at.isoformat()  # ISO format for consistency
-            },
-            "geometry": {
-                "type": "LineString",
-                "coordinates": [
-                    [segment_data.start_longitude, segment_data.start_latitude],
-                    [segment_data.end_longitude, segment_data.end_latitude]
-                ]
-            }
+def resolve_next_timestamp(actual_data_timestamp, debug_info):
+    """First snapshot timestamp after actual_data_timestamp, looping back to the oldest one."""
+    # Find the first timestamp strictly greater than the current actual_data_timestamp
+    next_data_datetime = snapshot_timestamps.after(actual_data_timestamp)
+
+    if not next_data_datetime:
+        # If no next timestamp exists, loop back to the oldest data
+        next_data_datetime = snapshot_timestamps.oldest()
+        debug_info['error_messages'].append("No data after current timestamp found. Looping back to oldest.")
+
+    debug_info['next_data_timestamp_calculated'] = next_data_datetime.isoformat() if next_data_datetime else None
+    return next_data_datetime
+
+
+def snapshot_metadata(actual_data_timestamp, next_data_datetime):
+    return {  # Include metadata for frontend to manage state
+        "current_timestamp": actual_data_timestamp.isoformat(),
+        "next_timestamp": next_data_datetime.isoformat(),  # This will be used by the frontend for the next request
+        "oldest_timestamp": snapshot_timestamps.oldest().isoformat(),
+        "latest_timestamp": snapshot_timestamps.latest().isoformat(),
+    }
+
+
+def no_data_response(debug_info):
+    debug_info['error_messages'].append("No traffic data found in the database.")
+    return JsonResponse({'error': 'No traffic data available', 'debug': debug_info}, status=404)
+
+
+def wants_binary(request):
+    """True for format=binary: the compact encoding in web_app/snapshot_binary.py instead of JSON."""
+    return request.GET.get('format', '').lower() == 'binary'
+
+
+def binary_response(request, cache_key, body):
+    return snapshot_responses.put_bytes(cache_key, body, content_type=snapshot_binary.CONTENT_TYPE).as_response(request)
+
+
+def binary_feature_rows(rows, head):
+    """format=binary body for SNAPSHOT_FEATURE_COLUMNS rows: ids, geometry, properties and speeds."""
+    rows = list(rows)
+    with metrics.phase('serialize'):
+        # SNAPSHOT_FEATURE_COLUMNS is segment_id, current_speed, then the other SEGMENT_FIELDS in order
+        return snapshot_binary.encode_segment_rows(
+            [(row[0],) + row[2:] for row in rows], head, speeds=[row[1] for row in rows])
+
+
+def binary_speed_rows(speed_rows, frame_count, head):
+    """format=binary body for iter_speed_rows output: one speed frame per snapshot, aligned to segment_index."""
+    speed_rows = list(speed_rows)
+    with metrics.phase('serialize'):
+        frames = [list(frame) for frame in zip(*speed_rows)] if speed_rows else [[] for _ in range(frame_count)]
+        return snapshot_binary.encode_snapshot(head, speed_frames=frames)
+
+
+def segment_properties(segment):
+    """Static GeoJSON properties of a TrafficSegment (everything except the speed)."""
+    return {
+        "segment_id": segment.segment_id,
+        "street": segment.street,
+        "direction": segment.direction,
+        "from_street": segment.from_street,
+        "to_street": segment.to_street,
+        "length": segment.length,
+        "street_heading": segment.street_heading,
+        "comments": segment.comments,
+    }
+
+
+def segment_geometry(segment):
+    return {
+        "type": "LineString",
+        "coordinates": [
+            [segment.start_longitude, segment.start_latitude],
+            [segment.end_longitude, segment.end_latitude]
+        ]
+    }
+
+
+# Columns read per feature by iter_snapshot_features, in unpacking order
+SNAPSHOT_FEATURE_COLUMNS = (
+    'segment_id', 'current_speed',
+    'segment__street', 'segment__direction', 'segment__from_street', 'segment__to_street',
+    'segment__length', 'segment__street_heading', 'segment__comments',
+    'segment__start_longitude', 'segment__start_latitude', 'segment__end_longitude', 'segment__end_latitude',
+)
+
+# Rows fetched per database round trip when iterating large querysets
+QUERY_CHUNK_SIZE = 2000
+
+
+def bbox_filter(west, south, east, north):
+    """
+    Q selecting observations of segments whose bounding box intersects the given box.
+    Candidates come from the in-memory spatial index, so the database only reads matching rows.
+    """
+    segment_ids = segment_spatial_index.segment_ids_in_bbox(west, south, east, north)
+
+    # Keep room for the other parameters of the query (e.g. 999 on SQLite)
+    max_ids = (connection.features.max_query_params or 10000) - 10
+    if len(segment_ids) <= max_ids:
+        return Q(segment_id__in=segment_ids)
+
+    # Too many ids for one IN (...) list; let the database compare the coordinates instead
+    return (
+        (Q(segment__start_longitude__lte=east) | Q(segment__end_longitude__lte=east))
+        & (Q(segment__start_longitude__gte=west) | Q(segment__end_longitude__gte=west))
+        & (Q(segment__start_latitude__lte=north) | Q(segment__end_latitude__lte=north))
+        & (Q(segment__start_latitude__gte=south) | Q(segment__end_latitude__gte=south))
+    )
+
+
+# Query parameters accepted by parse_segment_filters, in cache key order
+SEGMENT_FILTER_PARAMS = ('bbox', 'street', 'direction', 'min_speed', 'max_speed', 'no_data')
+
+# no_data values: segments without a speed estimate (the feed's -1) left out, or only those
+NO_DATA_FILTERS = {
+    'exclude': Q(current_speed__gte=0),
+    'only': Q(current_speed__lt=0),
+}
+
+
+def parse_segment_filters(request, debug_info):
+    """
+    Q built from the bbox/street/direction/min_speed/max_speed/no_data query parameters, or a
+    400 response as the second value when one of them is invalid.
+    """
+    filters = Q()
+
+    bbox_param = request.GET.get('bbox')
+    if bbox_param:
+        try:
+            west, south, east, north = (float(value) for value in bbox_param.split(','))
+            if west > east or south > north:
+                raise ValueError("expected west,south,east,north with west <= east and south <= north")
+        except ValueError as e:
+            return None, JsonResponse({'error': f"Invalid 'bbox': '{bbox_param}'. Error: {e}"}, status=400)
+        filters &= bbox_filter(west, south, east, north)
+        debug_info['query_filters']['bbox'] = [west, south, east, north]
+
+    for param_name, lookup in (('street', 'segment__street__iexact'), ('direction', 'segment__direction__iexact')):
+        value = request.GET.get(param_name, '').strip()
+        if value:
+            filters &= Q(**{lookup: value})
+            debug_info['query_filters'][param_name] = value
+
+    for param_name, lookup in (('min_speed', 'current_speed__gte'), ('max_speed', 'current_speed__lte')):
+        value = request.GET.get(param_name)
+        if value:
+            try:
+                speed = int(value)
+            except ValueError as e:
+                return None, JsonResponse({'error': f"Invalid '{param_name}': '{value}'. Error: {e}"}, status=400)
+            filters &= Q(**{lookup: speed})
+            debug_info['query_filters'][param_name] = speed
+
+    no_data = request.GET.get('no_data', '').strip().lower()
+    if no_data in NO_DATA_FILTERS:
+        filters &= NO_DATA_FILTERS[no_data]
+        debug_info['query_filters']['no_data'] = no_data
+    elif no_data and no_data != 'include':
+        return None, JsonResponse(
+            {'error': f"Invalid 'no_data': '{no_data}'. Expected include, exclude or only"}, status=400)
+
+    return filters, None
+
+
+def snapshot_feature(row, last_updated):
+    """GeoJSON feature for one SNAPSHOT_FEATURE_COLUMNS row."""
+    (segment_id, current_speed, street, direction, from_street, to_street, length, street_heading, comments,
+     start_longitude, start_latitude, end_longitude, end_latitude) = row
+    return {
+        "type": "Feature",
+        "properties": {
+            "segment_id": segment_id,
+            "street": street,
+            "direction": direction,
+            "from_street": from_street,
+            "to_street": to_street,
+            "length": length,
+            "street_heading": street_heading,
+            "comments": comments,
+            "_current_speed": current_speed,
+            "_last_updated": last_updated
+        },
+        "geometry": {
+            "type": "LineString",
+            "coordinates": [
+                [start_longitude, start_latitude],
+                [end_longitude, end_latitude]
+            ]
         }
-        features.append(feature)
+    }
 
-    debug_info['returned_features'] = len(features)
 
-    # --- 4. Determine the next available timestamp ---
-    next_data_datetime = None
+def snapshot_feature_rows(recorded_at, filters=Q()):
+    """Queryset of SNAPSHOT_FEATURE_COLUMNS tuples for one snapshot, ordered by segment_id."""
+    return TrafficSegmentData.objects.filter(filters, recorded_at=recorded_at).order_by('segment_id').values_list(
+        *SNAPSHOT_FEATURE_COLUMNS)
 
-    # Find the first timestamp strictly greater than the current actual_data_timestamp
-    next_query = TrafficSegmentData.objects.filter(recorded_at__gt=actual_data_timestamp).order_by(
-        'recorded_at').first()
 
-    if next_query:
-        next_data_datetime = next_query.recorded_at
+def published_feature_rows(recorded_at):
+    """
+    SNAPSHOT_FEATURE_COLUMNS tuples of a whole snapshot held by the hot store, ordered by
+    segment_id like snapshot_feature_rows: its speeds joined with the static segment rows
+    segment_index keeps, without a database query. None when the store does not hold it.
+    """
+    ids, rows, version = segment_index.static_rows()
+    speeds = hot_snapshots.speeds(recorded_at, version)
+    if speeds is None:
+        return None
+    return [(segment_id, speed) + row for segment_id, speed, row in zip(ids, speeds, rows)
+            if speed != snapshot_binary.NO_OBSERVATION]
+
+
+def iter_snapshot_features(recorded_at, filters=Q()):
+    """
+    Yield the GeoJSON features of one snapshot, ordered by segment_id, optionally narrowed by `filters`.
+    Reads plain tuples through a server-side iterator, so no model instances are built
+    and memory does not grow with the number of segments.
+    """
+    last_updated = recorded_at.isoformat()  # ISO format for consistency
+    for row in snapshot_feature_rows(recorded_at, filters).iterator(chunk_size=QUERY_CHUNK_SIZE):
+        yield snapshot_feature(row, last_updated)
+
+
+def speed_observations(frames):
+    """(segment_id, recorded_at, current_speed) tuples of every observation in the window, in iter_speed_rows order."""
+    return TrafficSegmentData.objects.filter(recorded_at__range=(frames[0], frames[-1])).order_by(
+        'segment_id', 'recorded_at').values_list('segment_id', 'recorded_at', 'current_speed')
+
+
+class SpeedRowBuilder:
+    """
+    Turns speed_observations into one list of speeds per segment (in segment_index order),
+    with one column per timestamp in `frames`. Observations are fed one at a time, so
+    only the current row is held in memory.
+    """
+
+    def __init__(self, frames, positions):
+        self.frame_positions = {timestamp: column for column, timestamp in enumerate(frames)}
+        self.frame_count = len(frames)
+        self.positions = positions
+        self.row = None
+        self.next_position = 0  # First position not returned yet
+
+    def add(self, segment_id, recorded_at, current_speed):
+        """Record one observation; return the rows it completed."""
+        position = self.positions.get(segment_id)
+        column = self.frame_positions.get(recorded_at)
+        if position is None or column is None:
+            return []  # Segment or snapshot appeared after the indexes were loaded
+        completed = []
+        if position >= self.next_position:
+            if self.row is not None:
+                completed.append(self.row)
+            # Segments without any observation in the window get an empty row
+            completed.extend([None] * self.frame_count for _ in range(self.next_position, position))
+            self.row = [None] * self.frame_count
+            self.next_position = position + 1
+        self.row[column] = current_speed
+        return completed
+
+    def finish(self):
+        """The rows still pending once every observation has been added."""
+        completed = [self.row] if self.row is not None else []
+        completed.extend([None] * self.frame_count for _ in range(self.next_position, len(self.positions)))
+        return completed
+
+
+def iter_speed_rows(frames, positions):
+    """
+    Yield one list of speeds per segment (in segment_index order), with one column per
+    timestamp in `frames`. Observations are read in (segment_id, recorded_at) order through
+    a server-side iterator, so only the current row is held in memory.
+    """
+    builder = SpeedRowBuilder(frames, positions)
+    for observation in speed_observations(frames).iterator(chunk_size=QUERY_CHUNK_SIZE):
+        yield from builder.add(*observation)
+    yield from builder.finish()
+
+
+def snapshot_speed_vector(recorded_at, positions, version=None):
+    """
+    Speeds at one snapshot as a list aligned to segment_index order.
+    Segments without an observation at that time are None. Recent snapshots come from the
+    shared hot store when it holds them for the segment list with `version`.
+    """
+    published = hot_snapshots.speeds(recorded_at, version) if version is not None else None
+    if published is not None:
+        return [speed if speed != snapshot_binary.NO_OBSERVATION else None for speed in published]
+
+    speeds = [None] * len(positions)
+    observations = TrafficSegmentData.objects.filter(recorded_at=recorded_at).values_list('segment_id', 'current_speed')
+    for segment_id, current_speed in observations:
+        position = positions.get(segment_id)
+        if position is not None:
+            speeds[position] = current_speed
+    return speeds
+
+
+@require_http_methods(["GET"])
+def traffic_segments_api(request):
+    """
+    API endpoint to return traffic segment data as GeoJSON from the database.
+
+    Query Parameters:
+    - datetime (optional): An ISO-formatted datetime string (e.g., "2025-07-31T12:31:00")
+                          to request data for a specific timestamp.
+                          If not provided, the oldest available data is returned.
+
+    Returns:
+    - GeoJSON FeatureCollection of traffic segments.
+    - Metadata including current_timestamp, next_timestamp, oldest_timestamp, latest_timestamp.
+
+    - bbox (optional): "west,south,east,north" in degrees; only segments intersecting it are returned.
+    - street, direction (optional): case-insensitive exact match on the segment's street / direction.
+    - min_speed, max_speed (optional): inclusive bounds on _current_speed.
+    - no_data (optional): segments whose _current_speed is -1 (no estimate in the feed) are
+                          included (default), left out with "exclude", or the only ones with "only".
+    - stream (optional): "1" to stream features as they are read instead of building the
+                         whole response in memory. Streamed responses are not cached.
+    - format (optional): "binary" for the compact encoding in web_app/snapshot_binary.py
+                         (ids, geometry, properties and speeds; metadata and debug in its
+                         metadata block) instead of GeoJSON. Not streamed.
+    Invalid bbox, min_speed, max_speed or no_data values get a 400 response.
+
+    Encoded responses are cached per worker and carry a strong ETag and Last-Modified,
+    so repeated requests skip the ORM and serializer and conditional requests get a 304.
+    Unfiltered requests for a snapshot the hot store holds (e.g. the latest) are built from it.
+    """
+    debug_info = new_debug_info()
+
+    # --- 1. Get overall oldest and latest timestamps from the snapshot index ---
+    oldest_data_datetime = snapshot_timestamps.oldest()
+    latest_data_datetime = snapshot_timestamps.latest()
+
+    if not oldest_data_datetime:
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = oldest_data_datetime.isoformat()
+    debug_info['latest_data_timestamp'] = latest_data_datetime.isoformat()
+
+    datetime_param = request.GET.get('datetime', None)
+
+    # The response only depends on the request parameter and the set of available snapshots,
+    # so a cached encoding can be served without touching the database.
+    cache_key = (snapshot_timestamps.version, datetime_param, wants_binary(request)) + tuple(
+        request.GET.get(param_name) for param_name in SEGMENT_FILTER_PARAMS)
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    with metrics.phase('resolve'):
+        # --- 2. Determine the actual snapshot timestamp for the current request ---
+        actual_data_timestamp = resolve_snapshot_timestamp(datetime_param, debug_info)
+        debug_info['current_data_timestamp'] = actual_data_timestamp.isoformat()
+
+        # --- 3. Determine the next available timestamp ---
+        next_data_datetime = resolve_next_timestamp(actual_data_timestamp, debug_info)
+        metadata = snapshot_metadata(actual_data_timestamp, next_data_datetime)
+
+        filters, error_response = parse_segment_filters(request, debug_info)
+    if error_response is not None:
+        return error_response
+
+    # --- 4. Fetch data for the determined actual_data_timestamp ---
+    # A whole recent snapshot comes from the shared hot store; filtered requests and older
+    # snapshots read all segments recorded at this exact timestamp, joined with their static
+    # attributes, in one query
+    with metrics.phase('fetch'):
+        published_rows = published_feature_rows(actual_data_timestamp) if not filters else None
+
+    if wants_binary(request):
+        with metrics.phase('fetch'):
+            rows = published_rows
+            if rows is None:
+                rows = list(snapshot_feature_rows(actual_data_timestamp, filters).iterator(chunk_size=QUERY_CHUNK_SIZE))
+        debug_info['returned_features'] = len(rows)
+        return binary_response(request, cache_key, binary_feature_rows(rows, {"metadata": metadata, "debug": debug_info}))
+
+    if published_rows is not None:
+        last_updated = actual_data_timestamp.isoformat()
+        features = (snapshot_feature(row, last_updated) for row in published_rows)
     else:
-        # If no next timestamp exists, loop back to the oldest data
-        next_data_datetime = oldest_data_datetime
-        debug_info['error_messages'].append("No data after current timestamp found. Looping back to oldest.")
+        features = iter_snapshot_features(actual_data_timestamp, filters)
 
-    debug_info['next_data_timestamp_calculated'] = next_data_datetime.isoformat() if next_data_datetime else None
+    if wants_stream(request):
+        def counted_features():
+            for feature in features:
+                debug_info['returned_features'] += 1
+                yield feature
+
+        return streaming_json_response(
+            {"type": "FeatureCollection"}, "features", counted_features(),
+            lambda: {"metadata": metadata, "debug": debug_info})
+
+    with metrics.phase('fetch'):
+        features = list(features)
+    debug_info['returned_features'] = len(features)
 
     geojson_data = {
         "type": "FeatureCollection",
         "features": features,
-        "metadata": {  # Include metadata for frontend to manage state
-            "current_timestamp": actual_data_timestamp.isoformat(),
-            "next_timestamp": next_data_datetime.isoformat(),  # This will be used by the frontend for the next request
-            "oldest_timestamp": oldest_data_datetime.isoformat(),
-            "latest_timestamp": latest_data_datetime.isoformat(),
-        },
+        "metadata": metadata,
         "debug": debug_info  # Include debug info in response for development
     }
 
-    return JsonResponse(geojson_data)
+    return snapshot_responses.put(cache_key, geojson_data).as_response(request)
+
+
+@require_http_methods(["GET"])
+def traffic_geometry_api(request):
+    """
+    API endpoint returning the static segment geometry as GeoJSON, without speeds.
+
+    Features are ordered by segment_id, which is the order of the arrays returned by
+    traffic_speeds_api. Clients load this once and re-fetch it only when the
+    segments_version reported by traffic_speeds_api changes.
+
+    Query Parameters:
+    - format (optional): "binary" for the compact encoding in web_app/snapshot_binary.py
+                         (ids, geometry and properties) instead of GeoJSON.
+
+    Returns:
+    - GeoJSON FeatureCollection of all known segments.
+    - Metadata with segments_version and segment_count.
+    """
+    cache_key = ('geometry', snapshot_timestamps.version, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    _, _, segments_version = segment_index.current()
+
+    if wants_binary(request):
+        segments = list(TrafficSegment.objects.order_by('segment_id').values_list(*SEGMENT_FIELDS))
+        body = snapshot_binary.encode_segment_rows(
+            segments, {"metadata": {"segments_version": segments_version, "segment_count": len(segments)}})
+        return binary_response(request, cache_key, body)
+
+    features = [
+        {
+            "type": "Feature",
+            "properties": segment_properties(segment),
+            "geometry": segment_geometry(segment)
+        }
+        for segment in TrafficSegment.objects.order_by('segment_id')
+    ]
+
+    geojson_data = {
+        "type": "FeatureCollection",
+        "features": features,
+        "metadata": {
+            "segments_version": segments_version,
+            "segment_count": len(features),
+        },
+    }
+
+    return snapshot_responses.put(cache_key, geojson_data).as_response(request)
+
+
+def changed_positions(speeds, base_speeds):
+    """
+    Positions whose speed differs between two aligned speed vectors, or None when sending
+    the full vector is cheaper (a diff ships two numbers per changed segment, so it only
+    pays off below half the segments).
+    """
+    changed = [position for position, speed in enumerate(speeds) if speed != base_speeds[position]]
+    return changed if len(changed) * 2 < len(speeds) else None
+
+
+@require_http_methods(["GET"])
+def traffic_speeds_api(request):
+    """
+    API endpoint returning only the speeds of one snapshot, for animating a map whose
+    geometry came from traffic_geometry_api.
+
+    Query Parameters:
+    - datetime (optional): ISO-formatted datetime of the snapshot, resolved like traffic_segments_api.
+    - base (optional): ISO-formatted datetime of a snapshot the client already shows. When given,
+                       only the segments whose speed differs from that snapshot are returned,
+                       unless that diff would be larger than the full vector.
+    - format (optional): "binary" for the compact encoding in web_app/snapshot_binary.py: the full
+                         speed vector as one int8 frame, everything else in its metadata block.
+                         base is ignored, as the full vector is already smaller than a JSON diff.
+
+    Returns:
+    - speeds: list aligned to the geometry feature order (None where a segment has no observation),
+      or changes: {"positions": [...], "speeds": [...]} when a diff against base was smaller.
+    - segments_version: reload the geometry when this differs from the one it was loaded with.
+    - Metadata including current_timestamp, next_timestamp, oldest_timestamp, latest_timestamp
+      (and base_timestamp for diffs).
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    datetime_param = request.GET.get('datetime', None)
+    base_param = request.GET.get('base', None)
+
+    cache_key = ('speeds', snapshot_timestamps.version, datetime_param, base_param, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    with metrics.phase('resolve'):
+        actual_data_timestamp = resolve_snapshot_timestamp(datetime_param, debug_info)
+        debug_info['current_data_timestamp'] = actual_data_timestamp.isoformat()
+        next_data_datetime = resolve_next_timestamp(actual_data_timestamp, debug_info)
+        _, positions, segments_version = segment_index.current()
+
+    with metrics.phase('fetch'):
+        speeds = snapshot_speed_vector(actual_data_timestamp, positions, segments_version)
+
+    speed_data = {
+        "segments_version": segments_version,
+        "metadata": snapshot_metadata(actual_data_timestamp, next_data_datetime),
+        "debug": debug_info
+    }
+
+    if wants_binary(request):
+        debug_info['returned_features'] = len(speeds)
+        return binary_response(request, cache_key, snapshot_binary.encode_snapshot(speed_data, speed_frames=[speeds]))
+
+    changed = None
+    if base_param:
+        base_timestamp = resolve_snapshot_timestamp(base_param, debug_info, param_name='base')
+        with metrics.phase('fetch'):
+            base_speeds = snapshot_speed_vector(base_timestamp, positions, segments_version)
+        changed = changed_positions(speeds, base_speeds)
+        speed_data["metadata"]["base_timestamp"] = base_timestamp.isoformat()
+
+    if changed is not None:
+        speed_data["changes"] = {
+            "positions": changed,
+            "speeds": [speeds[position] for position in changed],
+        }
+        debug_info['returned_features'] = len(changed)
+    else:
+        speed_data["speeds"] = speeds
+        debug_info['returned_features'] = len(speeds)
+
+    return snapshot_responses.put(cache_key, speed_data).as_response(request)
+
+
+def resolve_range_window(start_param, end_param, count_param, debug_info):
+    """
+    Snapshot timestamps requested from traffic_range_api, and the response metadata
+    (next_timestamp is the snapshot after the window, so windows can be chained).
+    """
+    max_frames = getattr(settings, 'TRAFFIC_RANGE_MAX_FRAMES', 288)
+    frame_count = getattr(settings, 'TRAFFIC_RANGE_DEFAULT_FRAMES', 12)
+
+    start_timestamp = resolve_snapshot_timestamp(start_param, debug_info, param_name='start')
+
+    end_datetime = None
+    if end_param:
+        try:
+            end_datetime = datetime.fromisoformat(end_param)
+            debug_info['query_filters']['requested_end_param'] = end_param
+        except ValueError as e:
+            debug_info['error_messages'].append(
+                f"Invalid 'end' format: '{end_param}'. Error: {e}. Using 'count' instead.")
+    if end_datetime is None and count_param:
+        try:
+            frame_count = int(count_param)
+            if frame_count < 1:
+                raise ValueError("count must be at least 1")
+            debug_info['query_filters']['requested_count_param'] = count_param
+        except ValueError as e:
+            frame_count = getattr(settings, 'TRAFFIC_RANGE_DEFAULT_FRAMES', 12)
+            debug_info['error_messages'].append(
+                f"Invalid 'count': '{count_param}'. Error: {e}. Returning {frame_count} snapshots.")
+
+    frames = snapshot_timestamps.window(start_timestamp, end=end_datetime, count=min(frame_count, max_frames))
+    if len(frames) > max_frames:
+        debug_info['error_messages'].append(f"Range truncated to the first {max_frames} snapshots.")
+        frames = frames[:max_frames]
+    if not frames:
+        # The end was before the start; fall back to the start snapshot alone
+        debug_info['error_messages'].append("Requested range contains no snapshots. Returning the start snapshot.")
+        frames = [start_timestamp]
+
+    debug_info['current_data_timestamp'] = frames[0].isoformat()
+
+    # The snapshot after the window, so clients can request the next one
+    next_data_datetime = resolve_next_timestamp(frames[-1], debug_info)
+    metadata = snapshot_metadata(frames[0], next_data_datetime)
+    metadata["end_timestamp"] = frames[-1].isoformat()
+    return frames, metadata
+
+
+@require_http_methods(["GET"])
+def traffic_range_api(request):
+    """
+    API endpoint returning the speeds of many consecutive snapshots in one response,
+    so a client can prefetch a window of frames and animate it locally.
+
+    Query Parameters:
+    - start (optional): ISO-formatted datetime of the first snapshot, resolved like
+                        traffic_segments_api's datetime. Defaults to the oldest snapshot.
+    - end (optional): ISO-formatted datetime of the last snapshot to include.
+    - count (optional): Number of snapshots to return when no end is given
+                        (default TRAFFIC_RANGE_DEFAULT_FRAMES).
+    - stream (optional): "1" to stream the speed rows as they are read (for large exports).
+                         Streamed responses are not cached.
+    - format (optional): "binary" for the compact encoding in web_app/snapshot_binary.py: one int8
+                         speed frame per timestamp, everything else in its metadata block. Not streamed.
+    At most TRAFFIC_RANGE_MAX_FRAMES snapshots are returned per request.
+
+    Returns:
+    - timestamps: the snapshot timestamps in the window, oldest first.
+    - speeds: segments x timestamps matrix; row i is the segment at position i of the
+      traffic_geometry_api order, column j the snapshot timestamps[j] (None where missing).
+    - segments_version, and metadata with next_timestamp being the snapshot after the window
+      (looping back to the oldest), so windows can be chained.
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    start_param = request.GET.get('start', None)
+    end_param = request.GET.get('end', None)
+    count_param = request.GET.get('count', None)
+
+    cache_key = ('range', snapshot_timestamps.version, start_param, end_param, count_param, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    # --- 1. Resolve the window of snapshot timestamps ---
+    with metrics.phase('resolve'):
+        frames, metadata = resolve_range_window(start_param, end_param, count_param, debug_info)
+        _, positions, segments_version = segment_index.current()
+
+    # --- 2. Fetch every observation in the window with one range query ---
+    speed_rows = iter_speed_rows(frames, positions)
+    debug_info['returned_features'] = len(positions)
+
+    head = {
+        "segments_version": segments_version,
+        "timestamps": [timestamp.isoformat() for timestamp in frames],
+    }
+
+    if wants_binary(request):
+        with metrics.phase('fetch'):
+            speed_rows = list(speed_rows)
+        body = binary_speed_rows(speed_rows, len(frames), dict(head, metadata=metadata, debug=debug_info))
+        return binary_response(request, cache_key, body)
+
+    if wants_stream(request):
+        return streaming_json_response(head, "speeds", speed_rows, lambda: {"metadata": metadata, "debug": debug_info})
+
+    with metrics.phase('fetch'):
+        speed_rows = list(speed_rows)
+    range_data = dict(head, speeds=speed_rows, metadata=metadata, debug=debug_info)
+
+    return snapshot_responses.put(cache_key, range_data).as_response(request)
+
+
+def resolve_playback_window(start_param, step_param, count_param, debug_info):
+    """
+    Frame times requested from traffic_playback_api and the response metadata, with the step
+    in seconds (next_timestamp is where the following window starts, looping back to the oldest
+    snapshot after the latest, like traffic_range_api): ((frame_times, metadata), None), or
+    (None, a 400 response) when the step is outside 1..TRAFFIC_PLAYBACK_MAX_STEP.
+    """
+    oldest_data_datetime = snapshot_timestamps.oldest()
+    latest_data_datetime = snapshot_timestamps.latest()
+
+    start_datetime = oldest_data_datetime
+    if start_param:
+        try:
+            start_datetime = snapshot_timestamps.normalize(datetime.fromisoformat(start_param))
+            debug_info['query_filters']['requested_start_param'] = start_param
+        except ValueError as e:
+            debug_info['error_messages'].append(
+                f"Invalid 'start' format: '{start_param}'. Error: {e}. Starting at the oldest data.")
+    else:
+        debug_info['error_messages'].append("No 'start' parameter provided. Starting at the oldest data.")
+    if start_datetime < oldest_data_datetime or start_datetime > latest_data_datetime:
+        debug_info['error_messages'].append("Requested start is outside the stored data. Starting at the oldest data.")
+        start_datetime = oldest_data_datetime
+
+    max_step = getattr(settings, 'TRAFFIC_PLAYBACK_MAX_STEP', 86400)
+    step_seconds = getattr(settings, 'TRAFFIC_PLAYBACK_DEFAULT_STEP', 30)
+    if step_param:
+        try:
+            step_seconds = int(step_param)
+            debug_info['query_filters']['requested_step_param'] = step_param
+        except ValueError as e:
+            step_seconds = getattr(settings, 'TRAFFIC_PLAYBACK_DEFAULT_STEP', 30)
+            debug_info['error_messages'].append(
+                f"Invalid 'step': '{step_param}'. Error: {e}. Using {step_seconds} seconds.")
+        # A huge step would overflow the frame time arithmetic
+        if not 1 <= step_seconds <= max_step:
+            return None, JsonResponse({'error': f"'step' must be between 1 and {max_step} seconds"}, status=400)
+
+    max_frames = getattr(settings, 'TRAFFIC_PLAYBACK_MAX_FRAMES', 1200)
+    frame_count = getattr(settings, 'TRAFFIC_PLAYBACK_DEFAULT_FRAMES', 60)
+    if count_param:
+        try:
+            frame_count = int(count_param)
+            if frame_count < 1:
+                raise ValueError("count must be at least 1")
+            debug_info['query_filters']['requested_count_param'] = count_param
+        except ValueError as e:
+            frame_count = getattr(settings, 'TRAFFIC_PLAYBACK_DEFAULT_FRAMES', 60)
+            debug_info['error_messages'].append(
+                f"Invalid 'count': '{count_param}'. Error: {e}. Returning {frame_count} frames.")
+    if frame_count > max_frames:
+        debug_info['error_messages'].append(f"Playback truncated to {max_frames} frames.")
+        frame_count = max_frames
+
+    # Frames stop at the latest snapshot; there is nothing to interpolate towards after it
+    step = timedelta(seconds=step_seconds)
+    frame_count = min(frame_count, int((latest_data_datetime - start_datetime) / step) + 1)
+    frame_times = [start_datetime + index * step for index in range(frame_count)]
+
+    debug_info['current_data_timestamp'] = frame_times[0].isoformat()
+    next_data_datetime = frame_times[-1] + step
+    if next_data_datetime > latest_data_datetime:
+        next_data_datetime = oldest_data_datetime
+        debug_info['error_messages'].append("Playback reached the latest data. Looping back to oldest.")
+    debug_info['next_data_timestamp_calculated'] = next_data_datetime.isoformat()
+
+    metadata = snapshot_metadata(frame_times[0], next_data_datetime)
+    metadata["end_timestamp"] = frame_times[-1].isoformat()
+    metadata["step_seconds"] = step_seconds
+    return (frame_times, metadata), None
+
+
+@require_http_methods(["GET"])
+def traffic_playback_api(request):
+    """
+    API endpoint returning playback frames at any time step, interpolated between the stored
+    snapshots (web_app/playback.py), so a client can animate history smoothly at its own pace.
+
+    Query Parameters:
+    - start (optional): ISO-formatted datetime of the first frame; any time between the oldest
+                        and latest snapshot, not only snapshot times. Defaults to the oldest snapshot.
+    - step (optional): Seconds between frames (default TRAFFIC_PLAYBACK_DEFAULT_STEP, 30; at most
+                       TRAFFIC_PLAYBACK_MAX_STEP, one day, else 400).
+    - count (optional): Number of frames (default TRAFFIC_PLAYBACK_DEFAULT_FRAMES, 60; at most
+                        TRAFFIC_PLAYBACK_MAX_FRAMES). Frames stop at the latest snapshot.
+    - format (optional): "binary" for the compact encoding in web_app/snapshot_binary.py: one int8
+                         speed frame per timestamp, everything else in its metadata block.
+
+    Returns:
+    - timestamps: the frame times, step seconds apart.
+    - frames: one speed list per frame, aligned to the traffic_geometry_api order (None where a
+      segment has no observation). Frames at a snapshot time carry that snapshot's speeds.
+    - source_timestamps: the snapshots the frames were interpolated from.
+    - segments_version, and metadata with step_seconds, end_timestamp and next_timestamp, the
+      start of the following window (looping back to the oldest), so windows can be chained.
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    start_param = request.GET.get('start', None)
+    step_param = request.GET.get('step', None)
+    count_param = request.GET.get('count', None)
+
+    cache_key = ('playback', snapshot_timestamps.version, start_param, step_param, count_param, wants_binary(request))
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    # --- 1. Resolve the frame times ---
+    with metrics.phase('resolve'):
+        window, error_response = resolve_playback_window(start_param, step_param, count_param, debug_info)
+        if error_response is not None:
+            return error_response
+        frame_times, metadata = window
+        _, positions, segments_version = segment_index.current()
+
+    # --- 2. Interpolate between the cached snapshot arrays, reading only the snapshots not cached yet ---
+    with metrics.phase('fetch'):
+        frames, sources = playback.playback_frames(frame_times, positions, segments_version)
+    debug_info['returned_features'] = len(positions)
+
+    playback_data = {
+        "segments_version": segments_version,
+        "timestamps": [frame_time.isoformat() for frame_time in frame_times],
+        "source_timestamps": [timestamp.isoformat() for timestamp in sources],
+        "metadata": metadata,
+        "debug": debug_info,
+    }
+
+    if wants_binary(request):
+        with metrics.phase('serialize'):
+            body = snapshot_binary.encode_snapshot(playback_data, speed_frames=frames)
+        return binary_response(request, cache_key, body)
+
+    playback_data["frames"] = frames
+    return snapshot_responses.put(cache_key, playback_data).as_response(request)
+
+
+def tile_features(recorded_at, z, x, y):
+    """
+    Yield (segment_id, grid points, properties) for the segments of one snapshot that
+    intersect tile z/x/y, ready for vector_tiles.encode_tile.
+
+    Per-zoom simplification: below TRAFFIC_TILE_DETAIL_ZOOM only segment_id and speed are
+    kept as properties, and segments that collapse onto a single grid cell are dropped.
+    """
+    west, south, east, north = vector_tiles.tile_bounds(z, x, y, buffer=vector_tiles.TILE_BUFFER)
+    detailed = z >= getattr(settings, 'TRAFFIC_TILE_DETAIL_ZOOM', 13)
+
+    # A segment intersects the tile when its bounding box overlaps the tile's bounding box
+    in_tile = bbox_filter(west, south, east, north)
+    rows = TrafficSegmentData.objects.filter(in_tile, recorded_at=recorded_at).order_by('segment_id').values_list(
+        *SNAPSHOT_FEATURE_COLUMNS).iterator(chunk_size=QUERY_CHUNK_SIZE)
+
+    for (segment_id, current_speed, street, direction, from_street, to_street, length, street_heading, comments,
+         start_longitude, start_latitude, end_longitude, end_latitude) in rows:
+        points = vector_tiles.project_to_tile(
+            [(start_longitude, start_latitude), (end_longitude, end_latitude)], z, x, y)
+        if points[0] == points[1]:
+            continue  # Shorter than one grid cell at this zoom
+
+        properties = {"segment_id": segment_id, "_current_speed": current_speed}
+        if detailed:
+            properties.update({
+                "street": street,
+                "direction": direction,
+                "from_street": from_street,
+                "to_street": to_street,
+                "length": length,
+                "street_heading": street_heading,
+                "comments": comments,
+            })
+        yield segment_id, points, properties
+
+
+@require_http_methods(["GET"])
+def traffic_tiles_api(request, z, x, y):
+    """
+    API endpoint returning the traffic segments of one snapshot as a Mapbox Vector Tile.
+
+    URL: /api/traffic-tiles/{z}/{x}/{y}.mvt, XYZ tile scheme (as used by Leaflet).
+    The tile has one layer, "traffic", with one LineString per segment intersecting the tile.
+
+    Query Parameters:
+    - datetime (optional): ISO-formatted datetime of the snapshot, resolved like traffic_segments_api.
+
+    Tiles are cached per worker under (snapshot timestamp and generation, z, x, y), so a tile
+    survives imports of other snapshots but not a re-import of its own. The URL does not carry
+    the generation, so browsers revalidate (no-cache) and get a 304 from the ETag when unchanged.
+    """
+    n = 2 ** z
+    if z > 24 or not (0 <= x < n and 0 <= y < n):
+        return JsonResponse({'error': f'Tile {z}/{x}/{y} is out of range'}, status=400)
+
+    debug_info = new_debug_info()
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    datetime_param = request.GET.get('datetime', None)
+    actual_data_timestamp = resolve_snapshot_timestamp(datetime_param, debug_info)
+    _, _, segments_version = segment_index.current()
+
+    cache_key = ('tile', actual_data_timestamp, snapshot_timestamps.snapshot_generation(actual_data_timestamp),
+                 z, x, y, segments_version)
+    cached_response = tile_responses.get(cache_key)
+    if cached_response is None:
+        body = vector_tiles.encode_tile({"traffic": tile_features(actual_data_timestamp, z, x, y)})
+        cached_response = tile_responses.put_bytes(
+            cache_key, body, content_type='application/vnd.mapbox-vector-tile', cache_control='no-cache')
+
+    return cached_response.as_response(request)
+
+
+def resolve_history_range(start_param, end_param, debug_info):
+    """
+    (start, end) datetimes for the history endpoints. `end` defaults to the latest snapshot and
+    `start` to TRAFFIC_SERIES_DEFAULT_HOURS before it; invalid values are reported and ignored.
+    """
+    end_datetime = snapshot_timestamps.latest()
+    if end_param:
+        try:
+            end_datetime = snapshot_timestamps.normalize(datetime.fromisoformat(end_param))
+            debug_info['query_filters']['requested_end_param'] = end_param
+        except ValueError as e:
+            debug_info['error_messages'].append(
+                f"Invalid 'end' format: '{end_param}'. Error: {e}. Using the latest snapshot.")
+
+    start_datetime = end_datetime - timedelta(hours=getattr(settings, 'TRAFFIC_SERIES_DEFAULT_HOURS', 24))
+    if start_param:
+        try:
+            start_datetime = snapshot_timestamps.normalize(datetime.fromisoformat(start_param))
+            debug_info['query_filters']['requested_start_param'] = start_param
+        except ValueError as e:
+            debug_info['error_messages'].append(
+                f"Invalid 'start' format: '{start_param}'. Error: {e}. Using the default range.")
+    if start_datetime > end_datetime:
+        debug_info['error_messages'].append("'start' is after 'end'. Swapping them.")
+        start_datetime, end_datetime = end_datetime, start_datetime
+
+    return start_datetime, end_datetime
+
+
+def segment_series_observations(segment_ids, start, end):
+    """
+    (segment_id, recorded_at, current_speed) tuples of `segment_ids` between start and end
+    (inclusive), in segment_id, recorded_at order. The query reads only the columns of the
+    web_app_observation_series covering index, in index order.
+    """
+    return TrafficSegmentData.objects.filter(
+        segment_id__in=segment_ids, recorded_at__range=(start, end)).order_by(
+        'segment_id', 'recorded_at').values_list('segment_id', 'recorded_at', 'current_speed')
+
+
+def iter_segment_series(segment_ids, start, end):
+    """
+    Yield (segment_id, [(recorded_at, current_speed), ...]) for each of `segment_ids` that has
+    observations between start and end (inclusive), in segment_id order.
+    """
+    observations = segment_series_observations(segment_ids, start, end).iterator(chunk_size=QUERY_CHUNK_SIZE)
+
+    current_id = None
+    points = []
+    for segment_id, recorded_at, current_speed in observations:
+        if segment_id != current_id:
+            if current_id is not None:
+                yield current_id, points
+            current_id = segment_id
+            points = []
+        points.append((recorded_at, current_speed))
+    if current_id is not None:
+        yield current_id, points
+
+
+def series_rollups(segment_ids, axis):
+    """
+    {segment_id: [(period_start, mean_speed, sample_count), ...]} from TrafficSegmentRollup for
+    the part of a resampled resolve_series_axis range older than the oldest raw snapshot, which
+    apply_traffic_retention has already rolled up and dropped. Hourly rollups where they are
+    kept, daily rollups before the oldest hourly one. Empty for raw series, which only have the
+    snapshots, and for ranges inside the raw retention window.
+    """
+    start_datetime, end_datetime, bucket, _, _ = axis
+    raw_cutoff = snapshot_timestamps.oldest()
+    if bucket is None or raw_cutoff is None or start_datetime >= raw_cutoff:
+        return {}
+    cutoff = min(end_datetime, raw_cutoff - timedelta(microseconds=1))
+
+    hourly_cutoff = TrafficSegmentRollup.objects.filter(
+        period=TrafficSegmentRollup.HOUR).aggregate(oldest=Min('period_start'))['oldest'] or raw_cutoff
+    periods = Q(period=TrafficSegmentRollup.HOUR)
+    if start_datetime < hourly_cutoff:
+        periods |= Q(period=TrafficSegmentRollup.DAY, period_start__lt=hourly_cutoff)
+    rollups = TrafficSegmentRollup.objects.filter(
+        periods, segment_id__in=segment_ids, period_start__range=(start_datetime, cutoff)).order_by(
+        'segment_id', 'period_start').values_list('segment_id', 'period_start', 'mean_speed', 'sample_count')
+
+    series = {}
+    for segment_id, period_start, mean_speed, sample_count in rollups:
+        series.setdefault(segment_id, []).append((period_start, mean_speed, sample_count))
+    return series
+
+
+def resample_series(points, bucket_starts, bucket, rollups=()):
+    """
+    Average the speed estimates of `points` into the buckets starting at `bucket_starts`
+    (each `bucket` long). -1 ("no estimate") is left out; empty buckets are None.
+    `rollups` (period_start, mean_speed, sample_count) count as sample_count estimates each,
+    all in the bucket their period starts in.
+    """
+    origin = bucket_starts[0]
+    sums = [0] * len(bucket_starts)
+    counts = [0] * len(bucket_starts)
+    for recorded_at, current_speed in points:
+        if current_speed < 0:
+            continue
+        column = int((recorded_at - origin) // bucket)
+        sums[column] += current_speed
+        counts[column] += 1
+    for period_start, mean_speed, sample_count in rollups:
+        column = int((period_start - origin) // bucket)
+        sums[column] += mean_speed * sample_count
+        counts[column] += sample_count
+    return [round(total / count, 1) if count else None for total, count in zip(sums, counts)]
+
+
+def parse_series_segment_ids(request, debug_info):
+    """The distinct segment_ids requested from traffic_series_api, or a 400 response as the second value."""
+    max_segments = getattr(settings, 'TRAFFIC_SERIES_MAX_SEGMENTS', 100)
+    segment_ids_param = request.GET.get('segment_ids', '')
+    try:
+        requested_ids = list(dict.fromkeys(int(value) for value in segment_ids_param.split(',') if value.strip()))
+    except ValueError as e:
+        return None, JsonResponse({'error': f"Invalid 'segment_ids': '{segment_ids_param}'. Error: {e}"}, status=400)
+    if not requested_ids:
+        return None, JsonResponse({'error': "'segment_ids' is required, e.g. ?segment_ids=951,952"}, status=400)
+    if len(requested_ids) > max_segments:
+        return None, JsonResponse({'error': f"At most {max_segments} segment_ids per request"}, status=400)
+    debug_info['query_filters']['segment_ids'] = requested_ids
+    return requested_ids, None
+
+
+def resolve_series_axis(start_param, end_param, bucket_param, debug_info):
+    """
+    Time range, bucket size and shared time axis of a traffic_series_api request:
+    ((start, end, bucket, timestamps, columns), None), or (None, a 400 response) when the axis is
+    too long. `bucket` is None for raw snapshots, whose timestamps are the snapshots in the range
+    and `columns` maps them to their position; both are None for resampled series.
+    """
+    # --- Time range and bucket size ---
+    start_datetime, end_datetime = resolve_history_range(start_param, end_param, debug_info)
+
+    bucket = None
+    if bucket_param:
+        try:
+            bucket_minutes = int(bucket_param)
+            if bucket_minutes < 1:
+                raise ValueError("bucket must be at least 1 minute")
+            bucket = timedelta(minutes=bucket_minutes)
+            debug_info['query_filters']['bucket'] = bucket_minutes
+        except ValueError as e:
+            debug_info['error_messages'].append(
+                f"Invalid 'bucket': '{bucket_param}'. Error: {e}. Returning raw snapshots.")
+
+    # --- Shared time axis: the snapshots in the range, or the buckets covering it ---
+    max_points = getattr(settings, 'TRAFFIC_SERIES_MAX_POINTS', 10000)
+    if bucket is None:
+        timestamps = snapshot_timestamps.window(start_datetime, end=end_datetime)
+        columns = {timestamp: column for column, timestamp in enumerate(timestamps)}
+    else:
+        # Buckets are aligned to multiples of the bucket size since the epoch (e.g. :00, :15, :30, :45)
+        epoch = datetime(1970, 1, 1, tzinfo=start_datetime.tzinfo)
+        first_bucket = start_datetime - (start_datetime - epoch) % bucket
+        bucket_count = int((end_datetime - first_bucket) // bucket) + 1
+        timestamps = [first_bucket + bucket * index for index in range(min(bucket_count, max_points + 1))]
+        columns = None
+    if len(timestamps) > max_points:
+        return None, JsonResponse({'error': f"The range has more than {max_points} points per segment; "
+                                            f"narrow it or use a larger 'bucket'"}, status=400)
+    return (start_datetime, end_datetime, bucket, timestamps, columns), None
+
+
+def series_speeds(points, axis, rollups=()):
+    """
+    One segment's [(recorded_at, current_speed), ...] aligned to the resolve_series_axis time axis,
+    resampled together with its series_rollups entry, if any.
+    """
+    _, _, bucket, timestamps, columns = axis
+    if bucket is not None:
+        return resample_series(points, timestamps, bucket, rollups)
+    speeds = [None] * len(timestamps)
+    for recorded_at, current_speed in points:
+        column = columns.get(recorded_at)
+        if column is not None:
+            speeds[column] = current_speed
+    return speeds
+
+
+def series_data(requested_ids, series, known_ids, axis, debug_info):
+    """traffic_series_api response body from the per-segment speeds and the set of existing segment_ids."""
+    start_datetime, end_datetime, bucket, timestamps, _ = axis
+    missing_ids = [segment_id for segment_id in requested_ids if segment_id not in known_ids]
+    if missing_ids:
+        debug_info['error_messages'].append(f"Unknown segment_ids: {missing_ids}")
+    segment_ids = [segment_id for segment_id in requested_ids if segment_id in known_ids]
+    empty_row = [None] * len(timestamps)
+
+    debug_info['returned_features'] = len(segment_ids)
+    debug_info['current_data_timestamp'] = timestamps[0].isoformat() if timestamps else None
+
+    return {
+        "segment_ids": segment_ids,
+        "timestamps": [timestamp.isoformat() for timestamp in timestamps],
+        "speeds": [series.get(segment_id, empty_row) for segment_id in segment_ids],
+        "metadata": {
+            "start": start_datetime.isoformat(),
+            "end": end_datetime.isoformat(),
+            "bucket_minutes": int(bucket.total_seconds() // 60) if bucket is not None else None,
+        },
+        "debug": debug_info,
+    }
+
+
+@require_http_methods(["GET"])
+def traffic_series_api(request):
+    """
+    API endpoint returning the speed history of one or more segments over a time range.
+
+    Query Parameters:
+    - segment_ids (required): Comma-separated segment IDs, e.g. "951,952"
+                              (at most TRAFFIC_SERIES_MAX_SEGMENTS).
+    - start (optional): ISO-formatted datetime. Defaults to TRAFFIC_SERIES_DEFAULT_HOURS before end.
+    - end (optional): ISO-formatted datetime. Defaults to the latest snapshot.
+    - bucket (optional): Resample into buckets of this many minutes (e.g. 15). Each value is then
+                         the mean of the speed estimates in the bucket, rounded to 0.1.
+                         History older than the raw retention window is read from the hourly
+                         and daily rollups instead, so it is only as fine as they are.
+    Ranges with more than TRAFFIC_SERIES_MAX_POINTS timestamps (or buckets) are rejected.
+
+    Returns:
+    - segment_ids: the requested segments that exist, in request order.
+    - timestamps: the snapshot timestamps in the range (or the bucket starts), oldest first.
+    - speeds: one array per entry of segment_ids, aligned to timestamps. None where there is no
+      observation (or, resampled, no speed estimate in the bucket); raw values keep the feed's -1.
+    - metadata: start, end and bucket_minutes as applied.
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    # --- 1. Requested segments ---
+    requested_ids, error_response = parse_series_segment_ids(request, debug_info)
+    if error_response is not None:
+        return error_response
+
+    start_param = request.GET.get('start', None)
+    end_param = request.GET.get('end', None)
+    bucket_param = request.GET.get('bucket', None)
+
+    cache_key = ('series', snapshot_timestamps.version, tuple(requested_ids), start_param, end_param, bucket_param)
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    # --- 2. Time range, bucket size and the shared time axis ---
+    with metrics.phase('resolve'):
+        axis, error_response = resolve_series_axis(start_param, end_param, bucket_param, debug_info)
+    if error_response is not None:
+        return error_response
+    start_datetime, end_datetime = axis[:2]
+
+    # --- 3. One indexed range scan for all requested segments, plus rollups for older history ---
+    with metrics.phase('fetch'):
+        rollups = series_rollups(requested_ids, axis)
+        series = {segment_id: series_speeds(points, axis, rollups.pop(segment_id, ()))
+                  for segment_id, points in iter_segment_series(requested_ids, start_datetime, end_datetime)}
+        series.update((segment_id, series_speeds((), axis, segment_rollups))
+                      for segment_id, segment_rollups in rollups.items())
+
+        # Segments without observations in the range still get a row if they exist
+        known_ids = set(series) | set(TrafficSegment.objects.filter(
+            segment_id__in=[segment_id for segment_id in requested_ids if segment_id not in series]).values_list(
+            'segment_id', flat=True))
+
+    return snapshot_responses.put(
+        cache_key, series_data(requested_ids, series, known_ids, axis, debug_info)).as_response(request)
+
+
+CONGESTION_SUMMARY_FIELDS = (
+    'street', 'direction', 'segment_count', 'reporting_count', 'reporting_length', 'mean_speed',
+    'share_below_15', 'share_below_25', 'congestion_index', 'worst_segments',
+)
+
+
+@require_http_methods(["GET"])
+def traffic_congestion_api(request):
+    """
+    API endpoint returning the precomputed congestion statistics of one snapshot.
+
+    Query Parameters:
+    - datetime (optional): ISO-formatted datetime of the snapshot, resolved like traffic_segments_api.
+    - street, direction (optional): case-insensitive exact match; limits the corridors returned.
+
+    Returns:
+    - city: the city-wide summary (length-weighted mean_speed, share_below_15/25 of reporting
+      segments, congestion_index = share of reporting length under 25 mph, worst_segments).
+    - corridors: the same statistics per street + direction, most congested first.
+    - metadata like traffic_segments_api.
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    datetime_param = request.GET.get('datetime', None)
+    street = request.GET.get('street', '').strip()
+    direction = request.GET.get('direction', '').strip()
+
+    cache_key = ('congestion', snapshot_timestamps.version, datetime_param, street.lower(), direction.lower())
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    actual_data_timestamp = resolve_snapshot_timestamp(datetime_param, debug_info)
+    debug_info['current_data_timestamp'] = actual_data_timestamp.isoformat()
+    metadata = snapshot_metadata(actual_data_timestamp, resolve_next_timestamp(actual_data_timestamp, debug_info))
+
+    # One indexed read of this snapshot's summary rows (unique on recorded_at, street, direction)
+    summaries = CongestionSummary.objects.filter(recorded_at=actual_data_timestamp)
+    corridor_filters = Q()
+    if street:
+        corridor_filters &= Q(street__iexact=street)
+        debug_info['query_filters']['street'] = street
+    if direction:
+        corridor_filters &= Q(direction__iexact=direction)
+        debug_info['query_filters']['direction'] = direction
+    if corridor_filters:
+        summaries = summaries.filter(Q(street='', direction='') | corridor_filters)
+    rows = list(summaries.values(*CONGESTION_SUMMARY_FIELDS))
+
+    city = None
+    corridors = []
+    for row in rows:
+        if row['street'] == '' and row['direction'] == '':
+            city = {key: value for key, value in row.items() if key not in ('street', 'direction')}
+        else:
+            corridors.append(row)
+    if city is None:
+        debug_info['error_messages'].append(
+            "No congestion summary for this snapshot; run `manage.py summarize_congestion`.")
+    # Most congested first; corridors without speed estimates last
+    corridors.sort(key=lambda row: (row['congestion_index'] is None, -(row['congestion_index'] or 0),
+                                    row['mean_speed'] or 0, row['street'], row['direction']))
+    debug_info['returned_features'] = len(corridors)
+
+    congestion_data = {
+        "city": city,
+        "corridors": corridors,
+        "metadata": metadata,
+        "debug": debug_info,
+    }
+
+    return snapshot_responses.put(cache_key, congestion_data).as_response(request)
+
+
+@require_http_methods(["GET"])
+def traffic_congestion_index_api(request):
+    """
+    API endpoint returning the city congestion index (or one corridor's) as a time series.
+
+    Query Parameters:
+    - start, end (optional): ISO-formatted datetimes, as for traffic_series_api
+                             (default: the TRAFFIC_SERIES_DEFAULT_HOURS before the latest snapshot).
+    - street and direction (optional): both given, the series of that corridor instead of the city.
+
+    Returns:
+    - timestamps, and aligned arrays congestion_index, mean_speed and share_below_25.
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    start_param = request.GET.get('start', None)
+    end_param = request.GET.get('end', None)
+    street = request.GET.get('street', '').strip()
+    direction = request.GET.get('direction', '').strip()
+
+    cache_key = ('congestion-index', snapshot_timestamps.version, start_param, end_param, street.lower(),
+                 direction.lower())
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    start_datetime, end_datetime = resolve_history_range(start_param, end_param, debug_info)
+    if bool(street) != bool(direction):
+        debug_info['error_messages'].append(
+            "Both 'street' and 'direction' are needed for a corridor series. Returning the city series.")
+        street = direction = ''
+    if street:
+        debug_info['query_filters']['street'] = street
+        debug_info['query_filters']['direction'] = direction
+        # Match case-insensitively against the small segment table, then use the stored spelling
+        # so the summary query below can use its index (iexact would be a LIKE scan on SQLite)
+        corridor = TrafficSegment.objects.filter(street__iexact=street, direction__iexact=direction).values_list(
+            'street', 'direction').first()
+        if corridor is None:
+            debug_info['error_messages'].append(f"Unknown corridor: '{street}' '{direction}'.")
+        else:
+            street, direction = corridor
+
+    # Range scan over the (street, direction, recorded_at) index
+    rows = CongestionSummary.objects.filter(
+        street=street, direction=direction, recorded_at__range=(start_datetime, end_datetime),
+    ).order_by('recorded_at').values_list('recorded_at', 'congestion_index', 'mean_speed', 'share_below_25')
+    timestamps, congestion_index, mean_speed, share_below_25 = (list(column) for column in zip(*rows)) if rows \
+        else ([], [], [], [])
+    debug_info['returned_features'] = len(timestamps)
+
+    index_data = {
+        "timestamps": [timestamp.isoformat() for timestamp in timestamps],
+        "congestion_index": congestion_index,
+        "mean_speed": mean_speed,
+        "share_below_25": share_below_25,
+        "metadata": {
+            "start": start_datetime.isoformat(),
+            "end": end_datetime.isoformat(),
+            "street": street or None,
+            "direction": direction or None,
+        },
+        "debug": debug_info,
+    }
+
+    return snapshot_responses.put(cache_key, index_data).as_response(request)
+
+
+def traffic_event_data(event):
+    segment = event.segment
+    return {
+        "event_id": event.id,
+        "segment_id": segment.segment_id,
+        "street": segment.street,
+        "direction": segment.direction,
+        "from_street": segment.from_street,
+        "to_street": segment.to_street,
+        "started_at": event.started_at.isoformat(),
+        "last_seen_at": event.last_seen_at.isoformat(),
+        "ended_at": event.ended_at.isoformat() if event.ended_at else None,
+        "active": event.ended_at is None,
+        "baseline_speed": event.baseline_speed,
+        "start_speed": event.start_speed,
+        "min_speed": event.min_speed,
+        "drop_ratio": round(1 - event.min_speed / event.baseline_speed, 3) if event.baseline_speed > 0 else None,
+        "min_z_score": round(event.min_z_score, 2),
+        "snapshot_count": event.snapshot_count,
+    }
+
+
+@require_http_methods(["GET"])
+def traffic_events_api(request):
+    """
+    API endpoint returning the congestion events detected at import (see web_app/anomalies.py),
+    most recent first.
+
+    Query Parameters:
+    - active (optional): 'true' for only the events still open, 'false' for only the ended ones.
+    - start, end (optional): ISO-formatted datetimes; events overlapping that range
+                             (default: the TRAFFIC_SERIES_DEFAULT_HOURS before the latest snapshot).
+    - street, direction (optional): case-insensitive exact match on the segment.
+    - limit (optional): events returned (default 100, at most TRAFFIC_EVENTS_MAX_RESULTS).
+
+    Returns:
+    - events: segment, started_at/last_seen_at/ended_at, baseline_speed, start_speed, min_speed,
+      drop_ratio (of min_speed below the baseline), min_z_score and snapshot_count of each event.
+    """
+    debug_info = new_debug_info()
+
+    if not snapshot_timestamps.oldest():
+        return no_data_response(debug_info)
+
+    debug_info['oldest_data_timestamp'] = snapshot_timestamps.oldest().isoformat()
+    debug_info['latest_data_timestamp'] = snapshot_timestamps.latest().isoformat()
+
+    active_param = request.GET.get('active', '').strip().lower()
+    start_param = request.GET.get('start', None)
+    end_param = request.GET.get('end', None)
+    street = request.GET.get('street', '').strip()
+    direction = request.GET.get('direction', '').strip()
+    limit_param = request.GET.get('limit', None)
+
+    cache_key = ('events', snapshot_timestamps.version, active_param, start_param, end_param, street.lower(),
+                 direction.lower(), limit_param)
+    cached_response = snapshot_responses.get(cache_key)
+    if cached_response is not None:
+        return cached_response.as_response(request)
+
+    max_results = getattr(settings, 'TRAFFIC_EVENTS_MAX_RESULTS', 1000)
+    limit = 100
+    if limit_param:
+        try:
+            limit = int(limit_param)
+            if limit < 1:
+                raise ValueError("must be positive")
+            debug_info['query_filters']['limit'] = limit
+        except ValueError as e:
+            limit = 100
+            debug_info['error_messages'].append(f"Invalid 'limit': '{limit_param}'. Error: {e}. Using {limit}.")
+    if limit > max_results:
+        debug_info['error_messages'].append(f"'limit' is capped at {max_results}.")
+        limit = max_results
+
+    start_datetime, end_datetime = resolve_history_range(start_param, end_param, debug_info)
+    # Overlapping the range: started before its end, and still open or last seen after its start
+    events = TrafficEvent.objects.filter(started_at__lte=end_datetime).filter(
+        Q(ended_at__isnull=True) | Q(last_seen_at__gte=start_datetime))
+    if active_param in ('true', '1', 'yes'):
+        events = events.filter(ended_at__isnull=True)
+        debug_info['query_filters']['active'] = True
+    elif active_param in ('false', '0', 'no'):
+        events = events.filter(ended_at__isnull=False)
+        debug_info['query_filters']['active'] = False
+    elif active_param:
+        debug_info['error_messages'].append(f"Invalid 'active': '{active_param}'. Returning all events.")
+    if street:
+        events = events.filter(segment__street__iexact=street)
+        debug_info['query_filters']['street'] = street
+    if direction:
+        events = events.filter(segment__direction__iexact=direction)
+        debug_info['query_filters']['direction'] = direction
+
+    # Range scan over the started_at index, newest first; the segment comes in the same query
+    rows = [traffic_event_data(event) for event in
+            events.select_related('segment').order_by('-started_at', '-id')[:limit]]
+    debug_info['returned_features'] = len(rows)
+
+    events_data = {
+        "events": rows,
+        "metadata": {
+            "start": start_datetime.isoformat(),
+            "end": end_datetime.isoformat(),
+            "limit": limit,
+        },
+        "debug": debug_info,
+    }
+
+    return snapshot_responses.put(cache_key, events_data).as_response(request)
+
+
+def snapshot_event(previous_timestamp, timestamp):
+    """
+    The live "snapshot" event for a newly imported snapshot: the speeds that changed since
+    previous_timestamp (or all of them, when that is smaller), aligned to the geometry order.
+    Built once per snapshot by the watcher and broadcast to every client.
+    """
+    _, positions, segments_version = segment_index.current()
+    speeds = snapshot_speed_vector(timestamp, positions, segments_version)
+    event = {
+        "timestamp": timestamp.isoformat(),
+        "previous_timestamp": previous_timestamp.isoformat(),
+        "segments_version": segments_version,
+    }
+    changed = changed_positions(speeds, snapshot_speed_vector(previous_timestamp, positions, segments_version))
+    if changed is not None:
+        event["changes"] = {"positions": changed, "speeds": [speeds[position] for position in changed]}
+    else:
+        event["speeds"] = speeds
+    return 'snapshot', event
+
+
+# Publishes snapshot_event to this process's live broker; started by the first live client
+snapshot_watcher = SnapshotWatcher(live_broker(), snapshot_event)
+
+
+def latest_snapshot_info():
+    _, _, segments_version = segment_index.current()
+    latest = snapshot_timestamps.latest()
+    return {"timestamp": latest.isoformat() if latest else None, "segments_version": segments_version}
+
+
+@require_http_methods(["GET"])
+async def traffic_live_api(request):
+    """
+    Server-Sent Events stream announcing new snapshots as the importer commits them.
+
+    Requires the ASGI entry point (Traffic_sample/asgi.py, e.g. `uvicorn Traffic_sample.asgi:application`);
+    under WSGI each connection would hold a worker thread, so there it answers 501.
+
+    Events:
+    - hello: {timestamp, segments_version} of the latest snapshot, sent on (re)connect.
+      Load /api/traffic-speeds/?datetime=<timestamp> to start from it.
+    - snapshot: {timestamp, previous_timestamp, segments_version} plus either
+      changes: {positions, speeds} relative to previous_timestamp, or the full speeds vector,
+      aligned like traffic_speeds_api. The delta is computed once and sent to every client.
+    - resync: the client fell behind and events were dropped; reload the latest speeds.
+    A comment line is sent every TRAFFIC_LIVE_KEEPALIVE seconds to keep idle connections open.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': "Live updates need the ASGI server (Traffic_sample/asgi.py); "
+                                      "poll /api/traffic-speeds/ instead"}, status=501)
+
+    snapshot_watcher.start()
+    broker = live_broker()
+    keepalive = getattr(settings, 'TRAFFIC_LIVE_KEEPALIVE', 15)
+
+    async def events():
+        hello = await sync_to_async(latest_snapshot_info)()
+        yield sse_message('hello', hello, event_id=hello['timestamp'])
+        async for event in broker.subscribe(keepalive):
+            if event is None:
+                yield b": keepalive\n\n"
+                continue
+            name, data = event
+            yield sse_message(name, data, event_id=data.get('timestamp'))
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Tell nginx not to buffer the stream
+    return response